@@ -1,13 +1,20 @@
 #import des différentes bibliothèques nécessaires
 import streamlit as st
-import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from plotly.subplots import make_subplots
+
+from source.data import (
+    load_cinemas_par_region,
+    load_frequentation_cinemas,
+    load_frequentation_cinemas_prix,
+    load_frequentation_cinemas_region,
+)
+from source.kpis import load_kpis
+from source.maps import point_map
+from source.payload import plotly_chart
+from source.progressive import deferred, lazy_section, render_deferred
 
 # #Mise en forme de la page
 # st.header('Cinémas 🎦')
@@ -35,20 +42,12 @@ st.markdown(
 )
 
 
-#Lecture des documents
-dffr = pd.read_csv('data_prod/frequentation-dans-les-salles-de-cinema.csv', sep=';')
-df1 = pd.read_csv('data_prod/cinema_clean.csv', sep=';')
-df2 = pd.read_csv('data_prod/code_departement_region.csv', sep=';')
-pop= pd.read_csv('data_prod/poulation France par dpt et region_clean.csv', sep=';')
-cine_reg = pd.read_csv('data_prod/cinema_par_region.csv', sep=';')
-cine = pd.read_csv('data_prod/cinema_par_region.csv',sep=';')
-freq_cine= pd.read_csv('data_prod/frequentation cinemas par region.csv', sep=';')
-
-
-tot_cine = pd.merge(cine_reg, freq_cine, left_on ='region_name', right_on='region', how='left')
-total_cine_count = len(df1)  # nombre total de lignes (entier)
-nb_regions = tot_cine['region'].nunique()  # nombre de régions uniques (utilisez tot_cine, pas total_cine)
-moyenne_cine = total_cine_count / nb_regions  # moyenne par région
+# Indicateurs précalculés (source/kpis.py) : les cartes s'affichent avant
+# la lecture des fichiers
+kpis = load_kpis("cinemas")
+total_cine_count = kpis["total"]  # nombre total de cinémas
+nb_regions = kpis["regions"]  # nombre de régions uniques
+moyenne_cine = kpis["moyenne"]  # moyenne par région
 
 # --- Style CSS pour les cartes KPI ---
 st.markdown("""
@@ -100,6 +99,11 @@ with col3:
 
 st.divider()
 
+#Lecture des documents
+cine_reg = load_cinemas_par_region()
+cine = cine_reg
+freq_cine= load_frequentation_cinemas_region()
+
 # ------------------------------------
 # Palette couleur globale
 # ------------------------------------
@@ -127,7 +131,6 @@ fig = px.treemap(
     hover_data={'Nom_cinema': ':,'}
 )
 
-import plotly.graph_objects as go
 st.subheader("1. Treemap Interactif - Cinémas par Région")
 
 fig.update_traces(
@@ -153,8 +156,7 @@ fig.update_traces(
 
 #afficher le graphique numero 1
 
-fig.show()
-st.plotly_chart(fig)
+plotly_chart(fig)
 
 # Zone de texte commentaire graph numero 1
 st.markdown("""
@@ -166,26 +168,45 @@ On voit que l’Île-de-France concentre une grande partie de l’offre national
 
 st.divider()
 
-#Graphique numéro 2
-#Jointure graph
-pop_merge = pd.merge(cine_reg, freq_cine, left_on ='region_name', right_on='region', how='left')
+# Carte des cinémas : le fichier ne porte que le code commune INSEE et le nom
+# de la commune ; le géocodage de l'ingestion (source/geocoding.py) place les
+# cinémas à la position médiane des bibliothèques de leur commune
+# (precision_geo « commune_bibliotheques »). Ceux placés au seul centroïde de
+# leur code postal ou de leur département (coord_valide faux) ne sont pas
+# cartographiés.
+st.subheader("Carte des cinémas")
+
+# Carte produite en fin de page (source/progressive.py)
+deferred(
+    point_map,
+    "cinemas",
+    color='region_nom',
+    hover_name='Nom_cinema',
+    hover_data=['commune'],
+    labels={'commune': 'Commune', 'region_nom': 'Région'},
+    key="carte_cinemas",
+)
 
+st.markdown("""
+<div class="commentary-box">
+Les cinémas sont positionnés de façon approchée, à l'emplacement médian des bibliothèques de
+leur commune : plusieurs salles d'une même ville se superposent. Les cinémas d'une commune sans
+bibliothèque, ou dont la commune n'a pas été retrouvée, ne figurent pas sur la carte.
+</div>
+""", unsafe_allow_html=True)
 
-pop_merge= pop_merge[['region', 'Nom_cinema', '2023']]
+st.divider()
 
-pop_merge = pop_merge.groupby('region', as_index=False).agg({
-    '2023': 'sum',
-    'Nom_cinema': 'first',  # ou 'count', 'max', etc.
-    'region': 'first'
-})
+#Graphique numéro 2
+#Jointure graph
+pop_merge = pd.merge(cine_reg, freq_cine[['region_code', '2023']], on='region_code', how='left')
 
-pop_merge = pop_merge.iloc[:, :3]
-pop_merge.columns = ['frequentation_2023', 'nombre_cinemas', 'region']
-pop_merge = pop_merge[['region', 'nombre_cinemas', 'frequentation_2023']]
+pop_merge = pop_merge[['region_nom', 'Nom_cinema', '2023']]
+pop_merge.columns = ['region', 'nombre_cinemas', 'frequentation_2023']
 
 pop_merge = pop_merge.sort_values(by='nombre_cinemas', ascending=False)
 
-pop_merge['region'] = pop_merge['region'].str.title()
+pop_merge['region'] = pop_merge['region'].astype(str)
 
 st.subheader("2. Cinémas et Fréquentation par Région - 2023")
 
@@ -255,7 +276,7 @@ fig.update_layout(
 )
 
 
-st.plotly_chart(fig, use_container_width=True)
+plotly_chart(fig, use_container_width=True)
 
 # Zone de texte commentaire graph numero 2
 st.markdown("""
@@ -267,150 +288,143 @@ Certaines régions ont peu de cinémas mais attirent un public proportionnelleme
 
 st.divider()
 
+# Sections sous la ligne de flottaison : calculées une fois dépliées
 #Graphique numéro 3
-#Introduction du graphe
-
-# Remplacer les virgules par des points et convertir en float
-dffr["Entrées (millions)"] = dffr["Entrées (millions)"].str.replace(",", ".").astype(float)
-dffr["Recette moyenne par entrée (€)"] = dffr["Recette moyenne par entrée (€)"].str.replace(",", ".").astype(float)
-
-# Filtrer et trier les 10 dernières années
-df_filtered = dffr[dffr["Année"] >= 2015].sort_values("Année")
-
-st.subheader("3. Fréquentation vs Prix moyen du billet (2015–2024)")
-# Créer la figure
-fig = go.Figure()
-
-# Barres : Entrées (millions)
-fig.add_trace(go.Bar(
-    x=df_filtered["Année"],
-    y=df_filtered["Entrées (millions)"],
-    name="Entrées (millions)",
-    yaxis="y1",
-    marker_color="#312E60"
-))
-
-# Courbe : Prix moyen (€)
-fig.add_trace(go.Scatter(
-    x=df_filtered["Année"],
-    y=df_filtered["Recette moyenne par entrée (€)"],
-    name="Prix moyen (€)",
-    yaxis="y2",
-    mode="lines+markers",
-    line=dict(color="#FF0066", width=3)
-))
-
-# Mise en page
-fig.update_layout(
-    # title="Fréquentation vs Prix moyen du billet (2015–2024)",
-    xaxis=dict(title="Année", type="category"),  # affichage lisible
-    yaxis=dict(
-        title=dict(text="Entrées (millions)", font=dict(color="#312E60")),
-        tickfont=dict(color="#312E60")
-    ),
-    yaxis2=dict(
-        title=dict(text="Prix moyen (€)", font=dict(color="#FF0066")),
-        tickfont=dict(color="#FF0066"),
-        overlaying="y",
-        side="right"
-    ),
-    legend=dict(x=0.01, y=0.99),
-    bargap=0.2
-)
-st.plotly_chart(fig)
-
-# Zone de texte commentaire graph numero 3
-st.markdown("""
-<div class="commentary-box">
-L’augmentation du prix du billet ne freine pas la fréquentation, sauf en 2020 à cause de la pandémie. 
-Le public est revenu dès la réouverture des salles.
-</div>
-""", unsafe_allow_html=True)
-
-st.divider()
+with lazy_section("3. Fréquentation vs Prix moyen du billet (2015–2024)", key="section_prix") as ouverte:
+    if ouverte:
+        dffr = load_frequentation_cinemas()
+
+        # Filtrer et trier les 10 dernières années
+        df_filtered = dffr[dffr["Année"] >= 2015].sort_values("Année")
+
+        # Créer la figure
+        fig = go.Figure()
+
+        # Barres : Entrées (millions)
+        fig.add_trace(go.Bar(
+            x=df_filtered["Année"],
+            y=df_filtered["Entrées (millions)"],
+            name="Entrées (millions)",
+            yaxis="y1",
+            marker_color="#312E60"
+        ))
+
+        # Courbe : Prix moyen (€)
+        fig.add_trace(go.Scatter(
+            x=df_filtered["Année"],
+            y=df_filtered["Recette moyenne par entrée (€)"],
+            name="Prix moyen (€)",
+            yaxis="y2",
+            mode="lines+markers",
+            line=dict(color="#FF0066", width=3)
+        ))
+
+        # Mise en page
+        fig.update_layout(
+            # title="Fréquentation vs Prix moyen du billet (2015–2024)",
+            xaxis=dict(title="Année", type="category"),  # affichage lisible
+            yaxis=dict(
+                title=dict(text="Entrées (millions)", font=dict(color="#312E60")),
+                tickfont=dict(color="#312E60")
+            ),
+            yaxis2=dict(
+                title=dict(text="Prix moyen (€)", font=dict(color="#FF0066")),
+                tickfont=dict(color="#FF0066"),
+                overlaying="y",
+                side="right"
+            ),
+            legend=dict(x=0.01, y=0.99),
+            bargap=0.2
+        )
+        plotly_chart(fig)
+
+        # Zone de texte commentaire graph numero 3
+        st.markdown("""
+        <div class="commentary-box">
+        L’augmentation du prix du billet ne freine pas la fréquentation, sauf en 2020 à cause de la pandémie. 
+        Le public est revenu dès la réouverture des salles.
+        </div>
+        """, unsafe_allow_html=True)
 
 #Graphique numero 4
-# Charger les données depuis le fichier CSV
-df = pd.read_csv('data_prod/frequentation par région et prix moyen.csv', sep=';')
-
-# Renommer la première colonne si nécessaire
-df.columns = ['Annee', 'Auvergne-Rhone-Alpes', 'Corse', 'Hauts-de-France', 'Ile-de-France', 'PRIX']
-
-# Convertir les colonnes en numérique (gérer les virgules comme séparateurs décimaux)
-numeric_columns = ['Auvergne-Rhone-Alpes', 'Corse', 'Hauts-de-France', 'Ile-de-France', 'PRIX']
-for col in numeric_columns:
-    df[col] = df[col].astype(str).str.replace(',', '.').astype(float)
-
-# S'assurer que la colonne Année est aussi numérique
-df['Annee'] = df['Annee'].astype(int)
-
-st.subheader("4. Fréquentation par Région et Prix Moyen (2014-2024)")
-
-# Créer un subplot avec deux axes y
-fig = make_subplots(specs=[[{"secondary_y": True}]])
-
-# Couleurs pour les régions
-colors = ['#312E60', '#EC4899', '#8B5CF6', '#E879F9']
-regions = ['Ile-de-France', 'Auvergne-Rhone-Alpes', 'Hauts-de-France', 'Corse']
-
-# Ajouter les barres empilées pour chaque région
-for i, region in enumerate(regions):
-    fig.add_trace(
-        go.Bar(
-            name=region,
-            x=df['Annee'],
-            y=df[region],
-            marker_color=colors[i],
-            opacity=1
-        ),
-        secondary_y=False,
-    )
-
-# Ajouter la ligne de prix sur l'axe secondaire
-fig.add_trace(
-    go.Scatter(
-        name='Prix',
-        x=df['Annee'],
-        y=df['PRIX'],
-        mode='lines+markers',
-        line=dict(color='#FF1493', width=3),
-        marker=dict(size=8)
-    ),
-    secondary_y=True,
-)
-
-# Mettre à jour les axes
-fig.update_xaxes(title_text="Année")
-fig.update_yaxes(title_text="Fréquentation en millions", secondary_y=False)
-fig.update_yaxes(title_text="Prix (€)", secondary_y=True)
-
-# Mettre à jour le layout
-fig.update_layout(
-    # title={
-    #     'text': 'Fréquentation par Région et Prix Moyen (2014-2024)',
-    #     'x': 0.5,
-    #     'xanchor': 'center',
-    #     'font': {'size': 18}
-    # },
-    barmode='stack',
-    hovermode='x unified',
-    legend=dict(
-        orientation="h",
-        yanchor="bottom",
-        y=1.02,
-        xanchor="right",
-        x=1
-    ),
-    height=600,
-    showlegend=True
-)
-
-# Afficher le graphique dans Streamlit
-st.plotly_chart(fig, use_container_width=True)
-
-# Zone de texte commentaire graph numero 4
-st.markdown("""
-<div class="commentary-box">
-Vue détaillée sur 4 régions : malgré une hausse continue du prix moyen de la place, cela n'a pas changé les proportions de fréquentation par région. Il aurait été intéressant de pouvoir voir le lien entre ces données et le revenu moyen par région.
-</div>
-""", unsafe_allow_html=True)
+with lazy_section("4. Fréquentation par Région et Prix Moyen (2014-2024)", key="section_regions_prix") as ouverte:
+    if ouverte:
+        # Charger les données depuis le fichier CSV
+        df = load_frequentation_cinemas_prix()
+
+        # Renommer la première colonne si nécessaire
+        df.columns = ['Annee', 'Auvergne-Rhone-Alpes', 'Corse', 'Hauts-de-France', 'Ile-de-France', 'PRIX']
+
+        # Colonnes numériques lues au format français à l'ingestion (source/schemas.py)
+
+        # Créer un subplot avec deux axes y
+        fig = make_subplots(specs=[[{"secondary_y": True}]])
+
+        # Couleurs pour les régions
+        colors = ['#312E60', '#EC4899', '#8B5CF6', '#E879F9']
+        regions = ['Ile-de-France', 'Auvergne-Rhone-Alpes', 'Hauts-de-France', 'Corse']
+
+        # Ajouter les barres empilées pour chaque région
+        for i, region in enumerate(regions):
+            fig.add_trace(
+                go.Bar(
+                    name=region,
+                    x=df['Annee'],
+                    y=df[region],
+                    marker_color=colors[i],
+                    opacity=1
+                ),
+                secondary_y=False,
+            )
+
+        # Ajouter la ligne de prix sur l'axe secondaire
+        fig.add_trace(
+            go.Scatter(
+                name='Prix',
+                x=df['Annee'],
+                y=df['PRIX'],
+                mode='lines+markers',
+                line=dict(color='#FF1493', width=3),
+                marker=dict(size=8)
+            ),
+            secondary_y=True,
+        )
+
+        # Mettre à jour les axes
+        fig.update_xaxes(title_text="Année")
+        fig.update_yaxes(title_text="Fréquentation en millions", secondary_y=False)
+        fig.update_yaxes(title_text="Prix (€)", secondary_y=True)
+
+        # Mettre à jour le layout
+        fig.update_layout(
+            # title={
+            #     'text': 'Fréquentation par Région et Prix Moyen (2014-2024)',
+            #     'x': 0.5,
+            #     'xanchor': 'center',
+            #     'font': {'size': 18}
+            # },
+            barmode='stack',
+            hovermode='x unified',
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=1.02,
+                xanchor="right",
+                x=1
+            ),
+            height=600,
+            showlegend=True
+        )
+
+        # Afficher le graphique dans Streamlit
+        plotly_chart(fig, use_container_width=True)
+
+        # Zone de texte commentaire graph numero 4
+        st.markdown("""
+        <div class="commentary-box">
+        Vue détaillée sur 4 régions : malgré une hausse continue du prix moyen de la place, cela n'a pas changé les proportions de fréquentation par région. Il aurait été intéressant de pouvoir voir le lien entre ces données et le revenu moyen par région.
+        </div>
+        """, unsafe_allow_html=True)
+
+# Graphiques réservés plus haut (carte des cinémas)
+render_deferred()
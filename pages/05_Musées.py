@@ -1,14 +1,20 @@
 import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
-import matplotlib.pyplot as plt
-import os
-import seaborn as sns
-from matplotlib.ticker import FuncFormatter, MultipleLocator
 import numpy as np
 import warnings
 import streamlit as st
 
+from source.charts import (
+    figure_frequentation_annees,
+    figure_frequentation_regions,
+    figure_payant_gratuit,
+)
+from source.data import load_frequentation_musees, load_musees
+from source.figures import pyplot_chart, render_pending
+from source.maps import MAP_BACKEND, cluster_map, cluster_rows
+from source.payload import plotly_chart
+from source.regions import OUTRE_MER
+
 # st.title("LES MUSEES :european_post_office:")
 
 # ------------------------------------
@@ -35,32 +41,14 @@ st.markdown(
 
 
 # Charger les données
-df = pd.read_csv('data_prod/museecleaned.csv', sep=',')
-
-# Parser coordonnées
-def get_coords(coord_str):
-    try:
-        lat, lon = str(coord_str).split(',')
-        return float(lat), float(lon)
-    except:
-        return None, None
-
-coords = df['Coordonnees'].apply(get_coords)
-df['lat'] = [c[0] for c in coords]
-df['lon'] = [c[1] for c in coords]
+df = load_musees()
 
-# Nettoyer
-df = df.dropna(subset=['lat', 'lon'])
+# Coordonnées lat/lon parsées à l'ingestion (source/coordinates.py)
+df = df[df['coord_valide']]
 
-# Méthode simple : remplacer directement les noms problématiques
-df.loc[df['Region'].str.contains('Provence-Alpes-Côte', na=False), 'Region'] = 'PACA'
-df.loc[df['Region'].str.contains('Nouvelle Aquitaine', na=False), 'Region'] = 'Nouvelle-Aquitaine'
-df.loc[df['Region'] == 'Pays-de-la-Loire', 'Region'] = 'Pays de la Loire'
-df.loc[df['Region'] == 'Ile-de-France', 'Region'] = 'Île-de-France'
-df.loc[df['Region'] == 'Centre', 'Region'] = 'Centre-Val de Loire'
-
-# Supprimer COM et DROM
-df = df[~df['Region'].isin(['COM', 'DROM'])]
+# Régions normalisées à l'ingestion (colonne region_nom) : supprimer COM et DROM
+df = df[df['region_code'] != OUTRE_MER]
+df['region_nom'] = df['region_nom'].cat.remove_unused_categories()
 
 # Couleurs
 colors = {
@@ -70,7 +58,7 @@ colors = {
     'Occitanie': '#312E60',
     'Hauts-de-France': '#442A60',
     'Grand Est': '#003366',
-    'PACA': '#5A2D70',
+    "Provence-Alpes-Côte d'Azur": '#5A2D70',
     'Pays de la Loire': '#1A4070',
     'Normandie': '#483580',
     'Bourgogne-Franche-Comté': '#2E4080',
@@ -79,29 +67,28 @@ colors = {
     'Corse': '#4A3285'
 }
 
-# Carte
-fig1 = px.scatter_mapbox(
-    df, lat='lat', lon='lon', color='Region',
-    color_discrete_map=colors,
-    hover_name='Nom_officiel',
-    title="Musées de France"
-)
-
-fig1.update_layout(
-    mapbox_style="open-street-map",
-    mapbox_center_lat=46.2,
-    mapbox_center_lon=2.2,
-    mapbox_zoom=4.8,
-    height=800
-)
-st.plotly_chart(fig1)
+# Carte : regroupement dans le navigateur si MAP_BACKEND=folium (source/maps.py)
+if MAP_BACKEND == "folium":
+    rows, values = cluster_rows(df, 'region_nom', 'Nom_officiel')
+    cluster_map(rows, values, colors, center={"lat": 46.2, "lon": 2.2}, key="carte_musees", height=800)
+else:
+    fig1 = px.scatter_mapbox(
+        df, lat='lat', lon='lon', color='region_nom',
+        color_discrete_map=colors,
+        hover_name='Nom_officiel',
+        title="Musées de France"
+    )
+
+    fig1.update_layout(
+        mapbox_style="open-street-map",
+        mapbox_center_lat=46.2,
+        mapbox_center_lon=2.2,
+        mapbox_zoom=4.8,
+        height=800
+    )
+    plotly_chart(fig1)
 
 ###############################
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-import streamlit as st
-import warnings
 warnings.filterwarnings('ignore')
 
 def analyze_museum_attendance_by_region():
@@ -109,21 +96,12 @@ def analyze_museum_attendance_by_region():
     Analyse la fréquentation des musées par région à partir du dataset data.gouv.fr
     """
     
-    # Palette de couleurs EXACTEMENT comme votre code
-    colors = ["#002244", "#4F2860", "#2A3060", "#312E60", "#442A60", "#FF0066"]
-    
     try:
         # Charger le dataset de fréquentation
-        df = pd.read_csv('data_prod/frequentation-des-musees-de-france.csv', sep=';')
+        df = load_frequentation_musees()
         
-        # Identifier les colonnes importantes
-        if 'REGION' in df.columns:
-            region_col = 'REGION'
-        elif 'Region' in df.columns:
-            region_col = 'Region'
-        else:
-            st.error("❌ Colonne région non trouvée")
-            return
+        # Région canonique calculée à l'ingestion (anciennes régions, DOM-TOM...)
+        region_col = 'region_nom'
         
         # Identifier les colonnes de fréquentation (années)
         freq_cols = [col for col in df.columns if col.isdigit() or 
@@ -134,38 +112,6 @@ def analyze_museum_attendance_by_region():
             freq_cols = [col for col in df.columns if 
                         any(word in col.upper() for word in ['TOTAL', 'GRATUIT', 'PAYANT', 'FREQUENTATION'])]
         
-        # Nettoyer les noms de régions - MÊME MÉTHODE que votre code
-        
-        # Nettoyer les régions - méthode simple
-        df[region_col] = df[region_col].str.strip()
-        
-        # Remplacements directs pour toutes les variations
-        df.loc[df[region_col].str.contains('Provence-Alpes-Côte', na=False), region_col] = 'PACA'
-        df.loc[df[region_col].str.contains('Aquitaine', na=False), region_col] = 'Nouvelle-Aquitaine'
-        df.loc[df[region_col].str.contains('Rhône-Alpes', na=False), region_col] = 'Auvergne-Rhône-Alpes'
-        df.loc[df[region_col].str.contains('Auvergne', na=False), region_col] = 'Auvergne-Rhône-Alpes'
-        df.loc[df[region_col].str.contains('Languedoc', na=False), region_col] = 'Occitanie'
-        df.loc[df[region_col].str.contains('Midi-Pyrénées', na=False), region_col] = 'Occitanie'
-        df.loc[df[region_col].str.contains('Nord-Pas', na=False), region_col] = 'Hauts-de-France'
-        df.loc[df[region_col].str.contains('Picardie', na=False), region_col] = 'Hauts-de-France'
-        df.loc[df[region_col].str.contains('Alsace', na=False), region_col] = 'Grand Est'
-        df.loc[df[region_col].str.contains('Lorraine', na=False), region_col] = 'Grand Est'
-        df.loc[df[region_col].str.contains('Champagne', na=False), region_col] = 'Grand Est'
-        df.loc[df[region_col].str.contains('Bourgogne', na=False), region_col] = 'Bourgogne-Franche-Comté'
-        df.loc[df[region_col].str.contains('Franche-Comté', na=False), region_col] = 'Bourgogne-Franche-Comté'
-        df.loc[df[region_col].str.contains('Normandie', na=False), region_col] = 'Normandie'
-        df.loc[df[region_col].str.contains('Limousin', na=False), region_col] = 'Nouvelle-Aquitaine'
-        df.loc[df[region_col].str.contains('Poitou', na=False), region_col] = 'Nouvelle-Aquitaine'
-        
-        # Corrections simples
-        df.loc[df[region_col] == 'Pays-de-la-Loire', region_col] = 'Pays de la Loire'
-        df.loc[df[region_col] == 'Ile-de-France', region_col] = 'Île-de-France'
-        df.loc[df[region_col] == 'Centre', region_col] = 'Centre-Val de Loire'
-        
-        # Regrouper DOM-TOM
-        dom_tom = ['COM', 'DROM', 'Guadeloupe', 'Martinique', 'Guyane', 'La Réunion', 'Mayotte']
-        df.loc[df[region_col].isin(dom_tom), region_col] = 'DOM-TOM'
-        
         # Calculer la fréquentation totale par région
         
         # Méthode 1: Si on a des colonnes numériques directes
@@ -181,7 +127,7 @@ def analyze_museum_attendance_by_region():
                 df['Frequentation_Calculee'] = df[freq_cols].sum(axis=1)
             
             # Grouper par région
-            region_stats = df.groupby(region_col).agg({
+            region_stats = df.groupby(region_col, observed=True).agg({
                 'Frequentation_Calculee': 'sum',
                 'NOM DU MUSEE': 'count'  # Compter les musées
             }).reset_index()
@@ -196,97 +142,15 @@ def analyze_museum_attendance_by_region():
         # Trier par fréquentation
         region_stats = region_stats.sort_values('Total_Visiteurs', ascending=True)
         
-        # Créer les graphiques côte à côte
-        plt.style.use('default')  # Fond blanc
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(18, 8))
-        
-        # Graphique 1: Nombre de musées par région
+        # Nombre de musées par région (régions normalisées à l'ingestion)
         try:
-            df_musees = pd.read_csv("notebook/data/museecleaned.csv")
-            
-            # Appliquer EXACTEMENT votre nettoyage
-            df_musees['Region'] = df_musees['Region'].str.strip()
-            df_musees.loc[df_musees['Region'].str.contains('Provence-Alpes-Côte', na=False), 'Region'] = 'PACA'
-            df_musees.loc[df_musees['Region'].str.contains('Aquitaine', na=False), 'Region'] = 'Nouvelle-Aquitaine'
-            df_musees.loc[df_musees['Region'].str.contains('Rhône-Alpes', na=False), 'Region'] = 'Auvergne-Rhône-Alpes'
-            df_musees.loc[df_musees['Region'].str.contains('Auvergne', na=False), 'Region'] = 'Auvergne-Rhône-Alpes'
-            df_musees.loc[df_musees['Region'].str.contains('Languedoc', na=False), 'Region'] = 'Occitanie'
-            df_musees.loc[df_musees['Region'].str.contains('Midi-Pyrénées', na=False), 'Region'] = 'Occitanie'
-            df_musees.loc[df_musees['Region'].str.contains('Nord-Pas', na=False), 'Region'] = 'Hauts-de-France'
-            df_musees.loc[df_musees['Region'].str.contains('Picardie', na=False), 'Region'] = 'Hauts-de-France'
-            df_musees.loc[df_musees['Region'].str.contains('Alsace', na=False), 'Region'] = 'Grand Est'
-            df_musees.loc[df_musees['Region'].str.contains('Lorraine', na=False), 'Region'] = 'Grand Est'
-            df_musees.loc[df_musees['Region'].str.contains('Champagne', na=False), 'Region'] = 'Grand Est'
-            df_musees.loc[df_musees['Region'].str.contains('Bourgogne', na=False), 'Region'] = 'Bourgogne-Franche-Comté'
-            df_musees.loc[df_musees['Region'].str.contains('Franche-Comté', na=False), 'Region'] = 'Bourgogne-Franche-Comté'
-            df_musees.loc[df_musees['Region'].str.contains('Normandie', na=False), 'Region'] = 'Normandie'
-            df_musees.loc[df_musees['Region'].str.contains('Limousin', na=False), 'Region'] = 'Nouvelle-Aquitaine'
-            df_musees.loc[df_musees['Region'].str.contains('Poitou', na=False), 'Region'] = 'Nouvelle-Aquitaine'
-            df_musees.loc[df_musees['Region'] == 'Pays-de-la-Loire', 'Region'] = 'Pays de la Loire'
-            df_musees.loc[df_musees['Region'] == 'Ile-de-France', 'Region'] = 'Île-de-France'
-            df_musees.loc[df_musees['Region'] == 'Centre', 'Region'] = 'Centre-Val de Loire'
-            dom_tom = ['COM', 'DROM', 'Guadeloupe', 'Martinique', 'Guyane', 'La Réunion', 'Mayotte']
-            df_musees.loc[df_musees['Region'].isin(dom_tom), 'Region'] = 'DOM-TOM'
-            
-            # Compter par région
-            stats_musees = df_musees['Region'].value_counts().reset_index()
+            df_musees = load_musees()
+            stats_musees = df_musees['region_nom'].value_counts().reset_index()
             stats_musees.columns = ['Région', 'Nombre_musées']
             stats_musees = stats_musees.sort_values('Nombre_musées', ascending=True)
-            
-            # Graphique nombre de musées
-            bar_colors = (colors * 10)[:len(stats_musees)]
-            bars1 = ax1.barh(stats_musees['Région'], stats_musees['Nombre_musées'], 
-                            color=bar_colors, alpha=0.8, edgecolor='black')
-            
-            for bar, value in zip(bars1, stats_musees['Nombre_musées']):
-                ax1.text(value + max(stats_musees['Nombre_musées']) * 0.01, 
-                        bar.get_y() + bar.get_height()/2, 
-                        f'{int(value)}', va='center', fontweight='bold', color='black')
-            
-            ax1.set_title('Nombre de Musées par Région', 
-                         fontsize=16, fontweight='bold', color='black')
-            ax1.set_xlabel('Nombre de musées', fontsize=12, color='black')
-            ax1.grid(axis='x', alpha=0.3)
-            
-            # MODIFICATION PRINCIPALE : Utiliser l'ordre du premier graphique pour le second
-            # Graphique 2: Moyenne visiteurs par musée avec le même ordre que le graphique 1
-            if 'Nb_Musées' in region_stats.columns:
-                # Fusionner les données
-                comparison = region_stats.merge(stats_musees, on='Région', how='inner')
-                comparison['Moy_Visiteurs_Musee'] = comparison['Total_Visiteurs'] / comparison['Nombre_musées']
-                
-                # CLEF : Réordonner selon l'ordre du premier graphique (stats_musees)
-                # Créer un mapping d'ordre basé sur le premier graphique
-                order_mapping = {region: idx for idx, region in enumerate(stats_musees['Région'])}
-                comparison['order'] = comparison['Région'].map(order_mapping)
-                comparison = comparison.sort_values('order')
-                
-                bar_colors2 = (colors * 10)[:len(comparison)]
-                bars2 = ax2.barh(comparison['Région'], comparison['Moy_Visiteurs_Musee']/1000, 
-                                color=bar_colors2, alpha=0.8, edgecolor='black')
-                
-                for bar, value in zip(bars2, comparison['Moy_Visiteurs_Musee']):
-                    ax2.text(value/1000 + max(comparison['Moy_Visiteurs_Musee'])/1000 * 0.01, 
-                            bar.get_y() + bar.get_height()/2, 
-                            f'{value/1000:.0f}k', va='center', fontweight='bold', color='black')
-                
-                ax2.set_title('Moyenne Visiteurs par Musée (en milliers)', 
-                             fontsize=16, fontweight='bold', color='black')
-                ax2.set_xlabel('Visiteurs/Musée (Milliers)', fontsize=12, color='black')
-                ax2.grid(axis='x', alpha=0.3)
-            else:
-                ax2.text(0.5, 0.5, 'Données insuffisantes\npour le calcul', 
-                        transform=ax2.transAxes, ha='center', va='center', 
-                        color='black', fontsize=12)
-        
         except:
-            ax1.text(0.5, 0.5, 'Fichier museecleaned.csv\nnon trouvé', 
-                    transform=ax1.transAxes, ha='center', va='center', 
-                    color='black', fontsize=12)
-            ax2.text(0.5, 0.5, 'Fichier museecleaned.csv\nnon trouvé', 
-                    transform=ax2.transAxes, ha='center', va='center', 
-                    color='black', fontsize=12)
-        
+            stats_musees = None
+
         # Afficher les KPI en haut de page
         total_visiteurs = region_stats['Total_Visiteurs'].sum()
         
@@ -305,11 +169,11 @@ def analyze_museum_attendance_by_region():
         # Titre avant le graphique
         st.write("## 📊 FRÉQUENTATION DES MUSÉES PAR RÉGION")
         
-        fig.patch.set_facecolor('white')
-        plt.tight_layout()
-        
-        # Afficher le graphique dans Streamlit avec matplotlib
-        st.pyplot(fig)
+        # Image mise en cache (source/figures.py), style appliqué le temps du rendu
+        pyplot_chart(
+            "frequentation_musees_regions", figure_frequentation_regions,
+            region_stats, stats_musees, style='default',
+        )
         
         return region_stats
         
@@ -329,10 +193,6 @@ if __name__ == "__main__":
     if results is None:
         st.error("❌ Analyse échouée - Vérifiez le fichier de données")
         #############################
-import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
-import streamlit as st
 
 def afficher_frequentation_musees():
     """Affiche l'analyse de fréquentation des musées pour Streamlit"""
@@ -376,55 +236,12 @@ def afficher_frequentation_musees():
         baisse_covid = ((frequentation[-4] - frequentation[-3]) / frequentation[-4] * 100)
         st.metric("🦠 Baisse COVID 2020", f"{baisse_covid:.1f}%")
 
-    # Configuration du graphique principal
-    plt.style.use('dark_background')
-    fig, ax1 = plt.subplots(1, 1, figsize=(14, 8))
-
-    # === GRAPHIQUE: Barres avec gradient ===
-    colors_bars = [couleurs['bleu_nuit'], couleurs['violet_sombre'], couleurs['bleu_violet'], 
-                   couleurs['violet_bleute'], couleurs['violet_fonce']]
-
-    bars = ax1.bar(annees, frequentation, 
-                   color=[colors_bars[i % len(colors_bars)] for i in range(len(annees))],
-                   alpha=0.9, edgecolor=couleurs['rose_vif'], linewidth=2)
-
-    # Ligne de tendance polynomiale
-    z = np.polyfit(annees, frequentation, 3)
-    p = np.poly1d(z)
-    smooth_years = np.linspace(annees.min(), annees.max(), 100)
-    ax1.plot(smooth_years, p(smooth_years), color=couleurs['rose_vif'], 
-             linewidth=4, linestyle='--', alpha=0.9, label='Tendance')
-
-    # Personnalisation graphique
-    ax1.set_title('Fréquentation des Musées de France 2001-2022 (Dataset data.gouv.fr)', 
-                  fontsize=18, fontweight='bold', color='white', pad=20)
-    ax1.set_ylabel('Fréquentation (millions de visiteurs)', fontsize=12, color='white')
-    ax1.set_xlabel('Année', fontsize=12, color='white')
-
-    # Ajout des valeurs sur les barres
-    for bar, value in zip(bars, frequentation):
-        height = bar.get_height()
-        ax1.text(bar.get_x() + bar.get_width()/2., height + 1,
-                f'{value:.1f}M', ha='center', va='bottom', 
-                color='white', fontweight='bold', fontsize=9)
-
-    # Annotation pour l'impact COVID
-    ax1.annotate('Impact COVID-19', xy=(2020, 45.3), xytext=(2018, 40),
-                 arrowprops=dict(arrowstyle='->', color=couleurs['rose_vif'], lw=2),
-                 color=couleurs['rose_vif'], fontsize=11, fontweight='bold')
-
-    ax1.grid(True, alpha=0.3, color='white', linestyle='-', linewidth=0.5)
-    ax1.set_facecolor('#0f0f0f')
-    ax1.tick_params(colors='white', labelsize=10)
-    ax1.legend(loc='upper left', framealpha=0.8)
-    ax1.set_ylim(0, max(frequentation) * 1.2)
-
-    # Configuration générale
-    fig.patch.set_facecolor('#0f0f0f')
-    plt.tight_layout(pad=3.0)
-
-    # Afficher le graphique dans Streamlit
-    st.pyplot(fig)
+    # Graphique principal : image mise en cache (source/figures.py), fond
+    # sombre appliqué le temps du rendu seulement
+    pyplot_chart(
+        "frequentation_musees_annees", figure_frequentation_annees,
+        annees, frequentation, couleurs, style='dark_background',
+    )
 
     # Afficher les statistiques avec Streamlit
     st.write("## 📊 STATISTIQUES FRÉQUENTATION MUSÉES DE FRANCE")
@@ -484,12 +301,6 @@ if __name__ == "__main__":
 
 ###########################################################################
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-import streamlit as st
-import warnings
-warnings.filterwarnings('ignore')
 
 def analyze_payant_gratuit():
     """Analyse la répartition payant/gratuit des musées par région"""
@@ -499,113 +310,24 @@ def analyze_payant_gratuit():
     
     try:
         # Charger le dataset de fréquentation
-        df = pd.read_csv('notebook/data/frequentation-des-musees-de-france.csv', sep=';')
-        
-        # Créer une copie pour travailler
-        df['REGION_CLEAN'] = df['REGION'].str.strip().str.upper()
-        
-        # ÉTAPE 1: Regrouper toutes les anciennes régions en une seule fois
-        # DOM-TOM d'abord (TRÈS IMPORTANT - avant tout autre traitement)
-        dom_tom_keywords = ['COM', 'DROM', 'GUADELOUPE', 'MARTINIQUE', 'GUYANE', 'REUNION', 'RÉUNION', 'MAYOTTE', 
-                           'CALEDONIE', 'POLYNESIE', 'SAINT', 'WALLIS', 'MIQUELON', 'LA REUNION', 'LA RÉUNION']
-        for keyword in dom_tom_keywords:
-            df.loc[df['REGION_CLEAN'].str.contains(keyword, na=False), 'REGION_CLEAN'] = 'DOM-TOM'
-        
-        # DOM-TOM par égalité exacte aussi (pour être sûr)
-        dom_tom_exact = ['LA REUNION', 'LA RÉUNION', 'REUNION', 'RÉUNION', 'GUADELOUPE', 'MARTINIQUE', 
-                        'GUYANE', 'MAYOTTE', 'COM', 'DROM']
-        for exact_name in dom_tom_exact:
-            df.loc[df['REGION_CLEAN'] == exact_name, 'REGION_CLEAN'] = 'DOM-TOM'
-        
-        # ÉTAPE 2: Mapper vers les 13 régions (ordre important!)
-        mappings_direct = {
-            # Île-de-France (toutes variations)
-            'ILE': 'ÎLE-DE-FRANCE',
-            'ÎLE': 'ÎLE-DE-FRANCE',
-            
-            # Auvergne-Rhône-Alpes
-            'AUVERGNE': 'AUVERGNE-RHÔNE-ALPES',
-            'RHONE': 'AUVERGNE-RHÔNE-ALPES',
-            'RHÔNE': 'AUVERGNE-RHÔNE-ALPES',
-            
-            # Grand Est (avant les autres "EST")
-            'ALSACE': 'GRAND EST',
-            'LORRAINE': 'GRAND EST', 
-            'CHAMPAGNE': 'GRAND EST',
-            
-            # Hauts-de-France
-            'NORD': 'HAUTS-DE-FRANCE',
-            'PICARDIE': 'HAUTS-DE-FRANCE',
-            
-            # Nouvelle-Aquitaine
-            'AQUITAINE': 'NOUVELLE-AQUITAINE',
-            'LIMOUSIN': 'NOUVELLE-AQUITAINE',
-            'POITOU': 'NOUVELLE-AQUITAINE',
-            
-            # Occitanie
-            'LANGUEDOC': 'OCCITANIE',
-            'MIDI': 'OCCITANIE',
-            'ROUSSILLON': 'OCCITANIE',
-            'PYRENEES': 'OCCITANIE',
-            'PYRÉNÉES': 'OCCITANIE',
-            
-            # PACA
-            'PROVENCE': 'PROVENCE-ALPES-CÔTE D\'AZUR',
-            'PACA': 'PROVENCE-ALPES-CÔTE D\'AZUR',
-            'AZUR': 'PROVENCE-ALPES-CÔTE D\'AZUR',
-            
-            # Normandie
-            'NORMANDIE': 'NORMANDIE',
-            'BASSE-NORMANDIE': 'NORMANDIE',
-            'HAUTE-NORMANDIE': 'NORMANDIE',
-            
-            # Bourgogne-Franche-Comté
-            'BOURGOGNE': 'BOURGOGNE-FRANCHE-COMTÉ',
-            'FRANCHE': 'BOURGOGNE-FRANCHE-COMTÉ',
-            
-            # Pays de la Loire
-            'PAYS': 'PAYS DE LA LOIRE',
-            
-            # Centre-Val de Loire
-            'CENTRE': 'CENTRE-VAL DE LOIRE'
-        }
-        
-        # Appliquer les mappings
-        for keyword, region_finale in mappings_direct.items():
-            df.loc[df['REGION_CLEAN'].str.contains(keyword, na=False), 'REGION_CLEAN'] = region_finale
-        
-        # ÉTAPE 3: Nettoyer les noms exacts restants
-        exact_mappings = {
-            'GRAND-EST': 'GRAND EST',
-            'GRAND_EST': 'GRAND EST', 
-            'BRETAGNE': 'BRETAGNE',
-            'CORSE': 'CORSE'
-        }
+        df = load_frequentation_musees()
         
-        for old_name, new_name in exact_mappings.items():
-            df.loc[df['REGION_CLEAN'] == old_name, 'REGION_CLEAN'] = new_name
-        
-        # ÉTAPE 4: Forcer les derniers cas
-        df.loc[df['REGION_CLEAN'].str.contains('NOUVELLE', na=False), 'REGION_CLEAN'] = 'NOUVELLE-AQUITAINE'
-        
-        # Remettre en forme normale (Title Case)
-        df['REGION'] = df['REGION_CLEAN'].str.title().str.replace('Île', 'Île').str.replace('Côte', 'Côte')
-        
-        # Supprimer la colonne temporaire
-        df = df.drop('REGION_CLEAN', axis=1)
+        # Régions normalisées à l'ingestion : anciennes régions et DOM-TOM
+        # sont déjà rattachés aux 13 régions + outre-mer (colonne region_nom)
+        df['REGION'] = df['region_nom']
         
         # Vérification - doit être exactement 14 entités maximum
-        regions_finales = sorted(df['REGION'].unique())
+        regions_finales = df['REGION'].dropna().unique()
         
         if len(regions_finales) > 14:
             st.warning(f"⚠️ ATTENTION: {len(regions_finales)} régions détectées (au lieu de 14 max)")
         
-        # Convertir les colonnes numériques
-        df['PAYANT'] = pd.to_numeric(df['PAYANT'], errors='coerce').fillna(0)
-        df['GRATUIT'] = pd.to_numeric(df['GRATUIT'], errors='coerce').fillna(0)
+        # Colonnes numériques typées à l'ingestion (source/schemas.py)
+        df['PAYANT'] = df['PAYANT'].fillna(0)
+        df['GRATUIT'] = df['GRATUIT'].fillna(0)
         
         # Agrégation totale par région
-        region_totals = df.groupby('REGION').agg({
+        region_totals = df.groupby('REGION', observed=True).agg({
             'PAYANT': 'sum',
             'GRATUIT': 'sum'
         }).reset_index()
@@ -640,33 +362,8 @@ def analyze_payant_gratuit():
         # Créer le graphique
         st.write("## 📊 Répartition des entrées payantes vs gratuites par Région")
         
-        plt.figure(figsize=(14, 8))
-        
-        # Graphique empilé
-        x_pos = np.arange(len(region_totals))
-        bars1 = plt.bar(x_pos, region_totals['PAYANT']/1000000, 
-                       label='Payant', color=colors[0], alpha=0.8, edgecolor='black', linewidth=0.5)
-        bars2 = plt.bar(x_pos, region_totals['GRATUIT']/1000000, 
-                       bottom=region_totals['PAYANT']/1000000, 
-                       label='Gratuit', color=colors[5], alpha=0.8, edgecolor='black', linewidth=0.5)
-        
-        # Ajouter les valeurs totales sur les barres
-        for i, (bar1, bar2, row) in enumerate(zip(bars1, bars2, region_totals.itertuples())):
-            total = (row.PAYANT + row.GRATUIT) / 1000000
-            plt.text(bar1.get_x() + bar1.get_width()/2, total + 0.3,
-                     f'{total:.1f}M', ha='center', va='bottom', fontweight='bold', fontsize=10)
-        
-        plt.title('Répartition des entrées payantes vs gratuites par Région', fontsize=16, fontweight='bold', pad=20)
-        plt.ylabel('Visiteurs (Millions)', fontsize=12, fontweight='bold')
-        plt.xlabel('Région', fontsize=12, fontweight='bold')
-        plt.xticks(x_pos, region_totals['REGION'], rotation=45, ha='right', fontsize=10)
-        plt.legend(fontsize=12, loc='upper right')
-        plt.grid(True, alpha=0.3, axis='y', linestyle='--')
-        plt.tight_layout()
-        
-        # ✅ CORRECTION PRINCIPALE : Utiliser st.pyplot() au lieu de plt.show()
-        fig = plt.gcf()
-        st.pyplot(fig)
+        # Image mise en cache (source/figures.py) : la figure est fermée après rendu
+        pyplot_chart("payant_gratuit_regions", figure_payant_gratuit, region_totals, colors)
         
         # Affichage du classement détaillé
         st.write("## 🏆 CLASSEMENT PAR RÉGION")
@@ -716,7 +413,7 @@ def analyze_payant_gratuit():
         return region_totals
         
     except FileNotFoundError:
-        st.error("❌ Fichier 'frequentation-des-musees-de-france.csv' non trouvé dans 'notebook/data/'")
+        st.error("❌ Fichier 'frequentation-des-musees-de-france.csv' non trouvé dans 'data_prod/'")
         st.info("💡 Vérifiez que le fichier existe dans le bon répertoire")
         return None
     except Exception as e:
@@ -729,3 +426,6 @@ if __name__ == "__main__":
     results = analyze_payant_gratuit()
 
 ##################################################################
+
+# Images des graphiques rendus en parallèle (source/figures.py)
+render_pending()
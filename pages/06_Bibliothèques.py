@@ -5,9 +5,21 @@ Streamlit — Bibliothèques
 
 import pandas as pd
 import streamlit as st
-import matplotlib.pyplot as plt
-import numpy as np
-import plotly.express as px
+
+from source.data import load_bibliotheques, load_regions
+from source.boundaries import choropleth_map
+from source.charts import (
+    figure_dimanche,
+    figure_entrees,
+    figure_nombre,
+    figure_population,
+    figure_scatter,
+    figure_trois_facteurs,
+)
+from source.density import density_map
+from source.figures import pyplot_chart, render_pending
+from source.maps import point_map
+from source.regions import REGION_ABBR, REGION_LABELS
 
 # ------------------------------------
 # Configuration de la page
@@ -34,13 +46,12 @@ st.markdown(
 # ------------------------------------
 # Données
 # ------------------------------------
-biblio_file = pd.read_csv(
-    "data_prod/adresses_des_bibliotheques_publiques_prepared.csv", sep=','
-)
-population_file = pd.read_csv(
-    "data_prod/population-france-par-dept.csv", sep=';'
-)
-population_file.columns = population_file.columns.str.strip()  # éviter les espaces
+biblio_file = load_bibliotheques()
+# Abréviation de région dérivée de la clé entière calculée à l'ingestion
+biblio_file['Région'] = biblio_file['region_code'].map(REGION_ABBR)
+# Population par région, indexée par abréviation pour les jointures ci-dessous
+pop_regions = load_regions()[['region_code', 'region_abbr', 'population']]
+pop_regions.columns = ['region_code', 'nom_region', 'Total']
 
 # ------------------------------------
 # Palette et légende des régions
@@ -51,21 +62,10 @@ pastel_colors = [
     "#FF7678","#FF8D6C","#FF0066"
 ]
 
-region_labels = {
-    "ARA": "Auvergne-Rhône-Alpes",
-    "BFC": "Bourgogne-Franche-Comté",
-    "BRE": "Bretagne",
-    "CVL": "Centre-Val de Loire",
-    "DROM": "Départements & Régions d'Outre-Mer",
-    "GES": "Grand Est",
-    "HDF": "Hauts-de-France",
-    "IDF": "Île-de-France",
-    "NAQ": "Nouvelle-Aquitaine",
-    "NOR": "Normandie",
-    "OCC": "Occitanie",
-    "PACA": "Provence-Alpes-Côte d'Azur",
-    "PDL": "Pays de la Loire",
-}
+# Abréviations issues du référentiel commun des régions (source/regions.py),
+# limitées aux régions présentes dans le fichier
+regions_presentes = set(biblio_file['Région'].dropna().unique())
+region_labels = {abbr: nom for abbr, nom in REGION_LABELS.items() if abbr in regions_presentes}
 
 # Filtrer uniquement les régions présentes dans la légende
 region_order = [r for r in sorted(biblio_file['Région'].dropna().unique()) if r in region_labels]
@@ -139,30 +139,26 @@ st.divider()
 # ------------------------------------
 st.subheader("1. 🧭 Carte des bibliothèques en France par région")
 
-# Utiliser le fichier déjà chargé + filtrer les coordonnées manquantes
-df_map = biblio_file.dropna(subset=['Latitude', 'Longitude']).copy()
-
-# Couleurs par région (adaptées au nombre réel)
-regions_unique = df_map['Région'].unique().tolist()
-color_map = {r: c for r, c in zip(regions_unique, pastel_colors[:len(regions_unique)])}
-
-fig1 = px.scatter_mapbox(
-    df_map,
-    lat='Latitude',
-    lon='Longitude',
-    color='Région',
-    color_discrete_map=color_map,
+# Carte agrégée côté serveur (source/maps.py) : cellules de grille selon le
+# zoom, points individuels seulement pour une région assez petite
+couleurs_regions = {
+    REGION_LABELS[abbr]: pastel_colors[i % len(pastel_colors)]
+    for i, abbr in enumerate(region_labels)
+}
+point_map(
+    "bibliotheques",
+    color='region_nom',
     hover_name='Code_bib',
-    title="Bibliothèques en France par région"
-)
-fig1.update_layout(
-    mapbox_style="open-street-map",
-    mapbox_center_lat=46.2,
-    mapbox_center_lon=2.2,
-    mapbox_zoom=4.8,
-    height=800
+    labels={'region_nom': 'Région'},
+    colors=couleurs_regions,
+    key="carte_bibliotheques",
+    height=800,
 )
-st.plotly_chart(fig1)
+
+# Densité lissée (source/density.py) : la superposition des marqueurs cache la
+# concentration réelle des bibliothèques
+st.markdown("**Densité des bibliothèques** (noyau gaussien, surface ou rapport à la population)")
+density_map("bibliotheques", key="densite_bibliotheques")
 
 st.divider()
 
@@ -178,30 +174,9 @@ region_counts = (
     .rename(columns={'size': 'Nombre'})
 )
 
-fig, ax = plt.subplots(figsize=(10, 5))
-bars = ax.bar(
-    region_counts['Région'],
-    region_counts['Nombre'],
-    color=pastel_colors[:len(region_counts)],
-    edgecolor='black'
-)
-
-for bar in bars:
-    height = bar.get_height()
-    ax.annotate(f'{int(height)}',
-                xy=(bar.get_x() + bar.get_width()/2, height),
-                xytext=(0, 3), textcoords="offset points",
-                ha='center', va='bottom', fontsize=9)
-
-ax.set_xlabel("Régions", fontsize=12, fontweight='bold')
-ax.set_ylabel("Nombre de bibliothèques", fontsize=12, fontweight='bold')
-ax.tick_params(axis='x', rotation=45, labelsize=10)
-ax.spines['top'].set_visible(False)
-ax.spines['right'].set_visible(False)
-
 col1, col2, col3 = st.columns([1, 8, 1])
 with col2:
-    st.pyplot(fig)
+    pyplot_chart("bibliotheques_par_region", figure_nombre, region_counts, pastel_colors)
 
 st.markdown("""
 <div class="commentary-box">
@@ -228,43 +203,14 @@ region_counts = (
 )
 
 # Agrégation population par région
-pop_counts = population_file.groupby('nom_region', as_index=False)['Total'].sum()
+pop_counts = pop_regions
 
 # Fusion
 df_merge = pd.merge(region_counts, pop_counts, left_on='Région', right_on='nom_region', how='inner')
 
-# Graphique 2 axes
-fig, ax1 = plt.subplots(figsize=(10, 5))
-bars = ax1.bar(
-    df_merge['Région'], df_merge['Nombre'],
-    color=pastel_colors[:len(df_merge)], edgecolor='black'
-)
-ax1.set_xlabel("Régions", fontsize=12, fontweight='bold')
-ax1.set_ylabel("Nombre de bibliothèques", fontsize=12, fontweight='bold')
-ax1.tick_params(axis='x', rotation=45, labelsize=10)
-
-for bar in bars:
-    height = bar.get_height()
-    ax1.annotate(f'{int(height)}',
-                 xy=(bar.get_x() + bar.get_width()/2, height),
-                 xytext=(0, 3), textcoords="offset points",
-                 ha='center', va='bottom', fontsize=9)
-
-ax2 = ax1.twinx()
-ax2.plot(
-    df_merge['Région'], df_merge['Total'].astype(int) / 1_000_000,
-    color='red', marker='o', linestyle='-', linewidth=2, markersize=6
-)
-ax2.set_ylabel("Population (millions)", fontsize=12, fontweight='bold')
-
-ax2.legend(['Population (M)'], loc='upper right', fontsize=10)
-
-ax1.spines['top'].set_visible(False)
-ax2.spines['top'].set_visible(False)
-
 col1, col2, col3 = st.columns([1, 8, 1])
 with col2:
-    st.pyplot(fig)
+    pyplot_chart("bibliotheques_population", figure_population, df_merge, pastel_colors)
 
 st.markdown("""
 <div class="commentary-box">
@@ -278,38 +224,9 @@ D'autres, comme l'Île-de-France, ont une population importante mais relativemen
 # ------------------------------------
 df_merge['Densité (pour 100k)'] = (df_merge['Nombre'] / df_merge['Total']) * 100_000
 
-fig_scatter, ax = plt.subplots(figsize=(8, 6))
-colors_scatter = pastel_colors[:len(df_merge)]
-sizes = (df_merge['Densité (pour 100k)'] * 10).clip(lower=30, upper=400)  # tailles lisibles
-
-ax.scatter(
-    df_merge['Total'] / 1_000_000,  # Population en millions
-    df_merge['Nombre'],
-    color=colors_scatter,
-    edgecolor='black',
-    s=sizes,
-    alpha=0.85
-)
-
-# Droite de régression
-x_vals = df_merge['Total'] / 1_000_000
-y_vals = df_merge['Nombre']
-m, b = np.polyfit(x_vals, y_vals, 1)
-ax.plot(x_vals, m * x_vals + b, color='gray', linestyle='--', linewidth=1.5, label='Tendance')
-
-# Labels
-for _, row in df_merge.iterrows():
-    ax.text(row['Total'] / 1_000_000, row['Nombre'] + 30, row['Région'], fontsize=8, ha='center')
-
-ax.set_xlabel("Population (millions)", fontsize=12, fontweight='bold')
-ax.set_ylabel("Nombre de bibliothèques", fontsize=12, fontweight='bold')
-ax.legend()
-ax.spines['top'].set_visible(False)
-ax.spines['right'].set_visible(False)
-
 col1, col2, col3 = st.columns([1, 8, 1])
 with col2:
-    st.pyplot(fig_scatter)
+    pyplot_chart("bibliotheques_population_nuage", figure_scatter, df_merge, pastel_colors)
 
 st.markdown("""
 <div class="commentary-box">
@@ -317,6 +234,18 @@ Les régions au-dessus de la droite de tendance sont mieux dotées que la moyenn
 </div>
 """, unsafe_allow_html=True)
 
+# Carte choroplèthe de la densité : contours simplifiés mis en cache
+# (source/boundaries.py), seules les valeurs changent d'un affichage à l'autre
+df_merge['region_nom'] = df_merge['nom_region'].map(REGION_LABELS)
+choropleth_map(
+    df_merge,
+    "region",
+    color='Densité (pour 100k)',
+    hover_name='region_nom',
+    labels={'Densité (pour 100k)': 'Bibliothèques pour 100 000 hab.'},
+    key="choroplethe_bibliotheques",
+)
+
 st.divider()
 
 # ------------------------------------
@@ -342,34 +271,10 @@ region_entries = (
     .reset_index(drop=True)
 )
 
-# 3) Graphique
-fig, ax = plt.subplots(figsize=(10, 5))
-bars = ax.bar(
-    region_entries['Région'],
-    region_entries['nombre_d_entrees'] / 1_000_000,  # millions
-    color=pastel_colors[:len(region_entries)],
-    edgecolor='black'
-)
-
-# Labels au-dessus des barres
-for bar in bars:
-    height = bar.get_height()
-    ax.annotate(f'{height:.1f} M',
-                xy=(bar.get_x() + bar.get_width() / 2, height),
-                xytext=(0, 3), textcoords="offset points",
-                ha='center', va='bottom', fontsize=9)
-
-# Mise en forme
-ax.set_xlabel("Régions", fontsize=12, fontweight='bold')
-ax.set_ylabel("Nombre total d'entrées (millions)", fontsize=12, fontweight='bold')
-ax.tick_params(axis='x', rotation=45, labelsize=10)
-ax.spines['top'].set_visible(False)
-ax.spines['right'].set_visible(False)
-
 # Affichage centré
 col1, col2, col3 = st.columns([1, 8, 1])
 with col2:
-    st.pyplot(fig)
+    pyplot_chart("entrees_par_region", figure_entrees, region_entries, pastel_colors)
 
 st.caption(
     f"Calcul réalisé sur {nb_lignes_utilisees} lignes avec valeurs renseignées dans 'nombre_d_entrees' "
@@ -414,10 +319,7 @@ region_biblio_count = (
 
 #    - population, restreinte aux régions présentes dans le périmètre
 regions_avec_entrees = sorted(biblio_entries['Région'].dropna().unique())
-pop_counts = (
-    population_file[population_file['nom_region'].isin(regions_avec_entrees)]
-    .groupby('nom_region', as_index=False)['Total'].sum()
-)
+pop_counts = pop_regions[pop_regions['nom_region'].isin(regions_avec_entrees)]
 
 # 3) Fusion des trois jeux de données
 df_merge_5 = (
@@ -428,53 +330,10 @@ df_merge_5 = (
     .reset_index(drop=True)
 )
 
-# 4) Graphique à deux axes
-fig, ax1 = plt.subplots(figsize=(11, 5))
-x = np.arange(len(df_merge_5['Région']))
-
-# Barres → Nombre de bibliothèques (périmètre "avec entrées")
-bars_biblio = ax1.bar(
-    x,
-    df_merge_5['nb_bibliotheques'],
-    color=pastel_colors[:len(df_merge_5)],
-    edgecolor='black'
-)
-ax1.set_xlabel("Régions", fontsize=12, fontweight='bold')
-ax1.set_ylabel("Nombre de bibliothèques", fontsize=12, fontweight='bold')
-ax1.set_xticks(x)
-ax1.set_xticklabels(df_merge_5['Région'], rotation=45, fontsize=10)
-
-for bar in bars_biblio:
-    ax1.annotate(
-        f'{int(bar.get_height())}',
-        xy=(bar.get_x() + bar.get_width()/2, bar.get_height()),
-        xytext=(0, 3),
-        textcoords="offset points",
-        ha='center', va='bottom', fontsize=9
-    )
-
-# Courbes → Entrées & Population (sur le même périmètre)
-ax2 = ax1.twinx()
-ax2.plot(
-    x, df_merge_5['nombre_d_entrees'] / 1_000_000,
-    color='blue', marker='o', linewidth=2, markersize=6, label='Entrées (M)'
-)
-ax2.plot(
-    x, df_merge_5['Total'] / 1_000_000,
-    color='red', marker='s', linewidth=2, markersize=5, label='Population (M)'
-)
-ax2.set_ylabel("Valeurs en millions", fontsize=12, fontweight='bold')
-
-# Légendes & style
-ax1.legend(loc='upper left', fontsize=10)
-ax2.legend(loc='upper right', fontsize=10)
-ax1.spines['top'].set_visible(False)
-ax2.spines['top'].set_visible(False)
-
 # Affichage
 col1, col2, col3 = st.columns([0.5, 9, 0.5])
 with col2:
-    st.pyplot(fig)
+    pyplot_chart("bibliotheques_entrees_population", figure_trois_facteurs, df_merge_5, pastel_colors)
 
 st.caption(
     f"Calcul réalisé sur {nb_lignes_utilisees} lignes avec valeurs renseignées dans 'nombre_d_entrees' "
@@ -499,14 +358,7 @@ st.subheader("6 📅 Ouvertes / Fermées le dimanche : Nombre + Entrées (millio
 # 1) Périmètre commun : uniquement les lignes avec une valeur d'entrées
 df_dimanche_detail = biblio_file[['Région', 'ouverture_le_dimanche', 'nombre_d_entrees']].copy()
 
-# Normalisation du champ "ouverture_le_dimanche"
-df_dimanche_detail['ouverture_le_dimanche'] = (
-    df_dimanche_detail['ouverture_le_dimanche']
-    .astype(str).str.strip().str.lower()
-    .replace({'nan': np.nan})
-    .replace({'oui': 'Oui', 'true': 'Oui', '1': 'Oui', 'o': 'Oui',
-              'non': 'Non', 'false': 'Non', '0': 'Non', 'n': 'Non'})
-)
+# "ouverture_le_dimanche" est un booléen nullable (source/schemas.py)
 
 # Conversion stricte + exclusion des lignes sans entrées
 df_dimanche_detail['nombre_d_entrees'] = pd.to_numeric(
@@ -520,48 +372,19 @@ region_order = sorted(df_dimanche_detail['Région'].dropna().unique())
 color_map = dict(zip(region_order, pastel_colors[:len(region_order)]))
 colors_ordered = [color_map[r] for r in region_order]
 
-def plot_dimanche_vs_entrees(title, df_filtered):
+def plot_dimanche_vs_entrees(chart_id, title, df_filtered):
     # Agrégations sur le périmètre filtré
     total_bib = df_filtered.groupby('Région').size().reindex(region_order, fill_value=0)
     total_entrees = df_filtered.groupby('Région')['nombre_d_entrees'].sum().reindex(region_order, fill_value=0)
 
-    # Figure
-    fig, ax_left = plt.subplots(figsize=(10, 5))
-    plt.subplots_adjust(bottom=0.2, left=0.08, right=0.88)
-
-    # Barres : nombre de bibliothèques (périmètre "avec entrées" uniquement)
-    bars = ax_left.bar(region_order, total_bib.values,
-                       color=colors_ordered, edgecolor='black')
-    ax_left.set_xlabel("Régions", fontsize=12, fontweight='bold')
-    ax_left.set_ylabel("Nombre de bibliothèques", fontsize=12, fontweight='bold')
-    ax_left.tick_params(axis='x', rotation=45, labelsize=10)
-
-    for b in bars:
-        ax_left.annotate(f"{int(b.get_height())}",
-                         (b.get_x() + b.get_width()/2, b.get_height()),
-                         textcoords="offset points", xytext=(0,3),
-                         ha="center", va="bottom", fontsize=8)
-
-    # Courbe : entrées en millions (même périmètre)
-    ax_right = ax_left.twinx()
-    ax_right.plot(region_order, total_entrees / 1_000_000,
-                  color='blue', marker='o', linewidth=1.5, label="Entrées (millions)")
-    ax_right.set_ylabel("Entrées (millions)", fontsize=12, fontweight='bold')
-
-    ax_left.legend(loc='upper left', fontsize=9)
-    ax_right.legend(loc='upper right', fontsize=9)
-
-    ax_left.spines['top'].set_visible(False)
-    ax_right.spines['top'].set_visible(False)
-
     st.subheader(title)
     col1, col2, col3 = st.columns([1, 8, 1])
     with col2:
-        st.pyplot(fig)
+        pyplot_chart(chart_id, figure_dimanche, total_bib, total_entrees, region_order, colors_ordered)
 
 # 3) Graphique A : OUVERTES le dimanche (périmètre avec entrées)
-df_open = df_dimanche_detail[df_dimanche_detail['ouverture_le_dimanche'] == 'Oui']
-plot_dimanche_vs_entrees("👍 6.1 Bibliothèques ouvertes le dimanche : Nombre + Entrées", df_open)
+df_open = df_dimanche_detail[df_dimanche_detail['ouverture_le_dimanche'].fillna(False)]
+plot_dimanche_vs_entrees("dimanche_ouvertes", "👍 6.1 Bibliothèques ouvertes le dimanche : Nombre + Entrées", df_open)
 
 st.markdown("""
 <div class="commentary-box">
@@ -572,12 +395,15 @@ Certaines régions comme les Pays de la Loire affichent une forte fréquentation
 st.write("")
 
 # 4) Graphique B : FERMÉES le dimanche (périmètre avec entrées)
-df_closed = df_dimanche_detail[df_dimanche_detail['ouverture_le_dimanche'] == 'Non']
-plot_dimanche_vs_entrees("👎 6.2 Bibliothèques fermées le dimanche : Nombre + Entrées", df_closed)
+df_closed = df_dimanche_detail[~df_dimanche_detail['ouverture_le_dimanche'].fillna(True)]
+plot_dimanche_vs_entrees("dimanche_fermees", "👎 6.2 Bibliothèques fermées le dimanche : Nombre + Entrées", df_closed)
 
 st.markdown("""
 <div class="commentary-box">La majorité des bibliothèques sont fermées le dimanche, notamment en Auvergne Rhone Alpes, Nouvelle-Aquitaine et Occitanie.
 Malgré cette fermeture, certaines régions comme l'Ile de France, la Nouvelle-Aquitaine et les Hauts-de-France enregistrent une fréquentation importante, ce qui montre que l'activité reste concentrée sur les autres jours de la semaine.
 À l'inverse, les DROM et le Centre-Val de Loire cumulent peu de bibliothèques et une faible fréquentation.
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Images des graphiques rendus en parallèle (source/figures.py)
+render_pending()
@@ -7,6 +7,8 @@ Offre culturelle en France
 import streamlit as st
 from pathlib import Path
 
+from source.indicators import region_indicators_wide
+
 # -------------------------
 # Configuration de la page
 # -------------------------
@@ -125,6 +127,16 @@ st.markdown(
   unsafe_allow_html=True
 )
 
+# -------------------------
+# Indicateurs régionaux
+# -------------------------
+# Table précalculée (source/indicators.py) : pas de lecture des fichiers bruts
+st.markdown("<h3>📊 Équipements pour 100 000 habitants</h3>", unsafe_allow_html=True)
+indicateurs = region_indicators_wide('pour_100k')
+indicateurs = indicateurs.drop(columns=['region_code', 'population'])
+indicateurs = indicateurs.rename(columns={'region_nom': 'Région'}).set_index('Région')
+st.dataframe(indicateurs.style.format('{:.1f}'), use_container_width=True)
+
 # -------------------------
 # Recommandations
 # -------------------------
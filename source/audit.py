@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Audit des chemins de rendu des graphiques.
+
+Usage : ``make render_audit`` (ou ``python -m source.audit``).
+
+Chaque page est exécutée (``AppTest``) avec les points d'entrée de rendu
+de plotly et de matplotlib instrumentés :
+
+- plotly : ``plotly.io.to_json`` (sérialisation de ``st.plotly_chart``),
+  ``to_html``, ``write_html``, ``to_image``, ``write_image`` et ``show``
+  (aussi appelés par les méthodes des figures) ; pendant l'audit, ``show``
+  n'ouvre aucun rendu ;
+- matplotlib : ``Figure.savefig`` (utilisé par ``st.pyplot`` et
+  ``source.figures``).
+
+Chaque rendu est rapporté à la figure créée par le code de la page ou d'un
+module de ``source`` (les copies faites par ``source.payload`` et par
+``st.plotly_chart`` comptent pour leur figure d'origine ; un rendu qui en
+appelle un autre ne compte qu'une fois). Le rapport liste, par page :
+
+- les rendus multiples : figure rendue plus d'une fois pendant l'exécution
+  (par exemple ``fig.show()`` suivi de ``st.plotly_chart``), ou graphique
+  de ``source.figures`` rastérisé plusieurs fois (``RENDUS``) ;
+- les figures inutilisées : créées mais jamais rendues ;
+- les figures non fermées : figures matplotlib encore ouvertes en fin de
+  page.
+
+Les pages sont exécutées d'un seul tenant (``PROGRESSIVE_RENDERING=0``,
+sections dépliées) et les figures matplotlib rendues sur place
+(``RENDER_WORKERS=1``). La commande échoue (code de sortie 1) si une page
+rend un graphique plus d'une fois.
+"""
+
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import matplotlib
+import plotly
+import plotly.basedatatypes
+import plotly.io as pio
+import plotly.tools
+from matplotlib import _pylab_helpers
+from matplotlib.figure import Figure
+
+import source.payload as payload
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+PAGES = [ROOT_DIR / "Offre_Culturelle_en_France.py", *sorted((ROOT_DIR / "pages").glob("*.py"))]
+
+# Points d'entrée de rendu instrumentés
+PLOTLY_RENDERS = ["to_json", "to_html", "write_html", "to_image", "write_image", "show"]
+
+# Fichiers ignorés pour situer la création d'une figure
+_INTERNES = (
+    str(Path(plotly.__file__).parent),
+    str(Path(plotly.__file__).parent.parent / "_plotly_utils"),
+    str(Path(matplotlib.__file__).parent),
+    __file__,
+)
+
+
+# ------------------------------------
+# Journal des rendus
+# ------------------------------------
+@dataclass
+class RenderLog:
+    """Figures créées et rendus observés pendant une exécution de page."""
+    # (figure, bibliothèque, emplacement de création)
+    figures: list = field(default_factory=list)
+    # id(figure) -> points d'entrée de rendu appelés
+    rendus: dict = field(default_factory=dict)
+    # id(copie) -> figure d'origine
+    copies: dict = field(default_factory=dict)
+    # Emplacements des figures matplotlib non fermées
+    non_fermees: list = field(default_factory=list)
+    # Graphiques de source.figures rastérisés plus d'une fois
+    rasterisations: dict = field(default_factory=dict)
+    # Références gardées : les id restent uniques pendant l'audit
+    _gardees: list = field(default_factory=list)
+
+    def register(self, figure, library):
+        site = creation_site()
+        if site is not None:
+            self.figures.append((figure, library, site))
+
+    def derive(self, copy, figure):
+        """Rapporte les rendus de ``copy`` à la figure d'origine de ``figure``."""
+        self.copies[id(copy)] = self.copies.get(id(figure), figure)
+        self._gardees.append(copy)
+        return copy
+
+    def render(self, figure, entry):
+        figure = self.copies.get(id(figure), figure)
+        self._gardees.append(figure)
+        self.rendus.setdefault(id(figure), []).append(entry)
+
+    def site(self, figure):
+        for candidate, _, site in self.figures:
+            if candidate is figure:
+                return site
+        return "?"
+
+    def duplicates(self):
+        """Emplacement et rendus des figures rendues plus d'une fois."""
+        multiples = [
+            (site, self.rendus[id(figure)]) for figure, _, site in self.figures
+            if len(self.rendus.get(id(figure), [])) > 1
+        ]
+        multiples += [
+            (f"source.figures:{chart_id}", ["rasterize"] * count)
+            for chart_id, count in self.rasterisations.items()
+        ]
+        return multiples
+
+    def unused(self):
+        """Emplacements dont aucune figure n'a été rendue."""
+        rendus = {site for figure, _, site in self.figures if id(figure) in self.rendus}
+        return sorted({site for _, _, site in self.figures} - rendus)
+
+
+def creation_site(depth=2):
+    """
+    ``fichier:ligne`` du premier appelant hors plotly et matplotlib, s'il
+    fait partie de l'application (``None`` pour les copies de ``source.payload``).
+    """
+    frame = sys._getframe(depth)
+    while frame is not None and frame.f_code.co_filename.startswith(_INTERNES):
+        frame = frame.f_back
+    if frame is None or frame.f_code.co_filename == payload.__file__:
+        return None
+    path = Path(frame.f_code.co_filename)
+    if ROOT_DIR not in path.parents:
+        return None
+    return f"{path.relative_to(ROOT_DIR)}:{frame.f_lineno}"
+
+
+# ------------------------------------
+# Instrumentation
+# ------------------------------------
+_local = threading.local()
+
+
+def _entry(log, entry, original, skip=False):
+    """Point d'entrée compté une fois, même s'il en appelle un autre."""
+    def wrapper(figure, *args, **kwargs):
+        depth = getattr(_local, "depth", 0)
+        if depth == 0:
+            log.render(figure, entry)
+        if skip:
+            return None
+        _local.depth = depth + 1
+        try:
+            return original(figure, *args, **kwargs)
+        finally:
+            _local.depth = depth
+    return wrapper
+
+
+@contextmanager
+def audit_renders():
+    """Instrumente les rendus plotly et matplotlib ; produit le ``RenderLog``."""
+    from source import figures
+
+    log = RenderLog()
+    init_plotly = plotly.basedatatypes.BaseFigure.__init__
+    init_matplotlib = Figure.__init__
+    optimize_figure = payload.optimize_figure
+    return_figure = plotly.tools.return_figure_from_figure_or_data
+
+    def plotly_init(self, *args, **kwargs):
+        init_plotly(self, *args, **kwargs)
+        log.register(self, "plotly")
+
+    def matplotlib_init(self, *args, **kwargs):
+        init_matplotlib(self, *args, **kwargs)
+        log.register(self, "matplotlib")
+
+    def optimize(fig):
+        return log.derive(optimize_figure(fig), fig)
+
+    def convert(figure_or_data, *args, **kwargs):
+        # Copie faite par st.plotly_chart avant la sérialisation
+        return log.derive(return_figure(figure_or_data, *args, **kwargs), figure_or_data)
+
+    patches = [
+        (plotly.basedatatypes.BaseFigure, "__init__", plotly_init),
+        (Figure, "__init__", matplotlib_init),
+        (Figure, "savefig", _entry(log, "savefig", Figure.savefig)),
+        (payload, "optimize_figure", optimize),
+        (plotly.tools, "return_figure_from_figure_or_data", convert),
+    ] + [
+        (pio, name, _entry(log, name, getattr(pio, name), skip=name == "show"))
+        for name in PLOTLY_RENDERS
+    ]
+    originals = [(target, name, getattr(target, name)) for target, name, _ in patches]
+    ouvertes = {manager.num for manager in _pylab_helpers.Gcf.get_all_fig_managers()}
+    rastered = Counter(figures.RENDUS)
+    for target, name, replacement in patches:
+        setattr(target, name, replacement)
+    try:
+        yield log
+    finally:
+        for target, name, original in originals:
+            setattr(target, name, original)
+        for manager in _pylab_helpers.Gcf.get_all_fig_managers():
+            if manager.num not in ouvertes:
+                log.non_fermees.append(log.site(manager.canvas.figure))
+                _pylab_helpers.Gcf.destroy(manager.num)
+        log.rasterisations = {
+            chart_id: count - rastered[chart_id]
+            for chart_id, count in figures.RENDUS.items() if count - rastered[chart_id] > 1
+        }
+
+
+# ------------------------------------
+# Rapport
+# ------------------------------------
+def audit_page(path):
+    """``RenderLog`` d'une exécution de la page ``path``."""
+    from streamlit.testing.v1 import AppTest
+
+    with audit_renders() as log:
+        run = AppTest.from_file(str(path), default_timeout=300).run()
+    for exception in run.exception:
+        raise RuntimeError(f"{path.name} : {exception.value}")
+    return log
+
+
+def render_audit(pages=PAGES):
+    """Affiche l'audit de chaque page ; renvoie les rendus multiples."""
+    errors = []
+    for path in pages:
+        log = audit_page(path)
+        print(f"{path.stem} : {len(log.figures)} figures, {sum(map(len, log.rendus.values()))} rendus")
+        for site, entries in log.duplicates():
+            print(f"    rendu {len(entries)} fois : {site} ({', '.join(entries)})")
+            errors.append(f"{path.stem} : {site}")
+        for site in log.unused():
+            print(f"    inutilisée : {site}")
+        for site in log.non_fermees:
+            print(f"    non fermée : {site}")
+    return errors
+
+
+if __name__ == "__main__":
+    import os
+
+    os.environ["RENDER_WORKERS"] = "1"
+    os.environ["PROGRESSIVE_RENDERING"] = "0"
+    os.environ.pop("PAYLOAD_REPORT", None)
+
+    errors = render_audit()
+    for error in errors:
+        print(f"Rendu multiple : {error}")
+    sys.exit(1 if errors else 0)
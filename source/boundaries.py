@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+Contours simplifiés des départements et des régions, pour les cartes
+choroplèthes.
+
+Usage : ``make build_data`` (ou ``python -m source.boundaries``).
+
+Aucun fond de contours officiel n'est livré avec les données. Les contours
+sont donc reconstruits localement : chaque cellule de terre de la grille de
+``source.raster`` (cellules de ``CELL_KM`` km) est attribuée au département
+du centre de commune ou de code postal le plus proche (transformée de
+distance, voir ``source.geocoding`` pour les centroïdes), puis le bord de
+chaque département est tracé par ``contourpy`` et simplifié
+(Douglas-Peucker). Les limites obtenues suivent les limites réelles à
+quelques kilomètres près, et le littoral est approché par la zone à moins de
+``source.raster.TERRE_KM`` km d'un centre de commune.
+
+Les contours sont écrits dans ``data_prod/contours/`` pour chaque niveau
+(``departement``, ``region``) et chaque résolution de ``RESOLUTIONS``, en
+GeoJSON compact (coordonnées arrondies). Un contour IGN (Admin Express)
+converti au même format peut les remplacer.
+
+``choropleth_map`` choisit la résolution selon le zoom ; la géométrie est
+lue une fois par processus, seules les valeurs changent d'un affichage à
+l'autre. Les figures restent de l'ordre de quelques dizaines de Ko.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from source.data import DATA_DIR, file_version, load_departements
+from source.geocoding import read_communes, read_postal_codes
+from source.geography import departement_from_postal_code, departement_id
+from source.lazy import lazy_import
+from source.payload import plotly_chart
+from source.raster import TERRITOIRES, land_mask, rasterize, territory_grid
+from source.regions import OUTRE_MER, REGION_CODES, REGION_NAMES, resolve_distinct
+
+contourpy = lazy_import("contourpy")
+ndimage = lazy_import("scipy.ndimage")
+
+CONTOURS_DIR = DATA_DIR / "contours"
+
+# Côté des cellules de la grille de tracé (km)
+CELL_KM = 2.0
+# Résolution -> (tolérance de simplification en km, décimales des coordonnées)
+RESOLUTIONS = {
+    "fine": (1.5, 3),
+    "moyenne": (4.0, 2),
+    "grossiere": (10.0, 2),
+}
+# Zoom d'affichage -> résolution
+ZOOMS = {4: "grossiere", 5: "moyenne", 6: "fine", 7: "fine"}
+# Côté (en cellules) du filtre majoritaire qui lisse l'attribution des cellules
+MAJORITE_CELLS = 7
+# Anneaux plus petits que ce nombre de cellules ignorés (enclaves dues à un
+# centroïde mal placé ; les îles de plus de 60 km² sont conservées)
+MIN_CELLS = 15
+KM_PAR_DEGRE = 111.2
+
+NIVEAUX = {
+    "departement": "departement_id",
+    "region": "region_code",
+}
+
+
+# ------------------------------------
+# Construction
+# ------------------------------------
+def label_seeds():
+    """Centres des communes et des codes postaux, avec leur département."""
+    communes = read_communes().dropna(subset=["departement_id"])
+    postaux = read_postal_codes()
+    # Les codes postaux corses (20xxx) ne distinguent pas 2A et 2B
+    postaux = postaux[postaux["code_postal"] // 1000 != 20]
+    departements = resolve_distinct(
+        postaux["code_postal"],
+        lambda code: departement_id(departement_from_postal_code(f"{code:05d}") or "-"),
+    )
+    return pd.concat([
+        communes[["lat", "lon"]].assign(departement_id=communes["departement_id"].to_numpy(int)),
+        postaux[["lat", "lon"]].assign(departement_id=departements),
+    ], ignore_index=True).query("departement_id >= 0")
+
+
+def label_grid(territoire, seeds):
+    """Département de chaque cellule de terre du territoire (-1 ailleurs)."""
+    grid = territory_grid(territoire, CELL_KM)
+    occupied, owner = rasterize(grid, seeds["lat"], seeds["lon"])
+    labels = np.full((grid.ny, grid.nx), -1, dtype=np.int64)
+    if occupied.any():
+        rows, cols = ndimage.distance_transform_edt(~occupied, return_distances=False, return_indices=True)
+        labels = _majority(seeds["departement_id"].to_numpy()[owner[rows, cols]], MAJORITE_CELLS)
+    return grid, np.where(land_mask(territoire, CELL_KM), labels, -1)
+
+
+def _majority(labels, size):
+    """Valeur la plus fréquente dans la fenêtre ``size`` x ``size`` de chaque cellule."""
+    best = np.full(labels.shape, -1.0, dtype=np.float32)
+    result = labels.copy()
+    for code in np.unique(labels):
+        score = ndimage.uniform_filter((labels == code).astype(np.float32), size, mode="nearest")
+        better = score > best
+        best[better] = score[better]
+        result[better] = code
+    return result
+
+
+def simplify(ring, tolerance):
+    """Anneau fermé (n, 2) simplifié par Douglas-Peucker."""
+    keep = np.zeros(len(ring), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(ring) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = ring[end] - ring[start]
+        points = ring[start + 1:end] - ring[start]
+        norm = np.hypot(*segment)
+        if norm == 0:
+            distances = np.hypot(points[:, 0], points[:, 1])
+        else:
+            distances = np.abs(segment[0] * points[:, 1] - segment[1] * points[:, 0]) / norm
+        worst = int(np.argmax(distances))
+        if distances[worst] > tolerance:
+            middle = start + 1 + worst
+            keep[middle] = True
+            stack.extend([(start, middle), (middle, end)])
+    return ring[keep]
+
+
+def _polygons(grid, mask, tolerance, decimals):
+    """Polygones GeoJSON (anneau extérieur puis trous) du masque ``mask``."""
+    lat, lon = grid.centers()
+    # Lignes du sud au nord, bordure vide pour fermer les contours
+    z = np.pad(mask[::-1].astype(np.float64), 1)
+    lat = np.concatenate([[2 * lat[-1] - lat[-2]], lat[::-1], [2 * lat[0] - lat[1]]])
+    lon = np.concatenate([[2 * lon[0] - lon[1]], lon, [2 * lon[-1] - lon[-2]]])
+
+    generator = contourpy.contour_generator(lon, lat, z, fill_type=contourpy.FillType.OuterOffset)
+    points, offsets = generator.filled(0.5, 1.5)
+    tolerance = tolerance / KM_PAR_DEGRE
+    minimum = MIN_CELLS * (CELL_KM / KM_PAR_DEGRE) ** 2
+    polygons = []
+    for outer, bounds in zip(points, offsets):
+        rings = []
+        for index, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            ring = outer[start:end]
+            x, y = ring[:, 0], ring[:, 1]
+            area = abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2
+            ring = np.round(simplify(ring, tolerance), decimals)
+            if area < minimum or len(ring) < 4:
+                if index == 0:
+                    # Anneau extérieur ignoré : ses trous le sont aussi
+                    break
+                continue
+            rings.append(ring.tolist())
+        if rings:
+            polygons.append(rings)
+    return polygons
+
+
+def _region_labels(labels, region_codes):
+    """Grille des départements convertie en grille des régions."""
+    uniques, inverse = np.unique(labels, return_inverse=True)
+    regions = [
+        -1 if code < 0 else OUTRE_MER if code >= 970 else int(region_codes.get(code, -1))
+        for code in uniques
+    ]
+    return np.asarray(regions)[inverse].reshape(labels.shape)
+
+
+def build_boundaries(niveau, resolution):
+    """Contours (FeatureCollection GeoJSON) du niveau à la résolution donnée."""
+    tolerance, decimals = RESOLUTIONS[resolution]
+    seeds = label_seeds()
+    departements = load_departements().set_index("departement_id")
+    regions = dict(zip(REGION_CODES, REGION_NAMES))
+
+    geometries = {}
+    for territoire in TERRITOIRES:
+        grid, labels = label_grid(territoire, seeds)
+        if niveau == "region":
+            labels = _region_labels(labels, departements["region_code"])
+        for code in np.unique(labels[labels >= 0]):
+            polygons = _polygons(grid, labels == code, tolerance, decimals)
+            geometries.setdefault(int(code), []).extend(polygons)
+
+    features = []
+    for code, polygons in sorted(geometries.items()):
+        if niveau == "region":
+            nom = regions.get(code, str(code))
+        else:
+            nom = departements["nom_departement"].get(code, str(code))
+        features.append({
+            "type": "Feature",
+            "id": str(code),
+            "properties": {"nom": str(nom)},
+            "geometry": {"type": "MultiPolygon", "coordinates": polygons},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def boundaries_path(niveau, resolution):
+    return CONTOURS_DIR / f"{niveau}_{resolution}.geojson"
+
+
+def write_boundaries():
+    """
+    Écrit les contours de chaque niveau et résolution. Un fichier inchangé
+    n'est pas réécrit : sa version, qui fait partie de la clé des snapshots
+    (voir ``source.data.dataset_version``), reste la même.
+    """
+    CONTOURS_DIR.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for niveau in NIVEAUX:
+        for resolution in RESOLUTIONS:
+            path = boundaries_path(niveau, resolution)
+            content = json.dumps(
+                build_boundaries(niveau, resolution), separators=(",", ":"), ensure_ascii=False
+            )
+            if not path.exists() or path.read_text(encoding="utf-8") != content:
+                tmp = path.with_suffix(".tmp")
+                tmp.write_text(content, encoding="utf-8")
+                tmp.replace(path)
+            paths.append(path)
+    return paths
+
+
+# ------------------------------------
+# Lecture
+# ------------------------------------
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _boundaries(niveau, resolution, version):
+    if version is None:
+        # Contours pas encore écrits : construction à la volée
+        return build_boundaries(niveau, resolution)
+    with open(boundaries_path(niveau, resolution), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_boundaries(niveau, resolution="moyenne"):
+    """Contours GeoJSON (``id`` : code du département ou de la région)."""
+    path = boundaries_path(niveau, resolution)
+    return _boundaries(niveau, resolution, file_version(path) if path.exists() else None)
+
+
+# ------------------------------------
+# Composant Streamlit
+# ------------------------------------
+@st.fragment
+def choropleth_map(values, niveau, color, hover_name=None, labels=None,
+                   colorscale="Purples", key="choroplethe", height=600):
+    """
+    Carte choroplèthe de la colonne ``color`` de ``values``, dont les lignes
+    sont identifiées par ``departement_id`` ou ``region_code`` selon
+    ``niveau``. La résolution des contours suit le zoom choisi.
+    """
+    zoom = st.select_slider("Niveau de zoom", list(ZOOMS), value=list(ZOOMS)[0], key=f"{key}_zoom")
+    resolution = ZOOMS[zoom]
+    locations = values[NIVEAUX[niveau]].astype("Int64").astype(str)
+
+    (lon0, lat0, lon1, lat1), _ = TERRITOIRES["Métropole"]
+    fig = px.choropleth_map(
+        values.assign(_code=locations.to_numpy()),
+        geojson=load_boundaries(niveau, resolution),
+        locations="_code",
+        featureidkey="id",
+        color=color,
+        hover_name=hover_name,
+        hover_data={"_code": False},
+        labels=labels or {},
+        color_continuous_scale=colorscale,
+        map_style="carto-positron",
+        center={"lat": (lat0 + lat1) / 2, "lon": (lon0 + lon1) / 2},
+        zoom=zoom,
+        opacity=0.8,
+        height=height,
+    )
+    fig.update_layout(margin={"r": 0, "t": 0, "l": 0, "b": 0})
+    plotly_chart(fig, key=key)
+    st.caption(
+        f"Contours reconstruits à partir des centres de communes (résolution {resolution}, "
+        f"voir source/boundaries.py)."
+    )
+
+
+if __name__ == "__main__":
+    for path in write_boundaries():
+        print(f"{path.name} : {path.stat().st_size // 1024} Ko")
@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+"""
+Figures matplotlib des pages.
+
+Chaque fonction construit une figure à partir de données déjà agrégées
+(quelques lignes par région) et la renvoie sans l'afficher : l'affichage et
+la mise en cache sont assurés par ``source.figures.pyplot_chart``. Les
+figures sont des ``matplotlib.figure.Figure`` créées sans pyplot (voir
+``subplots``). Les fonctions sont définies dans un module importable pour
+pouvoir être exécutées dans les processus de rendu.
+"""
+
+import numpy as np
+
+from source.lazy import lazy_import
+
+mfigure = lazy_import("matplotlib.figure")
+
+
+def subplots(*args, figsize, **kwargs):
+    """
+    ``plt.subplots`` sans pyplot : la figure n'entre pas dans le registre
+    global de pyplot, il n'y a rien à fermer, même si le dessin échoue.
+    """
+    fig = mfigure.Figure(figsize=figsize)
+    return fig, fig.subplots(*args, **kwargs)
+
+
+# ------------------------------------
+# Répartition de l'offre culturelle
+# ------------------------------------
+def figure_equipements(df):
+    """Équipements culturels par région, empilés par type."""
+    # Coordonnées sur l'axe des x
+    regions = df['nom_region']
+
+    x = np.arange(len(regions))
+
+    # Hauteurs des différentes catégories
+    biblio = df['Nombre de bibliothèques']
+    cine = df['Nombre de cinés']
+    musee = df['Nombre de musées']
+    festivals = df['Nombre de festivals']
+
+    # Création du graphique
+    fig, ax = subplots(figsize=(12, 6))
+
+    ax.bar(x, biblio, label = 'Bibliothèques', color = "#1E3A8A" )
+    ax.bar(x, cine, bottom = biblio, label='Cinémas', color = "#F012BE")
+    ax.bar(x, musee, bottom = biblio + cine , label='Musées', color ="#4D2A6C" )
+    ax.bar(x, festivals, bottom = biblio + cine + musee, label='festivals', color = "#E879F9")
+
+    # Personnalisation
+    ax.set_xticks(x)
+    ax.set_xticklabels(regions, rotation=45, ha='right')
+    ax.set_ylabel("Nombre d'équipements")
+    # ax.set_title("Répartition des lieux et équipements culturels par région")
+    ax.legend()
+
+    fig.tight_layout()
+    return fig
+
+
+
+# ------------------------------------
+# Musées
+# ------------------------------------
+def figure_frequentation_regions(region_stats, stats_musees):
+    """Nombre de musées et moyenne de visiteurs par musée, par région."""
+    # Palette de couleurs EXACTEMENT comme votre code
+    colors = ["#002244", "#4F2860", "#2A3060", "#312E60", "#442A60", "#FF0066"]
+
+    # Créer les graphiques côte à côte (fond blanc)
+    fig, (ax1, ax2) = subplots(1, 2, figsize=(18, 8))
+
+    if stats_musees is None:
+        ax1.text(0.5, 0.5, 'Fichier museecleaned.csv\nnon trouvé', 
+                transform=ax1.transAxes, ha='center', va='center', 
+                color='black', fontsize=12)
+        ax2.text(0.5, 0.5, 'Fichier museecleaned.csv\nnon trouvé', 
+                transform=ax2.transAxes, ha='center', va='center', 
+                color='black', fontsize=12)
+        return fig
+
+    # Graphique 1: Nombre de musées par région
+    bar_colors = (colors * 10)[:len(stats_musees)]
+    bars1 = ax1.barh(stats_musees['Région'], stats_musees['Nombre_musées'], 
+                    color=bar_colors, alpha=0.8, edgecolor='black')
+    
+    for bar, value in zip(bars1, stats_musees['Nombre_musées']):
+        ax1.text(value + max(stats_musees['Nombre_musées']) * 0.01, 
+                bar.get_y() + bar.get_height()/2, 
+                f'{int(value)}', va='center', fontweight='bold', color='black')
+    
+    ax1.set_title('Nombre de Musées par Région', 
+                 fontsize=16, fontweight='bold', color='black')
+    ax1.set_xlabel('Nombre de musées', fontsize=12, color='black')
+    ax1.grid(axis='x', alpha=0.3)
+    
+    # MODIFICATION PRINCIPALE : Utiliser l'ordre du premier graphique pour le second
+    # Graphique 2: Moyenne visiteurs par musée avec le même ordre que le graphique 1
+    if 'Nb_Musées' in region_stats.columns:
+        # Fusionner les données
+        comparison = region_stats.merge(stats_musees, on='Région', how='inner')
+        comparison['Moy_Visiteurs_Musee'] = comparison['Total_Visiteurs'] / comparison['Nombre_musées']
+        
+        # CLEF : Réordonner selon l'ordre du premier graphique (stats_musees)
+        # Créer un mapping d'ordre basé sur le premier graphique
+        order_mapping = {region: idx for idx, region in enumerate(stats_musees['Région'])}
+        comparison['order'] = comparison['Région'].map(order_mapping)
+        comparison = comparison.sort_values('order')
+        
+        bar_colors2 = (colors * 10)[:len(comparison)]
+        bars2 = ax2.barh(comparison['Région'], comparison['Moy_Visiteurs_Musee']/1000, 
+                        color=bar_colors2, alpha=0.8, edgecolor='black')
+        
+        for bar, value in zip(bars2, comparison['Moy_Visiteurs_Musee']):
+            ax2.text(value/1000 + max(comparison['Moy_Visiteurs_Musee'])/1000 * 0.01, 
+                    bar.get_y() + bar.get_height()/2, 
+                    f'{value/1000:.0f}k', va='center', fontweight='bold', color='black')
+        
+        ax2.set_title('Moyenne Visiteurs par Musée (en milliers)', 
+                     fontsize=16, fontweight='bold', color='black')
+        ax2.set_xlabel('Visiteurs/Musée (Milliers)', fontsize=12, color='black')
+        ax2.grid(axis='x', alpha=0.3)
+    else:
+        ax2.text(0.5, 0.5, 'Données insuffisantes\npour le calcul', 
+                transform=ax2.transAxes, ha='center', va='center', 
+                color='black', fontsize=12)
+
+    fig.patch.set_facecolor('white')
+    fig.tight_layout()
+    return fig
+
+
+def figure_frequentation_annees(annees, frequentation, couleurs):
+    """Fréquentation annuelle des musées et tendance polynomiale."""
+    # Configuration du graphique principal (style dark_background)
+    fig, ax1 = subplots(1, 1, figsize=(14, 8))
+
+    # === GRAPHIQUE: Barres avec gradient ===
+    colors_bars = [couleurs['bleu_nuit'], couleurs['violet_sombre'], couleurs['bleu_violet'], 
+                   couleurs['violet_bleute'], couleurs['violet_fonce']]
+
+    bars = ax1.bar(annees, frequentation, 
+                   color=[colors_bars[i % len(colors_bars)] for i in range(len(annees))],
+                   alpha=0.9, edgecolor=couleurs['rose_vif'], linewidth=2)
+
+    # Ligne de tendance polynomiale
+    z = np.polyfit(annees, frequentation, 3)
+    p = np.poly1d(z)
+    smooth_years = np.linspace(annees.min(), annees.max(), 100)
+    ax1.plot(smooth_years, p(smooth_years), color=couleurs['rose_vif'], 
+             linewidth=4, linestyle='--', alpha=0.9, label='Tendance')
+
+    # Personnalisation graphique
+    ax1.set_title('Fréquentation des Musées de France 2001-2022 (Dataset data.gouv.fr)', 
+                  fontsize=18, fontweight='bold', color='white', pad=20)
+    ax1.set_ylabel('Fréquentation (millions de visiteurs)', fontsize=12, color='white')
+    ax1.set_xlabel('Année', fontsize=12, color='white')
+
+    # Ajout des valeurs sur les barres
+    for bar, value in zip(bars, frequentation):
+        height = bar.get_height()
+        ax1.text(bar.get_x() + bar.get_width()/2., height + 1,
+                f'{value:.1f}M', ha='center', va='bottom', 
+                color='white', fontweight='bold', fontsize=9)
+
+    # Annotation pour l'impact COVID
+    ax1.annotate('Impact COVID-19', xy=(2020, 45.3), xytext=(2018, 40),
+                 arrowprops=dict(arrowstyle='->', color=couleurs['rose_vif'], lw=2),
+                 color=couleurs['rose_vif'], fontsize=11, fontweight='bold')
+
+    ax1.grid(True, alpha=0.3, color='white', linestyle='-', linewidth=0.5)
+    ax1.set_facecolor('#0f0f0f')
+    ax1.tick_params(colors='white', labelsize=10)
+    ax1.legend(loc='upper left', framealpha=0.8)
+    ax1.set_ylim(0, max(frequentation) * 1.2)
+
+    # Configuration générale
+    fig.patch.set_facecolor('#0f0f0f')
+    fig.tight_layout(pad=3.0)
+    return fig
+
+
+def figure_payant_gratuit(region_totals, colors):
+    """Entrées payantes et gratuites par région, empilées."""
+    fig, ax = subplots(figsize=(14, 8))
+    
+    # Graphique empilé
+    x_pos = np.arange(len(region_totals))
+    bars1 = ax.bar(x_pos, region_totals['PAYANT']/1000000, 
+                   label='Payant', color=colors[0], alpha=0.8, edgecolor='black', linewidth=0.5)
+    bars2 = ax.bar(x_pos, region_totals['GRATUIT']/1000000, 
+                   bottom=region_totals['PAYANT']/1000000, 
+                   label='Gratuit', color=colors[5], alpha=0.8, edgecolor='black', linewidth=0.5)
+    
+    # Ajouter les valeurs totales sur les barres
+    for i, (bar1, bar2, row) in enumerate(zip(bars1, bars2, region_totals.itertuples())):
+        total = (row.PAYANT + row.GRATUIT) / 1000000
+        ax.text(bar1.get_x() + bar1.get_width()/2, total + 0.3,
+                 f'{total:.1f}M', ha='center', va='bottom', fontweight='bold', fontsize=10)
+    
+    ax.set_title('Répartition des entrées payantes vs gratuites par Région', fontsize=16, fontweight='bold', pad=20)
+    ax.set_ylabel('Visiteurs (Millions)', fontsize=12, fontweight='bold')
+    ax.set_xlabel('Région', fontsize=12, fontweight='bold')
+    ax.set_xticks(x_pos)
+    ax.set_xticklabels(region_totals['REGION'], rotation=45, ha='right', fontsize=10)
+    ax.legend(fontsize=12, loc='upper right')
+    ax.grid(True, alpha=0.3, axis='y', linestyle='--')
+    fig.tight_layout()
+    return fig
+
+
+
+# ------------------------------------
+# Bibliothèques
+# ------------------------------------
+def figure_nombre(region_counts, colors):
+    """Nombre de bibliothèques par région."""
+    fig, ax = subplots(figsize=(10, 5))
+    bars = ax.bar(
+        region_counts['Région'],
+        region_counts['Nombre'],
+        color=colors[:len(region_counts)],
+        edgecolor='black'
+    )
+
+    for bar in bars:
+        height = bar.get_height()
+        ax.annotate(f'{int(height)}',
+                    xy=(bar.get_x() + bar.get_width()/2, height),
+                    xytext=(0, 3), textcoords="offset points",
+                    ha='center', va='bottom', fontsize=9)
+
+    ax.set_xlabel("Régions", fontsize=12, fontweight='bold')
+    ax.set_ylabel("Nombre de bibliothèques", fontsize=12, fontweight='bold')
+    ax.tick_params(axis='x', rotation=45, labelsize=10)
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    return fig
+
+
+def figure_population(df_merge, colors):
+    """Bibliothèques (barres) et population (courbe) par région."""
+    # Graphique 2 axes
+    fig, ax1 = subplots(figsize=(10, 5))
+    bars = ax1.bar(
+        df_merge['Région'], df_merge['Nombre'],
+        color=colors[:len(df_merge)], edgecolor='black'
+    )
+    ax1.set_xlabel("Régions", fontsize=12, fontweight='bold')
+    ax1.set_ylabel("Nombre de bibliothèques", fontsize=12, fontweight='bold')
+    ax1.tick_params(axis='x', rotation=45, labelsize=10)
+
+    for bar in bars:
+        height = bar.get_height()
+        ax1.annotate(f'{int(height)}',
+                     xy=(bar.get_x() + bar.get_width()/2, height),
+                     xytext=(0, 3), textcoords="offset points",
+                     ha='center', va='bottom', fontsize=9)
+
+    ax2 = ax1.twinx()
+    ax2.plot(
+        df_merge['Région'], df_merge['Total'].astype(int) / 1_000_000,
+        color='red', marker='o', linestyle='-', linewidth=2, markersize=6
+    )
+    ax2.set_ylabel("Population (millions)", fontsize=12, fontweight='bold')
+
+    ax2.legend(['Population (M)'], loc='upper right', fontsize=10)
+
+    ax1.spines['top'].set_visible(False)
+    ax2.spines['top'].set_visible(False)
+    return fig
+
+
+def figure_scatter(df_merge, colors):
+    """Bibliothèques en fonction de la population, avec tendance."""
+    fig, ax = subplots(figsize=(8, 6))
+    colors_scatter = colors[:len(df_merge)]
+    sizes = (df_merge['Densité (pour 100k)'] * 10).clip(lower=30, upper=400)  # tailles lisibles
+
+    ax.scatter(
+        df_merge['Total'] / 1_000_000,  # Population en millions
+        df_merge['Nombre'],
+        color=colors_scatter,
+        edgecolor='black',
+        s=sizes,
+        alpha=0.85
+    )
+
+    # Droite de régression
+    x_vals = df_merge['Total'] / 1_000_000
+    y_vals = df_merge['Nombre']
+    m, b = np.polyfit(x_vals, y_vals, 1)
+    ax.plot(x_vals, m * x_vals + b, color='gray', linestyle='--', linewidth=1.5, label='Tendance')
+
+    # Labels
+    for _, row in df_merge.iterrows():
+        ax.text(row['Total'] / 1_000_000, row['Nombre'] + 30, row['Région'], fontsize=8, ha='center')
+
+    ax.set_xlabel("Population (millions)", fontsize=12, fontweight='bold')
+    ax.set_ylabel("Nombre de bibliothèques", fontsize=12, fontweight='bold')
+    ax.legend()
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    return fig
+
+
+def figure_entrees(region_entries, colors):
+    """Entrées (millions) par région."""
+    # 3) Graphique
+    fig, ax = subplots(figsize=(10, 5))
+    bars = ax.bar(
+        region_entries['Région'],
+        region_entries['nombre_d_entrees'] / 1_000_000,  # millions
+        color=colors[:len(region_entries)],
+        edgecolor='black'
+    )
+
+    # Labels au-dessus des barres
+    for bar in bars:
+        height = bar.get_height()
+        ax.annotate(f'{height:.1f} M',
+                    xy=(bar.get_x() + bar.get_width() / 2, height),
+                    xytext=(0, 3), textcoords="offset points",
+                    ha='center', va='bottom', fontsize=9)
+
+    # Mise en forme
+    ax.set_xlabel("Régions", fontsize=12, fontweight='bold')
+    ax.set_ylabel("Nombre total d'entrées (millions)", fontsize=12, fontweight='bold')
+    ax.tick_params(axis='x', rotation=45, labelsize=10)
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    return fig
+
+
+def figure_trois_facteurs(df_merge_5, colors):
+    """Bibliothèques (barres), entrées et population (courbes) par région."""
+    # 4) Graphique à deux axes
+    fig, ax1 = subplots(figsize=(11, 5))
+    x = np.arange(len(df_merge_5['Région']))
+
+    # Barres → Nombre de bibliothèques (périmètre "avec entrées")
+    bars_biblio = ax1.bar(
+        x,
+        df_merge_5['nb_bibliotheques'],
+        color=colors[:len(df_merge_5)],
+        edgecolor='black'
+    )
+    ax1.set_xlabel("Régions", fontsize=12, fontweight='bold')
+    ax1.set_ylabel("Nombre de bibliothèques", fontsize=12, fontweight='bold')
+    ax1.set_xticks(x)
+    ax1.set_xticklabels(df_merge_5['Région'], rotation=45, fontsize=10)
+
+    for bar in bars_biblio:
+        ax1.annotate(
+            f'{int(bar.get_height())}',
+            xy=(bar.get_x() + bar.get_width()/2, bar.get_height()),
+            xytext=(0, 3),
+            textcoords="offset points",
+            ha='center', va='bottom', fontsize=9
+        )
+
+    # Courbes → Entrées & Population (sur le même périmètre)
+    ax2 = ax1.twinx()
+    ax2.plot(
+        x, df_merge_5['nombre_d_entrees'] / 1_000_000,
+        color='blue', marker='o', linewidth=2, markersize=6, label='Entrées (M)'
+    )
+    ax2.plot(
+        x, df_merge_5['Total'] / 1_000_000,
+        color='red', marker='s', linewidth=2, markersize=5, label='Population (M)'
+    )
+    ax2.set_ylabel("Valeurs en millions", fontsize=12, fontweight='bold')
+
+    # Légendes & style
+    ax1.legend(loc='upper left', fontsize=10)
+    ax2.legend(loc='upper right', fontsize=10)
+    ax1.spines['top'].set_visible(False)
+    ax2.spines['top'].set_visible(False)
+    return fig
+
+
+def figure_dimanche(total_bib, total_entrees, region_order, colors_ordered):
+    """Bibliothèques (barres) et entrées (courbe) par région."""
+    # Figure
+    fig, ax_left = subplots(figsize=(10, 5))
+    fig.subplots_adjust(bottom=0.2, left=0.08, right=0.88)
+
+    # Barres : nombre de bibliothèques (périmètre "avec entrées" uniquement)
+    bars = ax_left.bar(region_order, total_bib.values,
+                       color=colors_ordered, edgecolor='black')
+    ax_left.set_xlabel("Régions", fontsize=12, fontweight='bold')
+    ax_left.set_ylabel("Nombre de bibliothèques", fontsize=12, fontweight='bold')
+    ax_left.tick_params(axis='x', rotation=45, labelsize=10)
+
+    for b in bars:
+        ax_left.annotate(f"{int(b.get_height())}",
+                         (b.get_x() + b.get_width()/2, b.get_height()),
+                         textcoords="offset points", xytext=(0,3),
+                         ha="center", va="bottom", fontsize=8)
+
+    # Courbe : entrées en millions (même périmètre)
+    ax_right = ax_left.twinx()
+    ax_right.plot(region_order, total_entrees / 1_000_000,
+                  color='blue', marker='o', linewidth=1.5, label="Entrées (millions)")
+    ax_right.set_ylabel("Entrées (millions)", fontsize=12, fontweight='bold')
+
+    ax_left.legend(loc='upper left', fontsize=9)
+    ax_right.legend(loc='upper right', fontsize=9)
+
+    ax_left.spines['top'].set_visible(False)
+    ax_right.spines['top'].set_visible(False)
+    return fig
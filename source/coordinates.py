@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Coordonnées géographiques préparées à l'ingestion.
+
+Les fichiers sources stockent les coordonnées soit dans une seule colonne
+texte « lat, lon » (musées : ``Coordonnees``, festivals : ``Géocodage xy``),
+soit dans deux colonnes numériques (bibliothèques). Chaque jeu de données
+reçoit à l'ingestion :
+
+- ``lat`` / ``lon`` (float32, NaN si absentes ou invalides) ;
+- ``coord_valide`` (booléen) : coordonnées présentes et dans les bornes
+  (latitude dans [-90, 90], longitude dans [-180, 180]).
+
+Le parsing est vectorisé (opérations pandas sur toute la colonne) : les
+pages filtrent sur ``coord_valide`` sans jamais relire les chaînes.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _to_float(values):
+    numbers = pd.to_numeric(values, errors="coerce")
+    return pd.Series(numbers).to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def parse_pairs(values, sep=","):
+    """Latitudes et longitudes (float64) d'une colonne « lat, lon »."""
+    parts = pd.Series(values).astype("string").str.partition(sep)
+    return _to_float(parts[0].str.strip()), _to_float(parts[2].str.strip())
+
+
+def coordinate_columns(lat, lon):
+    """Colonnes ``lat``, ``lon`` (float32) et ``coord_valide``."""
+    lat = _to_float(lat)
+    lon = _to_float(lon)
+    with np.errstate(invalid="ignore"):
+        valid = (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+    return {
+        "lat": np.where(valid, lat, np.nan).astype(np.float32),
+        "lon": np.where(valid, lon, np.nan).astype(np.float32),
+        "coord_valide": valid,
+    }
+
+
+def add_coordinates(frame, pair=None, lat=None, lon=None):
+    """
+    Ajoute ``lat``, ``lon`` et ``coord_valide`` à ``frame``, à partir d'une
+    colonne « lat, lon » (``pair``) ou de deux colonnes (``lat``, ``lon``).
+    """
+    if pair is not None:
+        latitudes, longitudes = parse_pairs(frame[pair])
+    else:
+        latitudes, longitudes = frame[lat], frame[lon]
+    return frame.assign(**coordinate_columns(latitudes, longitudes))
@@ -0,0 +1,399 @@
+# -*- coding: utf-8 -*-
+"""
+Accès centralisé aux jeux de données de l'application.
+
+Chaque jeu de données a sa fonction ``load_*``. Les fichiers sont lus une
+seule fois par version (date de modification + taille du fichier, et des
+tables de référence utilisées par la préparation, voir ``dataset_version``)
+puis conservés dans le cache partagé de Streamlit : une interaction sur un widget
+ne provoque plus ni lecture disque ni parsing CSV, et toutes les sessions
+utilisent la même copie en mémoire.
+
+Les DataFrames renvoyés sont des copies « paresseuses » (copy-on-write) de
+la version en cache : une page peut ajouter ou modifier des colonnes sans
+altérer les données vues par les autres pages ou sessions.
+
+Si un snapshot Parquet à jour existe (voir ``make build_data`` et
+``source/snapshots.py``), il est lu à la place du CSV.
+
+Les colonnes sont converties à l'ingestion aux types compacts déclarés dans
+``source/schemas.py`` (catégories, float32, entiers nullables, booléens).
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from source.attribution import CONTOURS_JSON, add_spatial_attribution, correct_regions
+from source.coordinates import add_coordinates
+from source.geocoding import CODES_POSTAUX_CSV, COMMUNES_CSV, add_geocoding
+from source.geography import (
+    CODE_DEPARTEMENT_REGION_CSV, DEPARTEMENTS_CSV, add_geo_columns, build_departements,
+    build_regions,
+)
+from source.schemas import SCHEMAS, apply_schema
+from source.seasons import add_season_column
+
+# Copy-on-write : activé par défaut à partir de pandas 3
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# ------------------------------------
+# Emplacement des fichiers
+# ------------------------------------
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = ROOT_DIR / "data_prod"
+SOURCE_DATA_DIR = ROOT_DIR / "source" / "data"
+SNAPSHOT_DIR = DATA_DIR / "snapshots"
+
+# À incrémenter quand la préparation des données change : les snapshots
+# construits avec une version antérieure sont alors ignorés.
+PIPELINE_VERSION = 13
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """
+    Description d'un fichier source : chemin, options de lecture, colonnes
+    géographiques (voir ``source.geography.add_geo_columns``) converties en
+    clés entières et colonnes de coordonnées (voir
+    ``source.coordinates.add_coordinates``) converties en ``lat``/``lon``
+    à l'ingestion. ``geocoding`` désigne les colonnes (code commune, nom de
+    commune, code postal) utilisées pour placer les lignes sans coordonnées
+    (voir ``source.geocoding.add_geocoding``). ``season_column`` désigne la
+    période de déroulement classée en ``saison`` (voir ``source.seasons``).
+    ``spatial_check`` rapporte les coordonnées aux contours des départements
+    pour contrôler la région, et ``region_correction`` remplace la région
+    des lignes nettement hors de leur région déclarée par celle de leur
+    contour (voir ``source.attribution``).
+    """
+    path: Path
+    read_options: dict = field(default_factory=dict)
+    geo_columns: dict = field(default_factory=dict)
+    coordinates: dict = field(default_factory=dict)
+    season_column: str = None
+    geocoding: dict = field(default_factory=dict)
+    spatial_check: bool = False
+    region_correction: bool = False
+
+
+DATASETS = {
+    # Festivals
+    "festivals": Dataset(
+        DATA_DIR / "festivals_nettoye.csv", {"sep": ";"},
+        {
+            "code_postal": "Code postal (de la commune principale de déroulement)",
+            "nom_departement": "Département principal de déroulement",
+            "region_label": "Région principale de déroulement",
+        },
+        {"pair": "Géocodage xy"},
+        "Période principale de déroulement du festival",
+        geocoding={"code_postal": "Code postal (de la commune principale de déroulement)"},
+        spatial_check=True,
+        region_correction=True,
+    ),
+    # Bibliothèques
+    "bibliotheques": Dataset(
+        DATA_DIR / "adresses_des_bibliotheques_publiques_prepared.csv", {"sep": ","},
+        {"departement": "code_departement", "code_postal": "CP", "region_label": "Région"},
+        {"lat": "Latitude", "lon": "Longitude"},
+        geocoding={"nom_commune": "Ville", "code_postal": "CP"},
+        # Contrôle seulement : les contours sont reconstruits à partir des
+        # bibliothèques elles-mêmes (voir source.attribution)
+        spatial_check=True,
+    ),
+    # Musées
+    "musees": Dataset(
+        DATA_DIR / "museecleaned.csv", {"sep": ","},
+        {"code_postal": "Code_postal", "nom_departement": "Departement", "region_label": "Region"},
+        {"pair": "Coordonnees"},
+        spatial_check=True,
+        region_correction=True,
+    ),
+    "frequentation_musees": Dataset(
+        DATA_DIR / "frequentation-des-musees-de-france.csv", {"sep": ";"},
+        {"nom_departement": "DEPARTEMENT", "region_label": "REGION"},
+    ),
+    "liste_musees": Dataset(
+        SOURCE_DATA_DIR / "liste-officielle-musees_clean.csv", {"sep": ";"},
+        {
+            "code_postal": "Code Postal",
+            "nom_departement": "Département",
+            "region_label": "Région administrative",
+        },
+    ),
+    # Cinémas
+    "cinemas": Dataset(
+        DATA_DIR / "cinema_clean.csv", {"sep": ";"},
+        # La colonne code_postal contient en fait le code commune INSEE (DEPCOM)
+        {"departement": "code_departement", "commune": "code_postal"},
+        geocoding={"commune": "commune_id", "nom_commune": "commune"},
+    ),
+    "cinemas_par_region": Dataset(
+        DATA_DIR / "cinema_par_region.csv", {"sep": ";"},
+        {"region_label": "region_name"},
+    ),
+    "frequentation_cinemas_region": Dataset(
+        DATA_DIR / "frequentation cinemas par region.csv", {"sep": ";"},
+        {"region_label": "region"},
+    ),
+    "frequentation_cinemas": Dataset(
+        DATA_DIR / "frequentation-dans-les-salles-de-cinema.csv", {"sep": ";"}
+    ),
+    "frequentation_cinemas_prix": Dataset(
+        DATA_DIR / "frequentation par région et prix moyen.csv", {"sep": ";"}
+    ),
+    # Géographie et population
+    "departements_regions": Dataset(
+        DATA_DIR / "departements-regions-france.csv", {"sep": ","},
+        {"departement": "code_departement", "region_code": "code_region"},
+    ),
+    "code_departement_region": Dataset(
+        DATA_DIR / "code_departement_region.csv", {"sep": ";"},
+        {"departement": "num_dep", "region_label": "region_name"},
+    ),
+    "population_2024": Dataset(
+        DATA_DIR / "Population France par dpt 2024.csv", {"sep": ";"},
+        {"departement": "Code département"},
+    ),
+    "population_departements": Dataset(
+        DATA_DIR / "population-france-par-dept.csv", {"sep": ";"},
+        {"departement": "Code département", "region_code": "code_region"},
+    ),
+    "population_regions": Dataset(
+        DATA_DIR / "poulation France par dpt et region_clean.csv", {"sep": ";"},
+        {"departement": "Code departement", "region_label": "nom_region"},
+    ),
+}
+
+
+# ------------------------------------
+# Cache
+# ------------------------------------
+def file_version(path):
+    """Clé de version d'un fichier : (date de modification en ns, taille)."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _optional_version(path):
+    return file_version(path) if os.path.exists(path) else None
+
+
+def dependencies(name):
+    """
+    Tables de référence lues par la préparation du jeu ``name`` (voir
+    ``read_source``) : départements, communes et codes postaux, contours.
+    """
+    dataset = DATASETS[name]
+    paths = []
+    if dataset.geo_columns:
+        paths += [DEPARTEMENTS_CSV, CODE_DEPARTEMENT_REGION_CSV]
+    if dataset.geocoding:
+        paths += [COMMUNES_CSV, CODES_POSTAUX_CSV]
+    if dataset.spatial_check:
+        paths += [CONTOURS_JSON]
+    return paths
+
+
+def dataset_version(name):
+    """
+    Clé de version du jeu ``name`` préparé : version du CSV, puis de chaque
+    table de référence de ``dependencies`` (``None`` si elle est absente).
+    """
+    return (
+        file_version(DATASETS[name].path),
+        *(_optional_version(path) for path in dependencies(name)),
+    )
+
+
+def snapshot_path(name, version=None):
+    """Chemin du snapshot Parquet correspondant à la version actuelle du jeu."""
+    (mtime, size), *tables = version or dataset_version(name)
+    tables = hashlib.sha1(repr(tables).encode()).hexdigest()[:8]
+    return SNAPSHOT_DIR / f"{name}-{mtime}-{size}-{tables}-v{PIPELINE_VERSION}.parquet"
+
+
+def read_source(name, typed=True, geocode=True):
+    """
+    Lit et prépare le CSV d'origine du jeu ``name`` (sans cache).
+    ``typed=False`` ignore le schéma de types (rapport mémoire) ;
+    ``geocode=False`` ne place pas les lignes sans coordonnées (construction
+    des tables de géocodage).
+    """
+    dataset = DATASETS[name]
+    frame = pd.read_csv(dataset.path, **dataset.read_options)
+    if typed and name in SCHEMAS:
+        frame = apply_schema(frame, SCHEMAS[name])
+    if dataset.geo_columns:
+        frame = add_geo_columns(frame, **dataset.geo_columns)
+    if dataset.coordinates:
+        frame = add_coordinates(frame, **dataset.coordinates)
+    if geocode and dataset.geocoding:
+        frame = add_geocoding(frame, **dataset.geocoding)
+    if geocode and dataset.spatial_check:
+        frame = add_spatial_attribution(frame)
+        if dataset.region_correction:
+            frame = correct_regions(frame)
+    if dataset.season_column:
+        frame = add_season_column(frame, dataset.season_column)
+    return frame
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _read_dataset(name, version, snapshot):
+    """Lit le jeu ``name``. ``version`` (voir ``dataset_version``) ne sert que de clé de cache."""
+    if snapshot is not None:
+        try:
+            return pd.read_parquet(snapshot)
+        except ImportError:
+            # pyarrow absent : on retombe sur le CSV
+            pass
+    return read_source(name)
+
+
+def load(name):
+    """Renvoie le jeu de données ``name`` depuis le cache partagé."""
+    version = dataset_version(name)
+    snapshot = snapshot_path(name, version)
+    snapshot = str(snapshot) if snapshot.exists() else None
+    frame = _read_dataset(name, version, snapshot)
+    return frame.copy(deep=False)
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _partitions(name, version, by, where):
+    """
+    Index de partition du jeu ``name`` : une tranche par valeur de ``by``,
+    construite une fois par version du fichier. La clé ``None`` donne
+    l'ensemble des lignes retenues.
+    """
+    frame = load(name)
+    if where is not None:
+        frame = frame[frame[where]]
+    partitions = dict(iter(frame.groupby(by, observed=True, sort=True)))
+    partitions[None] = frame
+    return partitions
+
+
+def load_partition(name, by, key=None, where=None):
+    """
+    Lignes du jeu ``name`` dont la colonne ``by`` vaut ``key`` (toutes si
+    ``key`` est None), restreintes aux lignes où la colonne booléenne
+    ``where`` est vraie. Pas de filtre ni de copie à chaque interaction :
+    la tranche est lue dans un index construit une seule fois.
+    """
+    partitions = _partitions(name, dataset_version(name), by, where)
+    return partitions[key].copy(deep=False)
+
+
+def partition_keys(name, by, where=None):
+    """Valeurs de ``by`` présentes dans le jeu ``name`` (ordre trié)."""
+    partitions = _partitions(name, dataset_version(name), by, where)
+    return [key for key in partitions if key is not None]
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _geography(version):
+    departements = build_departements(
+        load("departements_regions"), load("population_departements")
+    )
+    return departements, build_regions(departements)
+
+
+def _geography_version():
+    return tuple(
+        dataset_version(name) for name in ("departements_regions", "population_departements")
+    )
+
+
+# ------------------------------------
+# Une fonction par jeu de données
+# ------------------------------------
+def load_festivals():
+    """Festivals de France (festivals_nettoye.csv)."""
+    return load("festivals")
+
+
+def load_bibliotheques():
+    """Adresses des bibliothèques publiques."""
+    return load("bibliotheques")
+
+
+def load_musees():
+    """Musées de France avec coordonnées (museecleaned.csv)."""
+    return load("musees")
+
+
+def load_frequentation_musees():
+    """Fréquentation annuelle des musées de France."""
+    return load("frequentation_musees")
+
+
+def load_liste_musees():
+    """Liste officielle des musées de France."""
+    return load("liste_musees")
+
+
+def load_cinemas():
+    """Établissements cinématographiques (cinema_clean.csv)."""
+    return load("cinemas")
+
+
+def load_cinemas_par_region():
+    """Nombre de cinémas par région."""
+    return load("cinemas_par_region")
+
+
+def load_frequentation_cinemas_region():
+    """Fréquentation 2023 des cinémas par région (millions d'entrées)."""
+    return load("frequentation_cinemas_region")
+
+
+def load_frequentation_cinemas():
+    """Entrées et recette moyenne nationales par année."""
+    return load("frequentation_cinemas")
+
+
+def load_frequentation_cinemas_prix():
+    """Fréquentation de quatre régions et prix moyen par année."""
+    return load("frequentation_cinemas_prix")
+
+
+def load_departements_regions():
+    """Correspondance département / région (codes INSEE)."""
+    return load("departements_regions")
+
+
+def load_code_departement_region():
+    """Correspondance numéro de département / nom de région."""
+    return load("code_departement_region")
+
+
+def load_population_2024():
+    """Population 2024 par département (Hommes, Femmes, Total)."""
+    return load("population_2024")
+
+
+def load_population_departements():
+    """Population par département avec abréviation de région."""
+    return load("population_departements")
+
+
+def load_population_regions():
+    """Population par département avec nom de région."""
+    return load("population_regions")
+
+
+def load_departements():
+    """Dimension département (clé ``departement_id``) avec population."""
+    return _geography(_geography_version())[0].copy(deep=False)
+
+
+def load_regions():
+    """Dimension région (clé ``region_code``) avec population."""
+    return _geography(_geography_version())[1].copy(deep=False)
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Densité d'équipements par noyau gaussien, calculée sur grille.
+
+Une carte de milliers de marqueurs superposés cache la densité réelle. Les
+équipements sont comptés sur la grille de ``source.raster`` (cellules de
+``CELL_KM`` km), puis le comptage est convolué par un noyau gaussien de
+largeur de bande ``bandwidth`` km (``scipy.signal.fftconvolve``) : le coût
+dépend de la taille de la grille, pas du nombre de points.
+
+Deux variantes :
+
+- densité : équipements pour 100 km² ;
+- par habitant : équipements pour 100 000 habitants, rapport entre la
+  densité d'équipements et la densité de population lissée avec le même
+  noyau. Les communes de la table de ``source.geocoding`` portent leur
+  population ; cette table ne couvrant que les communes dotées d'une
+  bibliothèque, le reste de la population de chaque département (fichier
+  de population par département) est réparti uniformément sur ses
+  cellules de terre (départements reconstruits par ``source.boundaries``).
+  Les cellules de moins de ``MIN_HABITANTS_KM2`` habitants par km² sont
+  masquées.
+
+Les surfaces et les images sont gardées dans le cache partagé par version
+des fichiers et largeur de bande : changer la largeur de bande ne recalcule
+que la première fois.
+"""
+
+import numpy as np
+import streamlit as st
+
+from source.boundaries import label_grid, label_seeds
+from source.data import dataset_version, file_version, load_departements, load_partition
+from source.geocoding import CODES_POSTAUX_CSV, COMMUNES_CSV, read_communes
+from source.lazy import lazy_import
+from source.payload import plotly_chart
+from source.raster import TERRITOIRES, image_map, land_mask, png_image, territory_grid
+
+signal = lazy_import("scipy.signal")
+
+# Côté d'une cellule (km)
+CELL_KM = 2.0
+# Largeurs de bande proposées (km)
+BANDWIDTHS_KM = [5, 10, 20, 40]
+# Le noyau est tronqué à TRUNCATE écarts-types
+TRUNCATE = 3.0
+# En dessous de cette densité de population, le rapport par habitant est masqué
+MIN_HABITANTS_KM2 = 5.0
+# Quantile des valeurs affiché en haut de l'échelle de couleurs
+QUANTILE_MAX = 0.99
+COLORSCALE = "Inferno"
+
+VARIANTES = {
+    "Densité": "pour 100 km²",
+    "Par habitant": "pour 100 000 hab.",
+}
+
+
+# ------------------------------------
+# Calcul
+# ------------------------------------
+def gaussian_kernel(bandwidth_km, cell_km=CELL_KM):
+    """Noyau gaussien discret normalisé (somme 1)."""
+    sigma = bandwidth_km / cell_km
+    radius = max(1, int(np.ceil(TRUNCATE * sigma)))
+    offsets = np.arange(-radius, radius + 1)
+    profile = np.exp(-0.5 * (offsets / sigma) ** 2)
+    kernel = np.outer(profile, profile)
+    return kernel / kernel.sum()
+
+
+def count_grid(grid, lat, lon, weights=None):
+    """Nombre (ou somme des ``weights``) de points dans chaque cellule."""
+    rows, cols = grid.cells(lat, lon)
+    inside = rows >= 0
+    cells = rows[inside] * grid.nx + cols[inside]
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)[inside]
+    counts = np.bincount(cells, weights=weights, minlength=grid.ny * grid.nx)
+    return counts.astype(np.float64).reshape(grid.ny, grid.nx)
+
+
+def smooth(counts, bandwidth_km, cell_km=CELL_KM):
+    """Densité lissée (par km²) d'une grille de comptages."""
+    smoothed = signal.fftconvolve(counts, gaussian_kernel(bandwidth_km, cell_km), mode="same")
+    # La convolution par FFT laisse des résidus négatifs minimes
+    return np.maximum(smoothed, 0.0) / cell_km ** 2
+
+
+def kernel_density(grid, lat, lon, bandwidth_km, weights=None, cell_km=CELL_KM):
+    """Densité lissée des points (par km²) sur ``grid``."""
+    return smooth(count_grid(grid, lat, lon, weights), bandwidth_km, cell_km)
+
+
+@st.cache_resource(show_spinner=False, max_entries=48)
+def _equipment_density(name, version, territoire, bandwidth_km):
+    points = load_partition(name, "region_nom", where="coord_valide")
+    grid = territory_grid(territoire, CELL_KM)
+    return kernel_density(grid, points["lat"], points["lon"], bandwidth_km).astype(np.float32)
+
+
+def population_grid(territoire):
+    """
+    Habitants de chaque cellule du territoire : population des communes de
+    la table en leur centre, plus le reste de la population de chaque
+    département réparti uniformément sur ses cellules de terre.
+    """
+    grid, labels = label_grid(territoire, label_seeds())
+    communes = read_communes().dropna(subset=["departement_id", "population"])
+    counts = count_grid(grid, communes["lat"], communes["lon"], weights=communes["population"])
+
+    departements = load_departements().set_index("departement_id")["population"].astype("float64")
+    connues = communes.groupby("departement_id")["population"].sum().astype("float64")
+    # Département sans population connue : communes de la table seules
+    reste = departements.sub(connues, fill_value=0.0).clip(lower=0.0).fillna(0.0)
+
+    terre = labels >= 0
+    codes, cellules = np.unique(labels[terre], return_counts=True)
+    par_cellule = reste.reindex(codes).fillna(0.0).to_numpy() / cellules
+    counts[terre] += par_cellule[np.searchsorted(codes, labels[terre])]
+    return counts
+
+
+def population_version():
+    """Version des tables utilisées par ``population_grid``."""
+    tables = (COMMUNES_CSV, CODES_POSTAUX_CSV)
+    return (
+        *(file_version(path) if path.exists() else None for path in tables),
+        dataset_version("departements_regions"),
+        dataset_version("population_departements"),
+    )
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _population_grid(version, territoire):
+    return population_grid(territoire)
+
+
+@st.cache_resource(show_spinner=False, max_entries=24)
+def _population_density(version, territoire, bandwidth_km):
+    return smooth(_population_grid(version, territoire), bandwidth_km).astype(np.float32)
+
+
+def density_surface(name, territoire, bandwidth_km, variante="Densité"):
+    """
+    Grille lissée du jeu ``name`` (lignes du nord au sud) : équipements pour
+    100 km² ou pour 100 000 habitants selon ``variante`` ; NaN hors des terres.
+    """
+    density = _equipment_density(name, dataset_version(name), territoire, bandwidth_km)
+    if variante == "Densité":
+        values = density * 100.0
+    else:
+        population = _population_density(population_version(), territoire, bandwidth_km)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.where(
+                population >= MIN_HABITANTS_KM2, density / population * 100_000.0, np.nan
+            )
+    return np.where(land_mask(territoire, CELL_KM), values, np.nan)
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _overlay(name, territoire, bandwidth_km, variante, versions):
+    values = density_surface(name, territoire, bandwidth_km, variante)
+    finite = values[np.isfinite(values)]
+    vmax = float(np.quantile(finite, QUANTILE_MAX)) if finite.size else 1.0
+    return png_image(values, vmax or 1.0, COLORSCALE), vmax or 1.0
+
+
+def density_overlay(name, territoire, bandwidth_km, variante="Densité"):
+    """Image PNG (URI ``data:``) de la densité et valeur du haut de l'échelle."""
+    versions = (dataset_version(name), population_version())
+    return _overlay(name, territoire, bandwidth_km, variante, versions)
+
+
+# ------------------------------------
+# Composant Streamlit
+# ------------------------------------
+@st.fragment
+def density_map(name, key="densite", height=650):
+    """
+    Carte de densité du jeu ``name`` avec choix du territoire, de la largeur
+    de bande et de la variante (exécutée dans un fragment).
+    """
+    col1, col2, col3 = st.columns([1, 1, 1])
+    territoire = col1.selectbox("Territoire", list(TERRITOIRES), key=f"{key}_territoire")
+    bandwidth = col2.select_slider(
+        "Largeur de bande (km)", BANDWIDTHS_KM, value=BANDWIDTHS_KM[1], key=f"{key}_bande"
+    )
+    variante = col3.radio("Variante", list(VARIANTES), horizontal=True, key=f"{key}_variante")
+
+    source, vmax = density_overlay(name, territoire, bandwidth, variante)
+    fig = image_map(
+        source, territoire, territory_grid(territoire, CELL_KM), vmax, VARIANTES[variante],
+        colorscale=COLORSCALE, height=height,
+    )
+    plotly_chart(fig, key=key)
+    st.caption(
+        f"Noyau gaussien de {bandwidth} km sur une grille de {CELL_KM:g} km "
+        f"(échelle plafonnée au {QUANTILE_MAX * 100:.0f}e centile)."
+    )
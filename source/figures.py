@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Rendu des graphiques matplotlib mis en cache.
+
+Une page qui appelle ``plt.subplots`` puis ``st.pyplot`` à chaque exécution
+redessine toutes ses figures à chaque interaction, et les figures jamais
+fermées s'accumulent dans le registre global de pyplot. ``pyplot_chart``
+remplace ce schéma :
+
+- la figure est construite par une fonction ``draw(*data, **params)`` qui
+  la renvoie, puis rendue en PNG (ou SVG). ``draw`` crée une
+  ``matplotlib.figure.Figure`` sans passer par pyplot (voir
+  ``source.charts.subplots``) : la figure n'entre jamais dans le registre
+  global, et rien ne reste ouvert si le dessin ou le rendu échoue ;
+- le style (``style="dark_background"``…) est appliqué le temps du rendu
+  seulement (``matplotlib.style.context``) : aucune page ne modifie plus
+  les réglages globaux de matplotlib ;
+- l'image est gardée dans le cache partagé, indexée par l'identifiant du
+  graphique, le contenu des données passées (``data``, en général de petits
+  tableaux agrégés : leur empreinte sert de version) et les paramètres.
+  Le cache garde au plus ``MAX_FIGURES`` images, les moins récemment
+  utilisées sont évincées.
+
+Une page déjà affichée sert ainsi ses graphiques sans appeler matplotlib.
+``RENDUS`` compte les rendus effectifs par graphique.
+
+Rendu en parallèle (optionnel) : la rastérisation Agg occupe un cœur et
+reste sérialisée par le GIL. Avec ``RENDER_WORKERS`` processus (variable
+d'environnement, 1 par défaut : rendu sur place), chaque figure absente du
+cache est envoyée à un pool de processus sous forme de spécification
+(fonction de ``source.charts``, données agrégées, style, paramètres) :
+``pyplot_chart`` réserve aussitôt l'emplacement de l'image (``st.empty``)
+et la page continue. ``render_pending``, appelé en fin de page, attend les
+rendus et insère les images dans leurs emplacements, dans l'ordre de la
+page ; un rendu en échec affiche son erreur à la place de l'image. Les
+fonctions de dessin doivent être définies dans un module importable : les
+processus de rendu n'exécutent pas la page (voir ``_preparation_data``,
+installé à la création du pool seulement : avec un seul processus,
+multiprocessing n'est pas modifié).
+"""
+
+import io
+import multiprocessing
+import multiprocessing.spawn
+import os
+import threading
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+
+import streamlit as st
+
+from source.lazy import lazy_import
+from source.progressive import run_scoped
+
+matplotlib = lazy_import("matplotlib")
+mstyle = lazy_import("matplotlib.style")
+
+# Images gardées dans le cache partagé
+MAX_FIGURES = 64
+# Résolution des images (celle de st.pyplot)
+DPI = 200
+
+# Processus de rendu (1 : rendu dans le processus de Streamlit)
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", "1"))
+
+# Nombre de rendus matplotlib effectifs, par identifiant de graphique
+RENDUS = Counter()
+
+_pool = None
+_pool_lock = threading.Lock()
+# Emplacements en attente d'image de l'exécution de page en cours
+_local = threading.local()
+# Processus de rendu en cours de lancement par ce thread
+_lancement = threading.local()
+# ``multiprocessing.spawn.get_preparation_data`` d'origine, une fois remplacé
+_original_preparation_data = None
+
+
+# ------------------------------------
+# Rendu
+# ------------------------------------
+def figure_bytes(fig, format="png", dpi=DPI):
+    """Image de ``fig`` (octets PNG ou texte SVG)."""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=format, dpi=dpi, bbox_inches="tight")
+    if format == "svg":
+        return buffer.getvalue().decode("utf-8")
+    return buffer.getvalue()
+
+
+def rasterize(draw, data, params, style=None, format="png"):
+    """
+    Image de la figure ``draw(*data, **params)``, construite sans pyplot
+    (rien à fermer, même en cas d'échec).
+    """
+    with mstyle.context(style) if style else nullcontext():
+        return figure_bytes(draw(*data, **params), format)
+
+
+def _init_worker():
+    matplotlib.use("Agg")
+
+
+def _preparation_data(name):
+    """
+    Données de démarrage d'un processus « spawn ». Streamlit exécute la page
+    comme module ``__main__``, qu'un processus de rendu réexécuterait : pour
+    les processus lancés par ``_submit`` (dans ce thread), le module
+    ``__main__`` n'est pas réimporté. Les autres lancements sont inchangés.
+    """
+    data = _original_preparation_data(name)
+    if getattr(_lancement, "actif", False):
+        data.pop("init_main_from_name", None)
+        data.pop("init_main_from_path", None)
+    return data
+
+
+def _install_preparation_data():
+    """Remplace ``get_preparation_data`` par ``_preparation_data`` (une seule fois)."""
+    global _original_preparation_data
+    if _original_preparation_data is None:
+        _original_preparation_data = multiprocessing.spawn.get_preparation_data
+        multiprocessing.spawn.get_preparation_data = _preparation_data
+
+
+def render_pool():
+    """Pool des processus de rendu, ``None`` si ``RENDER_WORKERS`` vaut 1."""
+    global _pool
+    if RENDER_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _install_preparation_data()
+            # « spawn » : pas de fork d'un serveur multi-thread
+            _pool = ProcessPoolExecutor(
+                RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+    return _pool
+
+
+def _submit(pool, *task):
+    """``pool.submit(*task)`` ; les processus lancés au passage n'exécutent pas la page."""
+    _lancement.actif = True
+    try:
+        return pool.submit(*task)
+    finally:
+        _lancement.actif = False
+
+
+@st.cache_resource(show_spinner=False, max_entries=MAX_FIGURES)
+def _render(chart_id, data, params, style, format, _draw):
+    """
+    Rendu (``Future``) de ``_draw(*data, **params)`` : dans le pool de
+    processus s'il existe, sinon sur place. ``_draw`` ne fait pas partie de
+    la clé.
+    """
+    RENDUS[chart_id] += 1
+    pool = render_pool()
+    if pool is not None:
+        return _submit(pool, rasterize, _draw, data, params, style, format)
+    future = Future()
+    try:
+        future.set_result(rasterize(_draw, data, params, style, format))
+    except Exception as error:
+        future.set_exception(error)
+    return future
+
+
+def _result(future, key):
+    """Image d'un rendu ; un rendu en échec est retiré du cache."""
+    global _pool
+    try:
+        return future.result()
+    except Exception as error:
+        _render.clear(*key)
+        if isinstance(error, BrokenProcessPool):
+            # Processus de rendu arrêté : un nouveau pool sera créé
+            with _pool_lock:
+                _pool = None
+        raise
+
+
+def render_figure(chart_id, draw, *data, style=None, format="png", **params):
+    """
+    Image de la figure ``draw(*data, **params)`` depuis le cache partagé
+    (attend le rendu s'il est en cours). ``chart_id`` doit être propre à
+    chaque graphique de l'application.
+    """
+    key = (chart_id, data, params, style, format, draw)
+    return _result(_render(*key), key)
+
+
+# ------------------------------------
+# Composant Streamlit
+# ------------------------------------
+def pyplot_chart(chart_id, draw, *data, style=None, format="png", **params):
+    """
+    ``st.pyplot`` sur l'image mise en cache (voir ``render_figure``). Si le
+    rendu est en cours dans le pool, l'image est insérée par
+    ``render_pending``.
+    """
+    key = (chart_id, data, params, style, format, draw)
+    future = _render(*key)
+    if future.done():
+        return st.image(_result(future, key), width="stretch")
+    placeholder = st.empty()
+    run_scoped(_local).append((placeholder, future, key))
+    return placeholder
+
+
+def render_pending():
+    """
+    Insère les images rendues en parallèle, dans l'ordre de la page ; un
+    rendu en échec affiche son erreur dans son emplacement.
+    """
+    pending = run_scoped(_local)
+    items = list(pending)
+    pending.clear()
+    for placeholder, future, key in items:
+        try:
+            placeholder.image(_result(future, key), width="stretch")
+        except Exception as error:
+            placeholder.error(f"❌ Erreur lors du rendu du graphique « {key[0]} » : {error}")
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+Géocodage hors ligne des équipements sans coordonnées.
+
+Usage : ``make build_data`` (ou ``python -m source.geocoding``).
+
+Les cinémas ne portent qu'un code commune INSEE et un nom de commune, et
+certaines bibliothèques et certains festivals n'ont pas de coordonnées. À
+l'ingestion (voir ``Dataset.geocoding`` dans ``source.data``), les lignes
+sans coordonnées valides reçoivent la position approchée de leur commune,
+à défaut de leur code postal, à défaut de leur département. Les
+correspondances sont des jointures par hachage vectorisées
+(``Index.get_indexer``) sur deux tables locales de ``data_prod/`` :
+
+- ``communes_centroides.csv`` : département, nom, code commune INSEE (si
+  connu), position et population des communes. Ce n'est pas un référentiel
+  des communes : la table est dérivée des adresses des bibliothèques. La
+  position d'une commune est la médiane des coordonnées de ses
+  bibliothèques (et non son centroïde géographique), le code INSEE est
+  repris des cinémas, et seules les communes dotées d'une bibliothèque y
+  figurent (environ 14 000 communes, 59 millions d'habitants). Un cinéma
+  placé par cette table est donc posé sur les bibliothèques de sa commune,
+  et un cinéma d'une commune sans bibliothèque n'est placé qu'au niveau du
+  code postal ou du département ;
+- ``codes_postaux_centroides.csv`` : centroïde des équipements géolocalisés
+  (bibliothèques, musées, festivals) de chaque code postal.
+
+Les deux tables sont reconstruites par ``write_gazetteer`` dès qu'un de
+leurs fichiers sources ou la ``PIPELINE_VERSION`` change : les empreintes
+(SHA-1) utilisées sont écrites dans ``data_prod/gazetteer_sources.json``.
+
+La colonne ``precision_geo`` indique l'origine des coordonnées de chaque
+ligne : ``adresse`` (coordonnées du fichier source),
+``commune_bibliotheques`` (position approchée de la commune, dérivée des
+bibliothèques), ``code_postal`` ou ``departement`` ; elle est vide si la
+ligne n'a pas pu être placée. ``coord_valide`` n'est vrai que pour les
+précisions de ``PRECISIONS_VALIDES`` (adresse, commune_bibliotheques) :
+une ligne placée au centroïde de son code postal ou de son département
+garde ses coordonnées approchées mais n'est ni cartographiée ni utilisée
+dans les calculs de distance ou de densité.
+"""
+
+import hashlib
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from source.geography import departement_from_postal_code, departement_id
+from source.regions import normalize_label, resolve_distinct
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data_prod"
+COMMUNES_CSV = DATA_DIR / "communes_centroides.csv"
+CODES_POSTAUX_CSV = DATA_DIR / "codes_postaux_centroides.csv"
+GAZETTEER_SOURCES_JSON = DATA_DIR / "gazetteer_sources.json"
+
+# Origine des coordonnées, de la plus précise à la moins précise
+# (« commune_bibliotheques » : position approchée par les bibliothèques de la commune)
+PRECISIONS = ["adresse", "commune_bibliotheques", "code_postal", "departement"]
+# Précisions suffisantes pour les cartes et les calculs spatiaux
+PRECISIONS_VALIDES = ["adresse", "commune_bibliotheques"]
+
+# Jeux géolocalisés -> colonne code postal, pour la table des codes postaux
+CODES_POSTAUX = {
+    "bibliotheques": "CP",
+    "musees": "Code_postal",
+    "festivals": "Code postal (de la commune principale de déroulement)",
+}
+
+# « Paris 8e Arrondissement », « Lyon 1er Arrondissement » -> « Paris », « Lyon »
+ARRONDISSEMENT = re.compile(r"\s+\d+(er|e)\s+arrondissement$", re.IGNORECASE)
+
+
+# ------------------------------------
+# Clés de jointure
+# ------------------------------------
+def commune_key(departements, noms):
+    """Clé (département, nom normalisé) d'une commune."""
+    noms = pd.Series(noms).astype("string").str.replace(ARRONDISSEMENT, "", regex=True)
+    return pd.MultiIndex.from_arrays([
+        pd.array(departements, dtype="Int16"),
+        noms.map(normalize_label, na_action="ignore").to_numpy(),
+    ], names=["departement_id", "nom_normalise"])
+
+
+def postal_code(code):
+    """Code postal entier (« 03600 », 3600, « 3600.0 » -> 3600 ; -1 si invalide)."""
+    text = str(code).strip()
+    if text.endswith(".0"):
+        text = text[:-2]
+    return int(text) if text.isdigit() and len(text) <= 5 else -1
+
+
+def postal_codes(values):
+    """Codes postaux entiers (Int32, manquant si invalide) d'une colonne."""
+    codes = resolve_distinct(values, postal_code, np.int32)
+    return pd.arrays.IntegerArray(np.where(codes < 0, 0, codes), codes < 0)
+
+
+# ------------------------------------
+# Tables locales
+# ------------------------------------
+def build_communes():
+    """
+    Table des communes dotées d'une bibliothèque, positionnées à la médiane
+    de leurs bibliothèques (approximation, pas un centroïde de commune).
+    """
+    from source.data import read_source
+
+    bibliotheques = read_source("bibliotheques", geocode=False)
+    bibliotheques = bibliotheques[bibliotheques["coord_valide"]]
+    key = commune_key(bibliotheques["departement_id"], bibliotheques["Ville"])
+    communes = bibliotheques.assign(
+        departement_id=key.get_level_values(0), nom_normalise=key.get_level_values(1)
+    ).dropna(subset=["departement_id", "nom_normalise"])
+    communes = communes.groupby(["departement_id", "nom_normalise"], observed=True).agg(
+        commune=("Ville", "first"),
+        lat=("lat", "median"),
+        lon=("lon", "median"),
+        population=("Population commune", "max"),
+    ).reset_index()
+    communes["commune"] = communes["commune"].astype(str)
+
+    # Code INSEE des communes dotées d'un cinéma
+    cinemas = read_source("cinemas", geocode=False).dropna(subset=["commune_id"])
+    key = commune_key(cinemas["departement_id"], cinemas["commune"])
+    codes = pd.Series(cinemas["commune_id"].to_numpy(), index=key)
+    codes = codes[~codes.index.duplicated()]
+    key = pd.MultiIndex.from_frame(communes[["departement_id", "nom_normalise"]])
+    communes["commune_id"] = pd.array(codes.reindex(key).to_numpy(), dtype="Int32")
+    return communes[
+        ["departement_id", "commune_id", "commune", "nom_normalise", "lat", "lon", "population"]
+    ]
+
+
+def build_postal_codes():
+    """Centroïde des équipements géolocalisés de chaque code postal."""
+    from source.data import read_source
+
+    points = []
+    for name, column in CODES_POSTAUX.items():
+        frame = read_source(name, geocode=False)
+        frame = frame[frame["coord_valide"]]
+        points.append(pd.DataFrame({
+            "code_postal": postal_codes(frame[column]),
+            "lat": frame["lat"].to_numpy(),
+            "lon": frame["lon"].to_numpy(),
+        }))
+    points = pd.concat(points, ignore_index=True).dropna(subset=["code_postal"])
+    return points.groupby("code_postal").agg(
+        lat=("lat", "median"), lon=("lon", "median"), nombre=("lat", "size")
+    ).reset_index()
+
+
+# Table locale -> (jeux sources, construction)
+GAZETTEER = {
+    COMMUNES_CSV: (["bibliotheques", "cinemas"], build_communes),
+    CODES_POSTAUX_CSV: (list(CODES_POSTAUX), build_postal_codes),
+}
+
+
+def read_communes():
+    """Table des communes ; construite à partir des bibliothèques si absente."""
+    if not COMMUNES_CSV.exists():
+        return build_communes()
+    return pd.read_csv(
+        COMMUNES_CSV, sep=";",
+        dtype={"departement_id": "Int16", "commune_id": "Int32", "population": "Int32"},
+    )
+
+
+def read_postal_codes():
+    """Table des codes postaux ; construite à partir des équipements si absente."""
+    if not CODES_POSTAUX_CSV.exists():
+        return build_postal_codes()
+    return pd.read_csv(CODES_POSTAUX_CSV, sep=";", dtype={"code_postal": "Int32"})
+
+
+def source_digests(names):
+    """Empreintes (SHA-1) des fichiers sources des jeux ``names``."""
+    from source.data import DATASETS
+
+    digests = {}
+    for name in names:
+        with open(DATASETS[name].path, "rb") as f:
+            digests[name] = hashlib.sha1(f.read()).hexdigest()
+    return digests
+
+
+def write_gazetteer():
+    """
+    Écrit les tables des communes et des codes postaux absentes ou dont une
+    source (voir ``GAZETTEER``) ou la ``PIPELINE_VERSION`` a changé. Une
+    table reconstruite à l'identique n'est pas réécrite : sa version, qui
+    fait partie de la clé des snapshots, reste la même.
+    """
+    from source.data import PIPELINE_VERSION
+
+    recorded = {}
+    if GAZETTEER_SOURCES_JSON.exists():
+        recorded = json.loads(GAZETTEER_SOURCES_JSON.read_text(encoding="utf-8"))
+    current = {}
+    for path, (names, build) in GAZETTEER.items():
+        current[path.name] = {"sources": source_digests(names), "pipeline": PIPELINE_VERSION}
+        if path.exists() and recorded.get(path.name) == current[path.name]:
+            continue
+        content = build().to_csv(sep=";", index=False)
+        if not path.exists() or path.read_text(encoding="utf-8") != content:
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(content, encoding="utf-8")
+            tmp.replace(path)
+    GAZETTEER_SOURCES_JSON.write_text(json.dumps(current, indent=2), encoding="utf-8")
+    return COMMUNES_CSV, CODES_POSTAUX_CSV
+
+
+def _postal_departement(code):
+    departement = departement_from_postal_code(f"{code:05d}")
+    return -1 if departement is None else departement_id(departement)
+
+
+def _weighted_centroids(coordinates, groups, weights):
+    """Centroïde de chaque groupe, pondéré par ``weights`` (au moins 1)."""
+    groups = pd.Series(np.asarray(groups), index=coordinates.index).where(lambda g: g >= 0)
+    weights = pd.Series(weights, index=coordinates.index).fillna(1).astype("float64").clip(lower=1)
+    totals = coordinates.mul(weights, axis=0).groupby(groups).sum()
+    return totals.div(weights.groupby(groups).sum(), axis=0)
+
+
+def _gazetteer_version():
+    """Version des tables des communes et des codes postaux (``None`` si absente)."""
+    from source.data import file_version
+
+    return tuple(
+        file_version(path) if path.exists() else None for path in (COMMUNES_CSV, CODES_POSTAUX_CSV)
+    )
+
+
+@lru_cache(maxsize=1)
+def _gazetteer(version):
+    """
+    Centroïdes indexés par clé de jointure, lus une fois par version des
+    tables. ``version`` ne sert que de clé de cache.
+    """
+    communes = read_communes()
+    coordinates = ["lat", "lon"]
+    by_insee = communes.dropna(subset=["commune_id"]).drop_duplicates("commune_id")
+    by_name = communes.dropna(subset=["departement_id", "nom_normalise"])
+
+    postaux = read_postal_codes()
+
+    # Centroïde du département : moyenne des communes pondérée par la
+    # population, à défaut moyenne des codes postaux pondérée par le nombre
+    # d'équipements (départements sans commune dans la table)
+    departements = _weighted_centroids(
+        communes[coordinates], communes["departement_id"], communes["population"]
+    ).combine_first(_weighted_centroids(
+        postaux[coordinates],
+        resolve_distinct(postaux["code_postal"], _postal_departement),
+        postaux["nombre"],
+    ))
+    return {
+        "commune": by_insee.set_index("commune_id")[coordinates],
+        "nom": by_name.set_index(["departement_id", "nom_normalise"])[coordinates],
+        "code_postal": postaux.set_index("code_postal")[coordinates],
+        "departement": departements,
+    }
+
+
+# ------------------------------------
+# Géocodage
+# ------------------------------------
+def geocode(frame, commune=None, nom_commune=None, code_postal=None):
+    """
+    Coordonnées approchées des lignes de ``frame`` : position de la commune
+    dérivée de ses bibliothèques (colonne ``commune`` : ``commune_id`` ; à
+    défaut ``nom_commune`` dans le département), centroïde du code postal,
+    puis du département.
+
+    Renvoie un DataFrame aligné sur ``frame`` : ``lat``, ``lon`` (float32)
+    et ``precision_geo`` (vide si aucune correspondance).
+    """
+    tables = _gazetteer(_gazetteer_version())
+    lat = np.full(len(frame), np.nan)
+    lon = np.full(len(frame), np.nan)
+    precision = np.full(len(frame), None, dtype=object)
+
+    departements = (
+        frame["departement_id"] if "departement_id" in frame.columns
+        else pd.Series(pd.NA, index=frame.index, dtype="Int16")
+    )
+    etapes = []
+    if commune is not None:
+        etapes.append(
+            ("commune_bibliotheques", tables["commune"], pd.Index(frame[commune].astype("Int32")))
+        )
+    if nom_commune is not None:
+        etapes.append(("commune_bibliotheques", tables["nom"], commune_key(departements, frame[nom_commune])))
+    if code_postal is not None:
+        etapes.append(("code_postal", tables["code_postal"], pd.Index(postal_codes(frame[code_postal]))))
+    etapes.append(("departement", tables["departement"], pd.Index(departements.astype("Int16"))))
+
+    for niveau, table, keys in etapes:
+        positions = table.index.get_indexer(keys)
+        found = (positions >= 0) & np.isnan(lat)
+        lat[found] = table["lat"].to_numpy()[positions[found]]
+        lon[found] = table["lon"].to_numpy()[positions[found]]
+        precision[found] = niveau
+
+    return pd.DataFrame({
+        "lat": lat.astype(np.float32),
+        "lon": lon.astype(np.float32),
+        "precision_geo": pd.Categorical(precision, categories=PRECISIONS),
+    }, index=frame.index)
+
+
+def add_geocoding(frame, **columns):
+    """
+    Complète ``lat`` et ``lon`` des lignes sans coordonnées valides, ajoute
+    ``precision_geo`` (voir ``geocode``) et restreint ``coord_valide`` aux
+    ``PRECISIONS_VALIDES``.
+    """
+    if "coord_valide" not in frame.columns:
+        frame = frame.assign(
+            lat=np.float32(np.nan), lon=np.float32(np.nan), coord_valide=False
+        )
+    valides = frame["coord_valide"].to_numpy(dtype=bool)
+    result = geocode(frame[~valides], **columns)
+
+    lat = frame["lat"].to_numpy(dtype=np.float32, copy=True)
+    lon = frame["lon"].to_numpy(dtype=np.float32, copy=True)
+    lat[~valides] = result["lat"].to_numpy()
+    lon[~valides] = result["lon"].to_numpy()
+    precision = np.where(valides, "adresse", None).astype(object)
+    precision[~valides] = result["precision_geo"].astype(object).to_numpy()
+    precision = pd.Categorical(precision, categories=PRECISIONS)
+    return frame.assign(
+        lat=lat, lon=lon, coord_valide=precision.isin(PRECISIONS_VALIDES), precision_geo=precision
+    )
+
+
+if __name__ == "__main__":
+    from source.data import read_source
+
+    for path in write_gazetteer():
+        print(f"{path.name} : {len(pd.read_csv(path, sep=';'))} lignes")
+    for name in ["cinemas", "bibliotheques", "festivals"]:
+        counts = read_source(name)["precision_geo"].value_counts(dropna=False)
+        print(name, counts.to_dict())
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Dimension géographique : communes, départements et régions à clés entières.
+
+Les fichiers sources désignent les territoires par des chaînes hétérogènes
+(nom de département accentué ou non, code département « 01 » / « 1 » / « 1.0 »,
+code postal, code commune INSEE…). À l'ingestion, chaque jeu de données
+reçoit les clés entières suivantes :
+
+- ``departement_id`` (Int16) : code département numérique ; la Corse est
+  codée 201 (2A) et 202 (2B) ;
+- ``commune_id`` (Int32) : ``departement_id * 1000`` + numéro de commune,
+  pour les fichiers qui portent un code commune INSEE ;
+- ``region_code`` / ``region_nom`` : voir ``source.regions``.
+
+Les jointures entre jeux de données se font ensuite sur ces entiers.
+"""
+
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from source.regions import (
+    OUTRE_MER,
+    REGION_ABBR,
+    REGION_CODES,
+    REGION_NAMES,
+    add_region_columns,
+    normalize_label,
+    resolve_codes,
+    resolve_distinct,
+)
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data_prod"
+DEPARTEMENTS_CSV = DATA_DIR / "departements-regions-france.csv"
+CODE_DEPARTEMENT_REGION_CSV = DATA_DIR / "code_departement_region.csv"
+
+CORSE = {"2A": 201, "2B": 202}
+
+# Graphies de départements absentes des fichiers de référence
+DEPARTEMENT_ALIASES = {
+    "Ile et Vilaine": 35,
+    "Seine-St-Denis": 93,
+    "Réunion": 974,
+    "Saint-Pierre-et-Miquelon": 975,
+    "Saint-Barthélemy": 977,
+    "Saint-Martin": 978,
+    "Polynésie française": 987,
+    "Nouvelle-Calédonie": 988,
+}
+
+
+# ------------------------------------
+# Codes département et commune
+# ------------------------------------
+def normalize_departement(code):
+    """Code département sur deux ou trois caractères (« 1.0 » -> « 01 »)."""
+    text = str(code).strip().upper()
+    if text.endswith(".0"):
+        text = text[:-2]
+    return text.zfill(2) if text.isdigit() else text
+
+
+def departement_id(code):
+    """Identifiant entier d'un code département (-1 si invalide)."""
+    text = normalize_departement(code)
+    if text in CORSE:
+        return CORSE[text]
+    return int(text) if text.isdigit() and len(text) <= 3 else -1
+
+
+def departement_from_postal_code(code):
+    """Département déduit d'un code postal (97x et 98x sur trois chiffres)."""
+    text = normalize_departement(code).zfill(5)
+    if len(text) != 5 or not text.isdigit():
+        return None
+    if text.startswith(("97", "98")):
+        return text[:3]
+    if text.startswith("20"):
+        # 2A ou 2B : même région, on retient le premier
+        return "2A"
+    return text[:2]
+
+
+def commune_id(code):
+    """Identifiant entier d'un code commune INSEE (« 2A004 » -> 201004)."""
+    text = str(code).strip().upper().zfill(5)
+    if len(text) != 5:
+        return -1
+    split = 3 if text.startswith("97") else 2
+    departement = departement_id(text[:split])
+    if departement < 0 or not text[split:].isdigit():
+        return -1
+    return departement * 1000 + int(text[split:])
+
+
+# ------------------------------------
+# Référentiel des départements
+# ------------------------------------
+@lru_cache(maxsize=1)
+def _departements_reference():
+    """Table de référence lue une fois par processus."""
+    table = pd.read_csv(DEPARTEMENTS_CSV, dtype=str)
+    table["departement_id"] = [departement_id(code) for code in table["code_departement"]]
+    table["region_code"] = resolve_codes(table["code_region"])
+    return table
+
+
+@lru_cache(maxsize=1)
+def _departement_regions():
+    table = _departements_reference()
+    return dict(zip(table["departement_id"], table["region_code"]))
+
+
+@lru_cache(maxsize=1)
+def _departement_names():
+    table = _departements_reference()
+    names = dict(zip(table["nom_departement"], table["departement_id"]))
+    # Noms sans accents utilisés par les fichiers cinéma
+    other = pd.read_csv(CODE_DEPARTEMENT_REGION_CSV, sep=";", dtype=str)
+    names.update(zip(other["dep_name"], [departement_id(code) for code in other["num_dep"]]))
+    names.update(DEPARTEMENT_ALIASES)
+    return {normalize_label(name): dep for name, dep in names.items()}
+
+
+def _from_code(code):
+    return departement_id(code)
+
+
+def _from_postal_code(code):
+    departement = departement_from_postal_code(code)
+    return -1 if departement is None else departement_id(departement)
+
+
+def _from_name(name):
+    return _departement_names().get(normalize_label(name), -1)
+
+
+def _region_of(departement):
+    if departement >= 970:
+        # DROM et collectivités d'outre-mer (Saint-Pierre, Polynésie…)
+        return OUTRE_MER
+    return _departement_regions().get(departement, -1)
+
+
+def departement_regions(departements):
+    """Codes de région (-1 si inconnu) d'une série de ``departement_id``."""
+    return resolve_distinct(departements, _region_of)
+
+
+def resolve_departements(frame, code_column=None, postal_column=None, name_column=None):
+    """
+    ``departement_id`` de chaque ligne (-1 si inconnu), à partir du code
+    département, à défaut du code postal, à défaut du nom du département.
+    """
+    resolved = np.full(len(frame), -1, dtype=np.int16)
+    sources = [
+        (code_column, _from_code),
+        (postal_column, _from_postal_code),
+        (name_column, _from_name),
+    ]
+    for column, resolve in sources:
+        if column is not None:
+            resolved = np.where(resolved < 0, resolve_distinct(frame[column], resolve), resolved)
+    return resolved
+
+
+def _nullable(values, dtype):
+    values = np.asarray(values)
+    missing = values < 0
+    return pd.arrays.IntegerArray(np.where(missing, 0, values).astype(dtype), missing)
+
+
+def add_geo_columns(frame, departement=None, code_postal=None, nom_departement=None,
+                    commune=None, region_label=None, region_code=None):
+    """
+    Ajoute les clés entières ``departement_id``, ``commune_id`` (si un code
+    commune est fourni), ``region_code`` et ``region_nom`` à ``frame``.
+
+    La région est déduite du département quand il est connu, sinon du code
+    ou du libellé de région du fichier.
+    """
+    departements = resolve_departements(frame, departement, code_postal, nom_departement)
+    columns = {}
+    if departement or code_postal or nom_departement:
+        columns["departement_id"] = _nullable(departements, np.int16)
+    if commune is not None:
+        columns["commune_id"] = _nullable(resolve_distinct(frame[commune], commune_id, np.int32), np.int32)
+    frame = frame.assign(**columns)
+    regions = departement_regions(departements)
+    return add_region_columns(frame, region_label, region_code, codes=regions)
+
+
+# ------------------------------------
+# Tables de dimension
+# ------------------------------------
+def build_departements(departements_regions, population):
+    """
+    Dimension département : ``departement_id``, code et nom, région, population.
+
+    ``departements_regions`` et ``population`` (population-france-par-dept.csv)
+    sont les jeux déjà chargés ; ils portent ``departement_id`` ajouté à
+    l'ingestion.
+    """
+    table = departements_regions[
+        ["departement_id", "code_departement", "nom_departement", "region_code", "region_nom"]
+    ]
+    population = (
+        population.dropna(subset=["departement_id"])
+        .groupby("departement_id")["Total"].sum()
+        .rename("population")
+    )
+    table = table.merge(population, left_on="departement_id", right_index=True, how="left")
+    return table.sort_values("departement_id").reset_index(drop=True)
+
+
+def build_regions(departements):
+    """Dimension région : code, abréviation, nom, population, nombre de départements."""
+    table = pd.DataFrame({
+        "region_code": pd.array(REGION_CODES, dtype="Int8"),
+        "region_abbr": [REGION_ABBR[code] for code in REGION_CODES],
+        "region_nom": pd.Categorical(REGION_NAMES, categories=REGION_NAMES),
+    })
+    totals = departements.groupby("region_code").agg(
+        population=("population", "sum"),
+        nb_departements=("departement_id", "size"),
+    )
+    return table.merge(totals, left_on="region_code", right_index=True, how="left")
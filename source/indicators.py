@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Table d'indicateurs région × type d'équipement.
+
+Usage : ``make build_data`` (ou ``python -m source.indicators``).
+
+La table est calculée une fois à partir des fichiers sources puis écrite
+dans ``data_prod/indicateurs_regions.csv``, versionné avec les données.
+Les pages (Répartition, Conclusion) lisent directement ces quelques dizaines
+de lignes au lieu de recharger et d'agréger les fichiers bruts.
+
+Colonnes :
+
+- ``region_code``, ``region_nom`` : voir ``source.regions`` ;
+- ``equipement`` : musées, cinémas, festivals, bibliothèques ;
+- ``nombre`` : nombre d'équipements recensés ;
+- ``population`` : population de la région ;
+- ``pour_100k`` : nombre d'équipements pour 100 000 habitants ;
+- ``frequentation`` : entrées annuelles (musées : dernière année disponible,
+  cinémas : 2023, bibliothèques : entrées renseignées ; vide pour les
+  festivals).
+"""
+
+import pandas as pd
+import streamlit as st
+
+from source.data import DATA_DIR, file_version, read_source
+from source.geography import build_departements, build_regions
+from source.regions import REGION_NAMES
+
+INDICATORS_CSV = DATA_DIR / "indicateurs_regions.csv"
+
+# Type d'équipement -> jeu de données recensant les équipements
+EQUIPEMENTS = {
+    "Musées": "musees",
+    "Cinémas": "cinemas",
+    "Festivals": "festivals",
+    "Bibliothèques": "bibliotheques",
+}
+
+COLUMNS = [
+    "region_code", "region_nom", "equipement", "nombre",
+    "population", "pour_100k", "frequentation",
+]
+
+
+# ------------------------------------
+# Fréquentation par région
+# ------------------------------------
+def _frequentation_musees():
+    frame = read_source("frequentation_musees")
+    frame = frame[frame["ANNEE"] == frame["ANNEE"].max()]
+    return frame.groupby("region_code")["TOTAL"].sum().astype("float64")
+
+
+def _frequentation_cinemas():
+    frame = read_source("frequentation_cinemas_region")
+    # Millions d'entrées
+    return (frame["2023"] * 1_000_000).groupby(frame["region_code"]).sum()
+
+
+def _frequentation_bibliotheques():
+    frame = read_source("bibliotheques")
+    entrees = frame["nombre_d_entrees"].astype("float64")
+    return entrees.groupby(frame["region_code"]).sum()
+
+
+FREQUENTATIONS = {
+    "Musées": _frequentation_musees,
+    "Cinémas": _frequentation_cinemas,
+    "Bibliothèques": _frequentation_bibliotheques,
+}
+
+
+# ------------------------------------
+# Construction
+# ------------------------------------
+def build_region_indicators():
+    """Calcule la table d'indicateurs à partir des fichiers sources."""
+    departements = build_departements(
+        read_source("departements_regions"), read_source("population_departements")
+    )
+    regions = build_regions(departements)[["region_code", "region_nom", "population"]]
+
+    tables = []
+    for equipement, name in EQUIPEMENTS.items():
+        counts = read_source(name).groupby("region_code").size()
+        table = regions.assign(equipement=equipement)
+        # Régions sans équipement (ex. cinémas en outre-mer) : 0
+        table["nombre"] = table["region_code"].map(counts).fillna(0).astype(int)
+        if equipement in FREQUENTATIONS:
+            table["frequentation"] = table["region_code"].map(FREQUENTATIONS[equipement]())
+        tables.append(table)
+
+    table = pd.concat(tables, ignore_index=True)
+    table["pour_100k"] = (table["nombre"] / table["population"] * 100_000).round(2)
+    table["frequentation"] = table["frequentation"].round()
+    return _typed(table[COLUMNS])
+
+
+def _typed(table):
+    """Types compacts, identiques que la table soit calculée ou relue."""
+    return table.astype({
+        "region_code": "Int8",
+        "region_nom": pd.CategoricalDtype(REGION_NAMES),
+        "equipement": pd.CategoricalDtype(list(EQUIPEMENTS)),
+        "nombre": "int32",
+        "population": "Int64",
+        "pour_100k": "float32",
+        "frequentation": "Float64",
+    })
+
+
+def write_region_indicators(path=INDICATORS_CSV):
+    table = build_region_indicators()
+    tmp = path.with_suffix(".tmp")
+    table.to_csv(tmp, sep=";", index=False)
+    tmp.replace(path)
+    return path
+
+
+# ------------------------------------
+# Lecture
+# ------------------------------------
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _read_indicators(version):
+    if version is None:
+        # Table pas encore construite : calcul à la volée
+        return build_region_indicators()
+    return _typed(pd.read_csv(INDICATORS_CSV, sep=";"))
+
+
+def load_region_indicators():
+    """Table région × équipement (format long) depuis le cache partagé."""
+    version = file_version(INDICATORS_CSV) if INDICATORS_CSV.exists() else None
+    return _read_indicators(version).copy(deep=False)
+
+
+def region_indicators_wide(values="nombre"):
+    """Une ligne par région, une colonne par type d'équipement."""
+    table = load_region_indicators()
+    wide = table.pivot(index="region_code", columns="equipement", values=values)
+    regions = table.drop_duplicates("region_code").set_index("region_code")
+    return regions[["region_nom", "population"]].join(wide).reset_index()
+
+
+if __name__ == "__main__":
+    path = write_region_indicators()
+    print(f"{path.name} : {path.stat().st_size} octets")
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Indicateurs clés (cartes ``st.metric``) des pages, précalculés.
+
+Usage : ``make build_data`` (ou ``python -m source.kpis``).
+
+Les cartes en haut des pages Cinémas et Festivals ne demandent que
+quelques comptages, mais elles attendaient jusqu'ici la lecture de tous
+les fichiers de la page. Les valeurs sont donc calculées une fois et
+écrites dans ``data_prod/kpis.json``, avec l'empreinte (SHA-1) des
+fichiers sources et la ``PIPELINE_VERSION`` utilisées : la page affiche
+ses cartes dès la lecture de ce petit fichier, avant tout CSV.
+
+Les empreintes des fichiers sont recalculées une fois par version
+(date de modification + taille). Si le fichier d'indicateurs manque ou si
+une source a changé, les valeurs sont calculées à partir des jeux de
+données en cache (``source.data.load``), comme avant.
+"""
+
+import hashlib
+import json
+
+import streamlit as st
+
+from source.data import DATA_DIR, DATASETS, PIPELINE_VERSION, file_version, load, read_source
+
+KPIS_JSON = DATA_DIR / "kpis.json"
+
+
+# ------------------------------------
+# Indicateurs par page
+# ------------------------------------
+def _kpis_cinemas(cinemas, par_region):
+    total = len(cinemas)
+    regions = int(par_region["region_code"].nunique())
+    return {"total": total, "regions": regions, "moyenne": total / regions}
+
+
+def _kpis_festivals(festivals):
+    total = len(festivals)
+    # DROM et COM regroupés
+    regions = int(festivals["region_nom"].nunique())
+    return {"total": total, "regions": regions, "moyenne": total / regions}
+
+
+# Page -> (jeux de données sources, calcul)
+KPIS = {
+    "cinemas": (["cinemas", "cinemas_par_region"], _kpis_cinemas),
+    "festivals": (["festivals"], _kpis_festivals),
+}
+
+
+# ------------------------------------
+# Construction
+# ------------------------------------
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _digest(name, version):
+    """Empreinte du fichier du jeu ``name``. ``version`` ne sert que de clé de cache."""
+    with open(DATASETS[name].path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def source_digests(page):
+    """Empreintes actuelles des fichiers sources de ``page``."""
+    names, _ = KPIS[page]
+    return {name: _digest(name, file_version(DATASETS[name].path)) for name in names}
+
+
+def build_kpis():
+    """Calcule les indicateurs de chaque page à partir des fichiers sources."""
+    kpis = {}
+    for page, (names, compute) in KPIS.items():
+        kpis[page] = {
+            "sources": source_digests(page),
+            "pipeline": PIPELINE_VERSION,
+            "valeurs": compute(*(read_source(name) for name in names)),
+        }
+    return kpis
+
+
+def write_kpis(path=KPIS_JSON):
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(build_kpis(), f, ensure_ascii=False, indent=2)
+    tmp.replace(path)
+    return path
+
+
+# ------------------------------------
+# Lecture
+# ------------------------------------
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _read_kpis(version):
+    with open(KPIS_JSON, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_kpis(page):
+    """
+    Indicateurs de ``page`` (``total``, ``regions``, ``moyenne``) : lus dans
+    le fichier précalculé s'il est à jour, sinon calculés.
+    """
+    if KPIS_JSON.exists():
+        entry = _read_kpis(file_version(KPIS_JSON)).get(page)
+        if (
+            entry is not None
+            and entry["pipeline"] == PIPELINE_VERSION
+            and entry["sources"] == source_digests(page)
+        ):
+            return dict(entry["valeurs"])
+    names, compute = KPIS[page]
+    return compute(*(load(name) for name in names))
+
+
+if __name__ == "__main__":
+    path = write_kpis()
+    print(f"{path.name} : {path.stat().st_size} octets")
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Imports différés des bibliothèques de calcul et de tracé.
+
+matplotlib.pyplot, scipy (signal, ndimage, spatial) ou contourpy coûtent
+chacun de quelques dixièmes de seconde à une seconde à importer, alors que
+la plupart des pages ne s'en servent que pour reconstruire une donnée
+absente du cache, voire jamais. Les modules de ``source`` les déclarent
+donc avec ``lazy_import`` :
+
+    plt = lazy_import("matplotlib.pyplot")
+
+``plt`` n'importe matplotlib.pyplot qu'au premier accès à l'un de ses
+attributs (``plt.subplots``…) : une page ne paie que les bibliothèques
+qu'elle appelle effectivement. ``IMPORTS`` garde la durée de chaque import
+différé effectué (voir ``source.startup``).
+"""
+
+import importlib
+import sys
+import time
+
+# Durée (s) des imports différés effectués, par module
+IMPORTS = {}
+
+
+def _load(name):
+    if name in sys.modules:
+        return sys.modules[name]
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORTS[name] = time.perf_counter() - start
+    return module
+
+
+class LazyModule:
+    """Module importé au premier accès à l'un de ses attributs."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attribute):
+        return getattr(_load(self._name), attribute)
+
+    def __repr__(self):
+        state = "importé" if self._name in sys.modules else "non importé"
+        return f"<module différé {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    """Module ``name``, importé au premier accès à l'un de ses attributs."""
+    return LazyModule(name)
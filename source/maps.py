@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Cartes de points agrégées côté serveur.
+
+Envoyer chaque point au navigateur (15 000 bibliothèques, 7 000 festivals)
+produit une figure de plusieurs mégaoctets, lente à sérialiser et à
+manipuler. ``point_map`` regroupe les points en cellules de grille dont
+l'échelle est choisie avec un curseur : une bulle par cellule, avec le
+nombre de points et la valeur dominante de la colonne de couleur (région,
+discipline…). L'échelle fixe aussi le zoom initial de la carte ; zoomer
+ensuite dans la carte ne recalcule pas les cellules. Les points
+individuels ne sont envoyés que lorsque la zone affichée est assez petite :
+une région contenant au plus ``MAX_POINTS`` points, ou une région vue à
+une échelle d'au moins ``RAW_ZOOM``.
+
+Les cellules suivent le découpage des tuiles web (Web Mercator) : au zoom
+``z``, une tuile de 256 pixels est découpée en ``2 ** CELL_LEVELS`` cellules
+de côté, soit des cellules d'environ 16 pixels à l'écran quel que soit le
+zoom. Les cellules sont calculées une fois par jeu, région et zoom, puis
+gardées dans le cache partagé.
+
+Un second moteur, ``folium``, délègue le regroupement au navigateur
+(Leaflet.markercluster, via ``FastMarkerCluster``) : les points sont
+envoyés une seule fois sous forme d'un tableau JSON compact
+``[lat, lon, indice de couleur, libellé]`` et les marqueurs sont créés côté
+client, sans objet Python par marqueur. Le moteur se choisit avec la
+variable d'environnement ``MAP_BACKEND`` (``plotly`` par défaut) ou
+l'argument ``backend`` de ``point_map`` ; il est utile lorsque les figures
+plotly deviennent trop lourdes (voir ``make payload_report``).
+"""
+
+import html
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from source.data import dataset_version, load_partition, partition_keys
+from source.payload import plotly_chart
+from source.raster import TERRITOIRES
+
+# Au-delà de ce nombre de points, la carte affiche des cellules agrégées
+MAX_POINTS = 2000
+# À partir de ce zoom, une région est toujours affichée point par point
+RAW_ZOOM = 7
+# Niveaux de zoom proposés (4 : France entière, 8 : agglomération)
+ZOOMS = [4, 5, 6, 7, 8]
+# Libellé de l'échelle des cellules de chaque zoom
+ECHELLES = {4: "France", 5: "Grande région", 6: "Région", 7: "Département", 8: "Agglomération"}
+# Subdivisions d'une tuile : 2 ** 4 = 16 cellules de 16 pixels par côté
+CELL_LEVELS = 4
+# Limite de la projection Web Mercator
+MAX_LATITUDE = 85.05112878
+
+# Moteur des cartes de points : "plotly" (agrégation serveur) ou "folium"
+# (regroupement dans le navigateur)
+BACKENDS = ["plotly", "folium"]
+MAP_BACKEND = os.environ.get("MAP_BACKEND", "plotly")
+# Décimales des coordonnées envoyées au navigateur (1e-5 degré ~ 1 m)
+COORD_DECIMALS = 5
+# Options de Leaflet.markercluster
+CLUSTER_OPTIONS = {"chunkedLoading": True, "maxClusterRadius": 60}
+
+
+# ------------------------------------
+# Agrégation
+# ------------------------------------
+def tile_coordinates(lat, lon, zoom):
+    """Indices (x, y) de la tuile Web Mercator contenant chaque point."""
+    n = 2.0 ** zoom
+    lat = np.radians(np.clip(np.asarray(lat, dtype=np.float64), -MAX_LATITUDE, MAX_LATITUDE))
+    lon = np.asarray(lon, dtype=np.float64)
+    x = np.floor((lon + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.arcsinh(np.tan(lat)) / np.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+def bin_points(frame, zoom, by):
+    """
+    Cellules de grille au zoom ``zoom`` : position moyenne des points,
+    ``nombre`` de points et valeur dominante de la colonne ``by``.
+    """
+    level = zoom + CELL_LEVELS
+    x, y = tile_coordinates(frame["lat"], frame["lon"], level)
+    points = frame[["lat", "lon", by]].assign(cellule=x * (2 ** level) + y)
+
+    cells = points.groupby("cellule").agg(
+        lat=("lat", "mean"), lon=("lon", "mean"), nombre=("lat", "size")
+    )
+    # Valeur la plus fréquente de chaque cellule
+    counts = points.groupby(["cellule", by], observed=True).size().rename("n").reset_index()
+    counts = counts.sort_values(["cellule", "n"], ascending=[True, False], kind="stable")
+    cells[by] = counts.drop_duplicates("cellule").set_index("cellule")[by]
+    return cells.reset_index(drop=True)
+
+
+@st.cache_resource(show_spinner=False, max_entries=128)
+def _cells(name, version, region_column, region, where, zoom, by):
+    """Cellules d'une région (``None`` : toutes) au zoom ``zoom``."""
+    points = load_partition(name, region_column, key=region, where=where)
+    return bin_points(points, zoom, by)
+
+
+def binned_points(name, zoom, by, region=None, region_column="region_nom", where="coord_valide"):
+    """Cellules agrégées du jeu ``name`` depuis le cache partagé."""
+    version = dataset_version(name)
+    return _cells(name, version, region_column, region, where, zoom, by).copy(deep=False)
+
+
+def map_center(points, region=None):
+    """
+    Centre initial de la carte : emprise de la Métropole pour la France
+    entière, sinon moyenne des points de la région situés dans le
+    territoire (Métropole ou DROM) qui en contient le plus.
+    """
+    if region is None:
+        (lon0, lat0, lon1, lat1), _ = TERRITOIRES["Métropole"]
+        return {"lat": (lat0 + lat1) / 2, "lon": (lon0 + lon1) / 2}
+    lat = points["lat"].to_numpy(np.float64)
+    lon = points["lon"].to_numpy(np.float64)
+    best = None
+    for (lon0, lat0, lon1, lat1), _ in TERRITOIRES.values():
+        inside = (lon >= lon0) & (lon <= lon1) & (lat >= lat0) & (lat <= lat1)
+        if best is None or inside.sum() > best.sum():
+            best = inside
+    if not best.any():
+        best = np.isfinite(lat) & np.isfinite(lon)
+    return {"lat": float(lat[best].mean()), "lon": float(lon[best].mean())}
+
+
+# ------------------------------------
+# Regroupement dans le navigateur (folium)
+# ------------------------------------
+def _palette(categories, colors):
+    """Couleur de chaque catégorie (dictionnaire, liste ou palette plotly)."""
+    if isinstance(colors, dict):
+        default = px.colors.qualitative.Plotly
+        return [colors.get(value, default[i % len(default)]) for i, value in enumerate(categories)]
+    colors = colors or px.colors.qualitative.Plotly
+    return [colors[i % len(colors)] for i in range(len(categories))]
+
+
+def cluster_rows(points, color, hover_name):
+    """
+    Tableau compact ``[lat, lon, indice de couleur, libellé]`` des points
+    et valeurs de ``color`` correspondant aux indices.
+    """
+    categories = pd.Categorical(points[color].astype("string").fillna("Non renseigné"))
+    labels = pd.Categorical(points[hover_name].astype("string").fillna(""))
+    # Échappement HTML une fois par libellé distinct
+    names = np.asarray([html.escape(str(value)) for value in labels.categories], dtype=object)
+    rows = list(zip(
+        np.round(points["lat"].to_numpy(np.float64), COORD_DECIMALS).tolist(),
+        np.round(points["lon"].to_numpy(np.float64), COORD_DECIMALS).tolist(),
+        categories.codes.tolist(),
+        np.where(labels.codes >= 0, names[labels.codes.clip(0)], "").tolist(),
+    ))
+    return rows, [str(value) for value in categories.categories]
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _rows(name, version, region_column, region, where, color, hover_name):
+    points = load_partition(name, region_column, key=region, where=where)
+    return cluster_rows(points, color, hover_name)
+
+
+def _marker_callback(values, palette):
+    """Fonction JavaScript créant le marqueur d'une ligne du tableau compact."""
+    return """(function () {
+        var valeurs = %s;
+        var couleurs = %s;
+        return function (row) {
+            var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+                radius: 6, weight: 1, color: couleurs[row[2]], fillOpacity: 0.8
+            });
+            marker.bindTooltip(row[3] + "<br>" + valeurs[row[2]]);
+            return marker;
+        };
+    })()""" % (json.dumps([html.escape(value) for value in values]), json.dumps(palette))
+
+
+def cluster_map(rows, values, colors=None, center=None, zoom=5, key="carte", height=700):
+    """
+    Carte folium des lignes ``rows`` (voir ``cluster_rows``), regroupées
+    dans le navigateur. ``colors`` suit la convention de ``point_map``.
+    """
+    # Chargés seulement si ce moteur est choisi
+    import folium
+    from folium.plugins import FastMarkerCluster
+    from streamlit_folium import st_folium
+
+    if center is None:
+        coordinates = np.asarray([row[:2] for row in rows]) if rows else np.asarray([[46.6, 2.4]])
+        center = {"lat": float(coordinates[:, 0].mean()), "lon": float(coordinates[:, 1].mean())}
+    carte = folium.Map(
+        location=[center["lat"], center["lon"]], zoom_start=zoom,
+        tiles="OpenStreetMap", prefer_canvas=True,
+    )
+    FastMarkerCluster(
+        rows, callback=_marker_callback(values, _palette(values, colors)), options=CLUSTER_OPTIONS,
+    ).add_to(carte)
+    # Aucune valeur renvoyée : les déplacements sur la carte ne relancent pas le script
+    st_folium(carte, key=key, height=height, returned_objects=[], use_container_width=True)
+
+
+# ------------------------------------
+# Composant Streamlit
+# ------------------------------------
+@st.fragment
+def point_map(name, color, hover_name, hover_data=None, labels=None, colors=None,
+              region_column="region_nom", where="coord_valide", key="carte", height=700,
+              backend=None):
+    """
+    Carte des points du jeu ``name``, avec choix de la région et du zoom.
+
+    Exécutée dans un fragment : changer de région ou de zoom ne relance que
+    la carte. ``colors`` est soit un dictionnaire valeur -> couleur, soit
+    une liste de couleurs. ``backend`` (par défaut ``MAP_BACKEND``) choisit
+    le moteur, voir le module.
+    """
+    regions = partition_keys(name, region_column, where=where)
+    col1, col2 = st.columns([2, 1])
+    choix_region = col1.selectbox(
+        "Choisir une région", ["Toutes"] + sorted(regions), key=f"{key}_region"
+    )
+    zoom = col2.select_slider(
+        "Taille des cellules", ZOOMS, value=ZOOMS[0], key=f"{key}_zoom",
+        format_func=ECHELLES.get,
+        help="Échelle des cellules de regroupement et cadrage initial. Indépendante du "
+             "zoom de la carte : zoomer dans la carte ne recalcule pas les cellules.",
+    )
+
+    region = None if choix_region == "Toutes" else choix_region
+    if (backend or MAP_BACKEND) == "folium":
+        version = dataset_version(name)
+        rows, values = _rows(name, version, region_column, region, where, color, hover_name)
+        center = map_center(load_partition(name, region_column, key=region, where=where), region)
+        cluster_map(rows, values, colors, center=center, zoom=zoom, key=key, height=height)
+        st.caption(f"{len(rows)} points, regroupés dans le navigateur selon le zoom.")
+        return
+
+    points = load_partition(name, region_column, key=region, where=where)
+    center = map_center(points, region)
+    labels = labels or {}
+    color_options = (
+        {"color_discrete_map": colors} if isinstance(colors, dict)
+        else {"color_discrete_sequence": colors}
+    )
+
+    if len(points) <= MAX_POINTS or (region is not None and zoom >= RAW_ZOOM):
+        fig = px.scatter_map(
+            points, lat="lat", lon="lon", color=color,
+            hover_name=hover_name, hover_data=hover_data, labels=labels,
+            zoom=zoom, center=center, height=height, **color_options,
+        )
+        st.caption(f"{len(points)} points affichés individuellement.")
+    else:
+        cells = binned_points(name, zoom, color, region, region_column, where)
+        fig = px.scatter_map(
+            cells, lat="lat", lon="lon", color=color, size="nombre", size_max=28,
+            hover_data={"nombre": True, "lat": False, "lon": False},
+            labels={"nombre": "Nombre", **labels},
+            zoom=zoom, center=center, height=height, **color_options,
+        )
+        st.caption(
+            f"{len(points)} points regroupés en {len(cells)} cellules "
+            f"(couleur : valeur dominante), à l'échelle choisie. Choisissez une région et "
+            f"une taille « {ECHELLES[RAW_ZOOM]} » ou plus fine pour afficher les points "
+            f"individuellement."
+        )
+
+    fig.update_layout(map_style="open-street-map", margin={"r": 0, "t": 0, "l": 0, "b": 0})
+    plotly_chart(fig, key=key)
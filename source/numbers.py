@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Lecture des nombres au format français.
+
+Plusieurs fichiers écrivent les nombres à la française : séparateur de
+milliers espace (« 335 768 », parfois espace insécable U+00A0 ou espace fine
+insécable U+202F) et virgule décimale (« 181,3 »). ``parse_number`` les
+convertit en une seule passe vectorisée ; ``source.schemas`` l'applique à
+l'ingestion à toute colonne texte déclarée numérique, si bien que les pages
+reçoivent directement des colonnes typées.
+"""
+
+import pandas as pd
+
+# Séparateurs de milliers : espace, espace insécable, espace fine insécable.
+# Listés explicitement : « \s » ne couvre pas toujours U+00A0 et U+202F
+# selon le moteur d'expressions régulières (chaînes pyarrow).
+SEPARATEURS_MILLIERS = "[ \t\u00a0\u202f]"
+
+
+def parse_number(values):
+    """
+    Nombres (float64, NaN si illisible) d'une colonne de texte au format
+    français : « 335 768 » -> 335768.0, « 21,86 » -> 21.86.
+    """
+    text = pd.Series(values).astype("string")
+    text = text.str.replace(SEPARATEURS_MILLIERS, "", regex=True)
+    text = text.str.replace(",", ".", regex=False)
+    return pd.to_numeric(text, errors="coerce").astype("float64")
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Allègement des figures plotly envoyées au navigateur.
+
+Usage du rapport : ``make payload_report`` (ou ``python -m source.payload``).
+
+Une carte de plusieurs milliers de points embarque, pour chaque point, ses
+coordonnées en float64 et ses données de survol (région, discipline…),
+souvent répétées à l'identique. ``optimize_figure`` réduit ce volume :
+
+- latitudes et longitudes arrondies à ``COORD_DECIMALS`` décimales
+  (environ 1 m) et envoyées en float32, sans perte au-delà de l'arrondi ;
+  les autres tableaux numériques (x/y, tailles, couleurs, données de survol
+  numériques) gardent leur précision, les entiers passant seulement en
+  int32. Plotly les transmet en tableaux typés encodés en base64
+  (``bdata``) plutôt qu'en listes JSON ;
+- données de survol textuelles dédoublonnées : une colonne constante dans
+  une trace est écrite une seule fois dans le modèle de survol
+  (``hovertemplate``) ; une colonne d'au plus ``MAX_SPLIT`` valeurs
+  distinctes découpe la trace en sous-traces (même entrée de légende), dont
+  chacune porte sa valeur dans le modèle. Le découpage n'est retenu que
+  s'il rend la trace plus légère ;
+- nuages de points de plus de ``WEBGL_MIN_POINTS`` points convertis en
+  traces WebGL (``scattergl``) ; les cartes (``scattermap``) le sont déjà.
+
+Une trace que l'arrondi et le dédoublonnage n'allègent pas est envoyée
+telle quelle (au passage en WebGL près) : la figure optimisée n'est pas
+plus lourde que l'originale.
+
+``plotly_chart`` remplace ``st.plotly_chart`` : il optimise la figure et,
+si la variable d'environnement ``PAYLOAD_REPORT`` est définie, mesure la
+taille de la figure avant et après (``payload_report``).
+"""
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+
+# Décimales conservées pour les coordonnées (1e-5 degré ~ 1 m)
+COORD_DECIMALS = 5
+# Au-delà de ce nombre de valeurs distinctes, une colonne de survol n'est pas découpée
+MAX_SPLIT = 30
+# À partir de ce nombre de points, un nuage de points passe en WebGL
+WEBGL_MIN_POINTS = 1000
+
+# Traces de points optimisées (les autres sont envoyées telles quelles)
+SCATTER_TYPES = {"scatter", "scattergl", "scattermap", "scattermapbox", "scattergeo"}
+# Attributs de coordonnées quantifiés, par type de trace
+COORDINATES = {
+    "scattermap": ["lat", "lon"],
+    "scattermapbox": ["lat", "lon"],
+    "scattergeo": ["lat", "lon"],
+}
+# Attributs par point, découpés avec la trace
+PER_POINT = ["lat", "lon", "x", "y", "customdata", "hovertext", "text", "ids"]
+PER_POINT_MARKER = ["size", "color", "opacity", "symbol"]
+
+# Tailles mesurées (graphique, avant, après), si PAYLOAD_REPORT est défini
+PAYLOADS = []
+
+
+# ------------------------------------
+# Tableaux
+# ------------------------------------
+def _numeric(values):
+    """Tableau numpy numérique de ``values``, ou ``None`` s'il ne l'est pas."""
+    if values is None or isinstance(values, str):
+        return None
+    array = np.asarray(values)
+    if array.dtype.kind in "biuf" and array.ndim >= 1:
+        return array
+    return None
+
+
+def _typed(values):
+    """
+    Tableau numpy (encodé en base64 par plotly) si numérique, en int32 pour
+    les entiers qui y tiennent ; les flottants gardent leur précision.
+    """
+    array = _numeric(values)
+    if array is None:
+        return values
+    if array.dtype.kind in "iu" and np.abs(array).max(initial=0) < 2 ** 31:
+        return array.astype(np.int32)
+    return array
+
+
+def _quantize(values):
+    """Coordonnées arrondies à ``COORD_DECIMALS`` décimales, en float32."""
+    array = _numeric(values)
+    if array is None:
+        return values
+    return np.round(array.astype(np.float64), COORD_DECIMALS).astype(np.float32)
+
+
+# ------------------------------------
+# Données de survol
+# ------------------------------------
+def _reference(column):
+    """Motif des références à ``customdata[column]`` dans un modèle de survol."""
+    return re.compile(r"%\{customdata\[" + str(column) + r"\](:[^}]*)?\}")
+
+
+def _inline(template, column, value):
+    """Remplace les références à ``customdata[column]`` par ``value``."""
+    text = "" if pd.isna(value) else str(value)
+    return _reference(column).sub(lambda _: text, template)
+
+
+def _drop_columns(trace, columns):
+    """Retire des colonnes de ``customdata`` et renumérote le modèle."""
+    customdata = np.asarray(trace.customdata, dtype=object)
+    keep = [column for column in range(customdata.shape[1]) if column not in columns]
+    template = trace.hovertemplate
+    for new, old in enumerate(keep):
+        template = _reference(old).sub(
+            lambda match, new=new: f"%{{customdata[#{new}]{match.group(1) or ''}}}", template
+        )
+    trace.hovertemplate = template.replace("customdata[#", "customdata[")
+    if not keep:
+        trace.customdata = None
+        return
+    remaining = customdata[:, keep]
+    try:
+        # Colonnes restantes toutes numériques : tableau typé 2D
+        trace.customdata = remaining.astype(np.float64)
+    except (TypeError, ValueError):
+        trace.customdata = remaining
+
+
+def _subset(trace, positions):
+    """Copie de ``trace`` réduite aux points ``positions``."""
+    subset = type(trace)(trace)
+    size = len(trace.customdata)
+    for attribute in PER_POINT:
+        values = trace[attribute] if attribute in trace else None
+        if values is not None and not isinstance(values, str) and len(values) == size:
+            subset[attribute] = np.asarray(values)[positions]
+    for attribute in PER_POINT_MARKER:
+        values = trace.marker[attribute]
+        if values is not None and not isinstance(values, (str, int, float)) and len(values) == size:
+            subset.marker[attribute] = np.asarray(values)[positions]
+    return subset
+
+
+def _dedup_hover(trace):
+    """Traces équivalentes à ``trace`` sans chaînes de survol répétées."""
+    customdata = np.asarray(trace.customdata, dtype=object)
+    if customdata.ndim != 2 or not len(customdata) or not trace.hovertemplate:
+        return [trace]
+
+    # Colonnes textuelles de faible cardinalité, de la moins à la plus variée
+    frame = pd.DataFrame(customdata)
+    columns = [
+        column for column in frame.columns
+        if frame[column].map(lambda value: isinstance(value, str)).all()
+        and frame[column].nunique() <= MAX_SPLIT
+    ]
+    columns.sort(key=lambda column: frame[column].nunique())
+    while columns and len(frame[columns].drop_duplicates()) > MAX_SPLIT:
+        columns.pop()
+    if not columns:
+        _drop_columns(trace, [])
+        return [trace]
+
+    traces = []
+    for values, positions in frame.groupby(columns, sort=False).indices.items():
+        child = _subset(trace, positions) if len(positions) < len(frame) else trace
+        values = values if isinstance(values, tuple) else (values,)
+        for column, value in zip(columns, values):
+            child.hovertemplate = _inline(child.hovertemplate, column, value)
+        child.showlegend = trace.showlegend if not traces else False
+        traces.append(child)
+    for child in traces:
+        _drop_columns(child, columns)
+    return traces
+
+
+# ------------------------------------
+# Figure
+# ------------------------------------
+def _webgl(trace):
+    """Trace WebGL équivalente à un grand nuage de points, ``trace`` sinon."""
+    if trace.type == "scatter" and trace.x is not None and len(trace.x) >= WEBGL_MIN_POINTS:
+        return go.Scattergl(trace.to_plotly_json(), skip_invalid=True)
+    return trace
+
+
+def _optimize_trace(trace):
+    if trace.type not in SCATTER_TYPES:
+        return [trace]
+    for attribute in COORDINATES.get(trace.type, []):
+        trace[attribute] = _quantize(trace[attribute])
+    if trace.type in ("scatter", "scattergl"):
+        trace.x, trace.y = _typed(trace.x), _typed(trace.y)
+    for attribute in ("size", "color"):
+        trace.marker[attribute] = _typed(trace.marker[attribute])
+    if trace.customdata is not None:
+        # Découpage retenu seulement s'il allège la trace
+        traces = _dedup_hover(type(trace)(trace))
+        if _traces_size(traces) < _traces_size([trace]):
+            return traces
+    return [trace]
+
+
+def optimize_figure(fig):
+    """
+    Copie allégée de ``fig`` (voir le module) ; une trace que l'optimisation
+    n'allège pas est gardée telle quelle.
+    """
+    fig = go.Figure(fig)
+    traces = []
+    for trace in map(_webgl, fig.data):
+        optimized = _optimize_trace(type(trace)(trace))
+        traces.extend(optimized if _traces_size(optimized) < _traces_size([trace]) else [trace])
+    return go.Figure(data=traces, layout=fig.layout)
+
+
+def figure_size(fig):
+    """Taille (octets) de la figure sérialisée comme par Streamlit."""
+    return len(pio.to_json(fig, validate=False).encode("utf-8"))
+
+
+def _traces_size(traces):
+    """Taille (octets) des traces sérialisées, sans modèle de mise en page."""
+    return figure_size(go.Figure(data=traces, layout_template=None))
+
+
+def plotly_chart(fig, key=None, **kwargs):
+    """``st.plotly_chart`` sur la figure allégée."""
+    optimized = optimize_figure(fig)
+    if os.environ.get("PAYLOAD_REPORT"):
+        PAYLOADS.append({
+            "graphique": key or fig.layout.title.text or f"graphique {len(PAYLOADS) + 1}",
+            "traces": len(optimized.data),
+            "avant": figure_size(fig),
+            "apres": figure_size(optimized),
+        })
+    return st.plotly_chart(optimized, key=key, **kwargs)
+
+
+def payload_report():
+    """Tailles mesurées depuis le début du processus (octets)."""
+    report = pd.DataFrame(PAYLOADS, columns=["graphique", "traces", "avant", "apres"])
+    report["ratio"] = np.round(report["apres"] / report["avant"], 2)
+    return report
+
+
+if __name__ == "__main__":
+    from pathlib import Path
+
+    from streamlit.testing.v1 import AppTest
+
+    # Les pages importent ``source.payload``, pas ``__main__``
+    from source.payload import PAYLOADS, payload_report
+
+    os.environ["PAYLOAD_REPORT"] = "1"
+    root = Path(__file__).resolve().parent.parent
+    for page in [root / "Offre_Culturelle_en_France.py", *sorted((root / "pages").glob("*.py"))]:
+        PAYLOADS.clear()
+        AppTest.from_file(str(page), default_timeout=120).run()
+        report = payload_report()
+        print(f"{page.name} : {report['avant'].sum() / 1024:.0f} Ko -> {report['apres'].sum() / 1024:.0f} Ko")
+        for row in report.itertuples():
+            print(f"    {row.graphique:<40.40} {row.avant / 1024:>8.1f} Ko -> {row.apres / 1024:>7.1f} Ko")
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Affichage progressif des pages.
+
+Streamlit envoie chaque élément au navigateur dès qu'il est produit : ce
+qui retarde le haut d'une page, ce sont les lectures et les graphiques
+lourds qui le précèdent dans le script. Trois outils :
+
+- les cartes d'indicateurs sont lues dans un fichier précalculé
+  (``source.kpis``) avant tout chargement de données ;
+- ``deferred`` réserve l'emplacement d'un graphique lourd (carte,
+  figure à nombreuses traces) et affiche « Chargement… » ; le graphique est
+  produit par ``render_deferred``, appelé en fin de page, une fois le reste
+  de la page affiché, et prend sa place dans l'ordre de la page ;
+- ``lazy_section`` : section repliée sous la ligne de flottaison, dont le
+  contenu n'est calculé qu'une fois la section dépliée.
+
+``PROGRESSIVE_RENDERING=0`` (variable d'environnement) rétablit l'affichage
+d'un seul tenant : graphiques produits sur place, sections dépliées.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+PROGRESSIVE = os.environ.get("PROGRESSIVE_RENDERING", "1") != "0"
+
+# Graphiques en attente de l'exécution de page en cours
+_local = threading.local()
+
+
+def run_scoped(store):
+    """
+    Liste propre à l'exécution de page en cours, gardée dans ``store``
+    (``threading.local``). Une exécution interrompue (``st.rerun``, arrêt,
+    exception) laisse sa liste, que l'exécution suivante remplace : elle ne
+    reprend jamais les éléments d'une exécution précédente.
+    """
+    ctx = get_script_run_ctx(suppress_warning=True)
+    # ScriptRunContext.reset() recrée ``cursors`` au début de chaque
+    # exécution ; la référence gardée empêche la réutilisation de son id.
+    run = None if ctx is None else ctx.cursors
+    if getattr(store, "run", None) is not run or not hasattr(store, "items"):
+        store.run, store.items = run, []
+    return store.items
+
+
+def deferred(render, *args, **kwargs):
+    """
+    Réserve l'emplacement de ``render(*args, **kwargs)``, produit par
+    ``render_deferred`` (sur place si l'affichage progressif est désactivé).
+    """
+    if not PROGRESSIVE:
+        return render(*args, **kwargs)
+    placeholder = st.empty()
+    placeholder.caption("⏳ Chargement…")
+    run_scoped(_local).append((placeholder, render, args, kwargs))
+    return placeholder
+
+
+def render_deferred():
+    """Produit les graphiques réservés par ``deferred``, dans l'ordre de la page."""
+    pending = run_scoped(_local)
+    items = list(pending)
+    pending.clear()
+    for placeholder, render, args, kwargs in items:
+        with placeholder.container():
+            render(*args, **kwargs)
+
+
+@contextmanager
+def lazy_section(label, key):
+    """
+    Section repliable ; la valeur produite indique si son contenu doit être
+    calculé (section dépliée).
+    """
+    if not PROGRESSIVE:
+        with st.expander(label, expanded=True):
+            yield True
+        return
+    with st.expander(label, key=key, on_change="rerun") as section:
+        yield bool(section.open)
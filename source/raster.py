@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Carte des « déserts culturels » : grille d'environ 1 km sur la métropole et
+l'outre-mer, chaque cellule portant la distance à l'équipement le plus proche.
+
+Les équipements sont d'abord rastérisés sur la grille, puis une transformée
+de distance euclidienne (``scipy.ndimage.distance_transform_edt``) donne
+pour chaque cellule la cellule équipée la plus proche, en une passe linéaire
+quel que soit le nombre de points. La distance affichée est ensuite la
+distance sur la sphère entre le centre de la cellule et l'équipement retenu.
+
+La grille est régulière en longitude et en ordonnée Web Mercator, avec des
+cellules carrées d'environ 1 km au centre du territoire : l'image se
+superpose donc exactement au fond de carte (couche ``image`` de plotly).
+L'image est un PNG à palette (un octet par cellule, quelques dizaines de
+teintes) : elle est renvoyée au navigateur à chaque changement de sélection.
+Les cellules à plus de ``TERRE_KM`` km de tout centre de commune (mer, pays
+voisins) sont transparentes ; les centres de communes viennent de
+``source.geocoding``. Cette table étant dérivée des adresses des
+bibliothèques, une zone à plus de ``TERRE_KM`` km de toute commune dotée
+d'une bibliothèque est masquée comme la mer : les zones les plus isolées
+peuvent manquer sur la carte. Pour la même raison, les bibliothèques ne sont
+pas proposées : mesurée sur ce masque, leur distance ne pourrait jamais
+dépasser ``TERRE_KM`` km.
+
+Les grilles et les images PNG sont calculées une fois par version des
+fichiers et gardées dans le cache partagé : l'affichage envoie une seule
+image au navigateur, quel que soit le nombre d'équipements.
+"""
+
+import base64
+import io
+import math
+from dataclasses import dataclass
+
+import numpy as np
+import plotly.graph_objects as go
+import streamlit as st
+from plotly.colors import sample_colorscale
+
+from source.data import dataset_version, file_version, load_partition
+from source.geocoding import COMMUNES_CSV, read_communes
+from source.lazy import lazy_import
+from source.payload import plotly_chart
+from source.spatial import EARTH_RADIUS_KM, EQUIPEMENTS, chord_to_km, unit_vectors
+
+Image = lazy_import("PIL.Image")
+ndimage = lazy_import("scipy.ndimage")
+
+# Côté d'une cellule au centre du territoire
+CELL_KM = 1.0
+# Au-delà de cette distance de tout centre de commune, la cellule est masquée
+TERRE_KM = 10.0
+# Distance correspondant au haut de l'échelle de couleurs
+DISTANCE_MAX_KM = 30
+COLORSCALE = "YlOrRd"
+# Opacité des cellules affichées (0-255)
+ALPHA = 170
+# Nombre de teintes de la palette des images
+TEINTES = 64
+# Équipements proposés : les bibliothèques servent déjà au masque des terres
+EQUIPEMENTS_DESERTS = [e for e, name in EQUIPEMENTS.items() if name != "bibliotheques"]
+
+# Territoire -> emprise (lon min, lat min, lon max, lat max) et zoom d'affichage
+TERRITOIRES = {
+    "Métropole": ((-5.3, 41.2, 9.7, 51.2), 4.6),
+    "Guadeloupe": ((-61.85, 15.8, -60.95, 16.55), 8.3),
+    "Martinique": ((-61.25, 14.35, -60.78, 14.9), 8.8),
+    "Guyane": ((-54.65, 2.05, -51.55, 5.85), 6.0),
+    "La Réunion": ((55.2, -21.42, 55.85, -20.85), 8.8),
+    "Mayotte": ((44.95, -13.03, 45.32, -12.62), 9.5),
+}
+
+
+# ------------------------------------
+# Grille
+# ------------------------------------
+def mercator_y(lat):
+    """Ordonnée Web Mercator (radians) des latitudes ``lat`` (degrés)."""
+    return np.arcsinh(np.tan(np.radians(np.asarray(lat, dtype=np.float64))))
+
+
+def inverse_mercator_y(y):
+    """Latitude (degrés) des ordonnées Web Mercator ``y``."""
+    return np.degrees(np.arctan(np.sinh(np.asarray(y, dtype=np.float64))))
+
+
+@dataclass(frozen=True)
+class Grid:
+    """Grille d'un territoire : ``x`` en longitude (radians), ``y`` en Mercator."""
+    x0: float
+    y1: float
+    step: float
+    nx: int
+    ny: int
+
+    def cells(self, lat, lon):
+        """Ligne et colonne de la cellule de chaque point (-1 hors grille)."""
+        col = np.floor((np.radians(np.asarray(lon, dtype=np.float64)) - self.x0) / self.step)
+        row = np.floor((self.y1 - mercator_y(lat)) / self.step)
+        inside = (col >= 0) & (col < self.nx) & (row >= 0) & (row < self.ny)
+        return np.where(inside, row, -1).astype(np.int64), np.where(inside, col, -1).astype(np.int64)
+
+    def centers(self):
+        """Latitudes des lignes et longitudes des colonnes (centres, degrés)."""
+        lat = inverse_mercator_y(self.y1 - (np.arange(self.ny) + 0.5) * self.step)
+        lon = np.degrees(self.x0 + (np.arange(self.nx) + 0.5) * self.step)
+        return lat, lon
+
+    def corners(self):
+        """Coins de l'image (haut gauche, haut droit, bas droit, bas gauche)."""
+        lon0, lon1 = np.degrees([self.x0, self.x0 + self.nx * self.step])
+        lat0, lat1 = inverse_mercator_y([self.y1 - self.ny * self.step, self.y1])
+        return [[lon0, lat1], [lon1, lat1], [lon1, lat0], [lon0, lat0]]
+
+
+def territory_grid(territoire, cell_km=CELL_KM):
+    """Grille de cellules d'environ ``cell_km`` km couvrant le territoire."""
+    (lon0, lat0, lon1, lat1), _ = TERRITOIRES[territoire]
+    # Une cellule Mercator de côté ``step`` mesure cell_km à la latitude centrale
+    step = cell_km / (EARTH_RADIUS_KM * math.cos(math.radians((lat0 + lat1) / 2)))
+    y0, y1 = mercator_y([lat0, lat1])
+    x0, x1 = math.radians(lon0), math.radians(lon1)
+    return Grid(x0, float(y1), step, math.ceil((x1 - x0) / step), math.ceil((y1 - y0) / step))
+
+
+def rasterize(grid, lat, lon):
+    """
+    Cellules occupées par au moins un point, et pour chacune la position du
+    dernier point qui y tombe (-1 ailleurs).
+    """
+    rows, cols = grid.cells(lat, lon)
+    inside = np.flatnonzero(rows >= 0)
+    owner = np.full((grid.ny, grid.nx), -1, dtype=np.int64)
+    owner[rows[inside], cols[inside]] = inside
+    return owner >= 0, owner
+
+
+def nearest_distances(grid, lat, lon):
+    """
+    Distance (km, float32) de chaque cellule au point le plus proche,
+    NaN si aucun point ne tombe dans la grille.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    occupied, owner = rasterize(grid, lat, lon)
+    if not occupied.any():
+        return np.full((grid.ny, grid.nx), np.nan, dtype=np.float32)
+
+    # Indices de la cellule occupée la plus proche de chaque cellule
+    rows, cols = ndimage.distance_transform_edt(~occupied, return_distances=False, return_indices=True)
+    points = owner[rows, cols].ravel()
+
+    lat_centres, lon_centres = grid.centers()
+    lat_cells, lon_cells = np.meshgrid(lat_centres, lon_centres, indexing="ij")
+    chords = np.linalg.norm(
+        unit_vectors(lat_cells.ravel(), lon_cells.ravel()) - unit_vectors(lat[points], lon[points]),
+        axis=1,
+    )
+    return chord_to_km(chords).astype(np.float32).reshape(grid.ny, grid.nx)
+
+
+# ------------------------------------
+# Calcul (cache partagé)
+# ------------------------------------
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _land(territoire, cell_km, version):
+    """Cellules à moins de TERRE_KM km d'un centre de commune."""
+    grid = territory_grid(territoire, cell_km)
+    communes = read_communes()
+    occupied, _ = rasterize(grid, communes["lat"], communes["lon"])
+    if not occupied.any():
+        return np.zeros((grid.ny, grid.nx), dtype=bool)
+    return ndimage.distance_transform_edt(~occupied, sampling=cell_km) <= TERRE_KM
+
+
+def land_mask(territoire, cell_km=CELL_KM):
+    """Cellules de la grille du territoire situées sur les terres."""
+    version = file_version(COMMUNES_CSV) if COMMUNES_CSV.exists() else None
+    return _land(territoire, cell_km, version)
+
+
+@st.cache_resource(show_spinner=False, max_entries=24)
+def _distances(name, version, territoire):
+    points = load_partition(name, "region_nom", where="coord_valide")
+    return nearest_distances(territory_grid(territoire), points["lat"], points["lon"])
+
+
+def distance_raster(equipement, territoire):
+    """
+    Grille (float32, lignes du nord au sud) des distances en km à
+    l'équipement le plus proche ; NaN hors des terres.
+    """
+    name = EQUIPEMENTS[equipement]
+    distances = _distances(name, dataset_version(name), territoire)
+    return np.where(land_mask(territoire), distances, np.nan)
+
+
+# ------------------------------------
+# Image
+# ------------------------------------
+def _colors(colorscale, teintes):
+    """Table de couleurs RGB (teintes, 3) d'une échelle plotly."""
+    colors = sample_colorscale(colorscale, np.linspace(0.0, 1.0, teintes), colortype="tuple")
+    return np.round(np.asarray(colors) * 255).astype(np.uint8)
+
+
+def png_image(values, vmax, colorscale=COLORSCALE, alpha=ALPHA, teintes=TEINTES):
+    """
+    Image PNG à palette (URI ``data:``) d'une grille : valeurs de 0 à
+    ``vmax`` sur ``teintes`` teintes de l'échelle ``colorscale``, cellules
+    NaN transparentes (dernière entrée de la palette).
+    """
+    levels = np.clip(np.nan_to_num(values / vmax, nan=0.0), 0.0, 1.0)
+    index = np.round(levels * (teintes - 1)).astype(np.uint8)
+    index[np.isnan(values)] = teintes
+
+    ny, nx = values.shape
+    image = Image.frombuffer("P", (nx, ny), np.ascontiguousarray(index).tobytes(), "raw", "P", 0, 1)
+    palette = np.vstack([_colors(colorscale, teintes), np.zeros((1, 3), dtype=np.uint8)])
+    image.putpalette(palette.tobytes())
+    buffer = io.BytesIO()
+    image.save(buffer, format="png", optimize=True, transparency=bytes([alpha] * teintes + [0]))
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+@st.cache_resource(show_spinner=False, max_entries=24)
+def _overlay(equipement, territoire, versions, max_km):
+    # Une teinte par km
+    return png_image(distance_raster(equipement, territoire), max_km, teintes=max_km + 1)
+
+
+def raster_overlay(equipement, territoire, max_km=DISTANCE_MAX_KM):
+    """Image PNG (URI ``data:``) des distances, prête pour une couche plotly."""
+    name = EQUIPEMENTS[equipement]
+    versions = (
+        dataset_version(name),
+        file_version(COMMUNES_CSV) if COMMUNES_CSV.exists() else None,
+    )
+    return _overlay(equipement, territoire, versions, max_km)
+
+
+def image_map(source, territoire, grid, vmax, title, colorscale=COLORSCALE, height=650):
+    """Carte plotly du territoire avec l'image ``source`` posée sur ``grid``."""
+    (lon0, lat0, lon1, lat1), zoom = TERRITOIRES[territoire]
+    center = {"lat": (lat0 + lat1) / 2, "lon": (lon0 + lon1) / 2}
+
+    # Trace invisible : porte seulement l'échelle de couleurs
+    fig = go.Figure(go.Scattermap(
+        lat=[center["lat"]], lon=[center["lon"]], mode="markers", hoverinfo="skip",
+        marker={
+            "size": 0, "color": [0], "cmin": 0, "cmax": vmax,
+            "colorscale": colorscale, "showscale": True,
+            "colorbar": {"title": {"text": title}, "len": 0.8},
+        },
+    ))
+    fig.update_layout(
+        map={
+            "style": "open-street-map", "center": center, "zoom": zoom,
+            "layers": [{"sourcetype": "image", "source": source, "coordinates": grid.corners()}],
+        },
+        height=height,
+        margin={"r": 0, "t": 0, "l": 0, "b": 0},
+    )
+    return fig
+
+
+# ------------------------------------
+# Composant Streamlit
+# ------------------------------------
+@st.fragment
+def desert_map(key="deserts", height=650):
+    """
+    Carte des distances à l'équipement le plus proche, avec choix du type
+    d'équipement et du territoire (exécutée dans un fragment).
+    """
+    col1, col2 = st.columns(2)
+    equipement = col1.selectbox("Équipement", EQUIPEMENTS_DESERTS, key=f"{key}_equipement")
+    territoire = col2.selectbox("Territoire", list(TERRITOIRES), key=f"{key}_territoire")
+
+    fig = image_map(
+        raster_overlay(equipement, territoire), territoire, territory_grid(territoire),
+        DISTANCE_MAX_KM, "km", height=height,
+    )
+    plotly_chart(fig, key=key)
+    st.caption(
+        f"{equipement} : distance à l'équipement le plus proche, sur une grille d'environ "
+        f"{CELL_KM:g} km (échelle plafonnée à {DISTANCE_MAX_KM} km). Les terres sont "
+        f"approchées par les communes dotées d'une bibliothèque : les zones à plus de "
+        f"{TERRE_KM:g} km de l'une d'elles ne sont pas colorées."
+    )
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Référentiel des régions (découpage 2016) et normalisation des libellés.
+
+Les fichiers sources désignent les régions de façon très variable : noms
+officiels, anciennes régions d'avant 2016 (« RHONE-ALPES », « PICARDIE »…),
+abréviations (« ARA », « PACA »), majuscules, accents manquants, DROM et COM
+cités individuellement… Ce module rassemble toutes ces variantes dans une
+seule table de correspondance.
+
+La normalisation est faite une fois à l'ingestion (voir ``source.data``) :
+chaque jeu de données reçoit une colonne entière ``region_code`` (code INSEE)
+et une colonne catégorielle ``region_nom`` (nom officiel). Les pages regroupent
+ensuite sur ces colonnes au lieu de retravailler les chaînes de caractères.
+"""
+
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Code utilisé pour regrouper DROM et COM en une seule entité, comme dans
+# departements-regions-france.csv.
+OUTRE_MER = 0
+
+# (code INSEE, abréviation, nom officiel)
+REGIONS = [
+    (84, "ARA", "Auvergne-Rhône-Alpes"),
+    (27, "BFC", "Bourgogne-Franche-Comté"),
+    (53, "BRE", "Bretagne"),
+    (24, "CVL", "Centre-Val de Loire"),
+    (94, "COR", "Corse"),
+    (44, "GES", "Grand Est"),
+    (32, "HDF", "Hauts-de-France"),
+    (11, "IDF", "Île-de-France"),
+    (28, "NOR", "Normandie"),
+    (75, "NAQ", "Nouvelle-Aquitaine"),
+    (76, "OCC", "Occitanie"),
+    (52, "PDL", "Pays de la Loire"),
+    (93, "PACA", "Provence-Alpes-Côte d'Azur"),
+    (OUTRE_MER, "DROM", "Territoires et départements d'outre-mer"),
+]
+
+REGION_CODES = [code for code, _, _ in REGIONS]
+REGION_NAMES = [name for _, _, name in REGIONS]
+REGION_ABBR = {code: abbr for code, abbr, _ in REGIONS}
+REGION_LABELS = {abbr: name for _, abbr, name in REGIONS}
+
+# Autres libellés rencontrés dans les données, par code de région
+ALIASES = {
+    84: ["Auvergne", "Rhône-Alpes"],
+    27: ["Bourgogne", "Franche-Comté"],
+    24: ["Centre"],
+    44: ["Alsace", "Lorraine", "Champagne-Ardenne", "Champagne-Ardennes"],
+    32: ["Nord-Pas-de-Calais", "Picardie"],
+    28: ["Basse-Normandie", "Haute-Normandie"],
+    75: ["Aquitaine", "Limousin", "Poitou-Charentes"],
+    76: ["Languedoc-Roussillon", "Midi-Pyrénées"],
+    93: ["Provence-Alpes-Côte-d’Azur"],
+    OUTRE_MER: [
+        "DROM", "COM", "DOM", "TOM", "DOM-TOM", "Outre-mer",
+        "Départements & Régions d'Outre-Mer",
+        "Guadeloupe", "Martinique", "Guyane", "La Réunion", "Réunion", "Mayotte",
+        "Nouvelle-Calédonie", "Polynésie française", "Saint-Barthélemy",
+        "Saint-Martin", "Saint-Pierre-et-Miquelon", "St Pierre et Miquelon",
+        "Wallis-et-Futuna",
+    ],
+}
+
+# Codes INSEE des DROM (01 à 06), rattachés au regroupement outre-mer
+DROM_CODES = {1, 2, 3, 4, 6}
+
+
+def normalize_label(label):
+    """Forme canonique d'un libellé : minuscules, sans accents ni ponctuation."""
+    text = unicodedata.normalize("NFKD", str(label))
+    text = "".join(char for char in text if not unicodedata.combining(char)).lower()
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+def _build_lookup():
+    lookup = {}
+    for code, abbr, name in REGIONS:
+        for label in [abbr, name, *ALIASES.get(code, [])]:
+            lookup[normalize_label(label)] = code
+    return lookup
+
+
+# Libellé normalisé -> code de région
+_LOOKUP = _build_lookup()
+_POSITION = {code: position for position, code in enumerate(REGION_CODES)}
+# Code de région -> position dans REGIONS (dernière case : inconnu)
+_POSITION_TABLE = np.full(max(REGION_CODES) + 2, -1, dtype=np.int16)
+_POSITION_TABLE[list(_POSITION)] = list(_POSITION.values())
+
+
+def _label_code(label):
+    return _LOOKUP.get(normalize_label(label), -1)
+
+
+def _code(code):
+    try:
+        code = int(code)
+    except (TypeError, ValueError):
+        return -1
+    if code in DROM_CODES:
+        return OUTRE_MER
+    return code if code in _POSITION else -1
+
+
+def resolve_distinct(values, resolve, dtype=np.int16):
+    """
+    Applique ``resolve`` à chaque valeur distincte de ``values`` puis diffuse
+    le résultat sur toutes les lignes. Les valeurs manquantes donnent -1.
+    """
+    codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=True)
+    # Dernier élément = -1 : les valeurs manquantes (code -1) y sont envoyées
+    table = np.array([resolve(value) for value in uniques] + [-1], dtype=dtype)
+    return table[codes]
+
+
+def resolve_labels(labels):
+    """Codes de région (-1 si inconnu) pour une série de libellés."""
+    return resolve_distinct(labels, _label_code)
+
+
+def resolve_codes(codes):
+    """Codes de région canoniques (DROM regroupés, -1 si inconnu)."""
+    return resolve_distinct(codes, _code)
+
+
+def region_columns(codes, index):
+    """
+    Colonnes ``region_code`` (Int8, NA si inconnu) et ``region_nom``
+    (catégoriel, nom officiel) à partir de codes de région résolus.
+    """
+    codes = np.asarray(codes)
+    missing = codes < 0
+    positions = _POSITION_TABLE[np.where(missing, -1, codes)]
+    region_code = pd.Series(
+        pd.arrays.IntegerArray(np.where(missing, 0, codes).astype(np.int8), missing),
+        index=index, name="region_code",
+    )
+    region_nom = pd.Series(
+        pd.Categorical.from_codes(positions, categories=REGION_NAMES),
+        index=index, name="region_nom",
+    )
+    return region_code, region_nom
+
+
+def add_region_columns(frame, label_column=None, code_column=None, codes=None):
+    """
+    Ajoute ``region_code`` et ``region_nom`` à ``frame``.
+
+    Les sources sont essayées dans l'ordre : ``codes`` (codes déjà résolus,
+    par exemple à partir du département), colonne de codes INSEE, colonne de
+    libellés. Chaque ligne prend la première région trouvée : les libellés
+    des fichiers sont parfois faux (ex. Corse notée « DROM ») alors que le
+    département est fiable.
+    """
+    resolved = np.full(len(frame), -1, dtype=np.int16) if codes is None else np.asarray(codes)
+    if code_column is not None:
+        resolved = np.where(resolved < 0, resolve_codes(frame[code_column]), resolved)
+    if label_column is not None:
+        resolved = np.where(resolved < 0, resolve_labels(frame[label_column]), resolved)
+    region_code, region_nom = region_columns(resolved, frame.index)
+    return frame.assign(region_code=region_code, region_nom=region_nom)
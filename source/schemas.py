@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Types des colonnes de chaque jeu de données.
+
+Usage du rapport mémoire : ``make memory_report`` (ou
+``python -m source.schemas``).
+
+Sans schéma, pandas lit tout texte comme chaîne Python et tout nombre avec
+valeurs manquantes comme float64. Chaque jeu de données déclare ici le type
+compact de ses colonnes, appliqué à l'ingestion par ``source.data`` :
+
+- ``CATEGORIE`` : texte à faible cardinalité (régions, départements, types…) ;
+- ``"float32"`` : mesures décimales (ETP, heures…) ;
+- ``"Int8"`` … ``"Int64"`` : entiers nullables (effectifs, comptages) ;
+  ``"Int64"`` pour les fréquentations, qui sont sommées sur plusieurs années ;
+- ``OUI_NON`` : champs « Oui » / « Non », convertis en booléen nullable.
+
+Une colonne texte déclarée numérique est lue au format français (« 335 768 »,
+« 21,86 », voir ``source.numbers``) ; une valeur illisible devient manquante.
+
+Les colonnes absentes du schéma gardent le type lu par pandas.
+"""
+
+import numpy as np
+import pandas as pd
+
+from source.numbers import parse_number
+
+CATEGORIE = "category"
+OUI_NON = "boolean"
+
+# Valeurs reconnues pour les champs OUI_NON (après minuscules et strip)
+VRAI = {"oui", "o", "true", "vrai", "1"}
+FAUX = {"non", "n", "false", "faux", "0"}
+
+SCHEMAS = {
+    "festivals": {
+        "Région principale de déroulement": CATEGORIE,
+        "Département principal de déroulement": CATEGORIE,
+        "Code postal (de la commune principale de déroulement)": CATEGORIE,
+        "Année de création du festival": CATEGORIE,
+        "Discipline dominante": CATEGORIE,
+        "Période principale de déroulement du festival": CATEGORIE,
+    },
+    "bibliotheques": {
+        "code_region": "Int8",
+        "Région": CATEGORIE,
+        "code_departement": CATEGORIE,
+        "Département": CATEGORIE,
+        "CP": "Int32",
+        "Ville": CATEGORIE,
+        "Population commune": "Int32",
+        "Longitude": "float32",
+        "Latitude": "float32",
+        "type_adresse": CATEGORIE,
+        "site_internet_accessible": OUI_NON,
+        "nombre_de_places": "Int16",
+        "ouverture_le_dimanche": OUI_NON,
+        "connexion_wi_fi": OUI_NON,
+        "nombre_de_livres": "Int32",
+        "nombre_d_entrees": "Int32",
+        "depenses_action_culturelle": "Int32",
+        "depenses_documentaires": "Int32",
+        "etp_salaries": "float32",
+        "etp_salaries_non_titulaires": "float32",
+        "Nombre de bénévoles": "Int16",
+        "temps_de_travail_des_benevoles": "float32",
+        "Nombre de salariés": "Int16",
+        "gratuite_des_services": OUI_NON,
+        "nombre_actions_culturelles": "Int32",
+        "pop_touchee_actions_culturelles": "Int32",
+    },
+    "musees": {
+        "Code_postal": CATEGORIE,
+        "Ville": CATEGORIE,
+        "Departement": CATEGORIE,
+        "Region": CATEGORIE,
+        "Categorie": CATEGORIE,
+        "Domaine_thematique": CATEGORIE,
+        "Protection_batiment": CATEGORIE,
+        "Protection_espace": CATEGORIE,
+        "Date_de_mise_a_jour": CATEGORIE,
+    },
+    "frequentation_musees": {
+        "REF DU MUSEE": CATEGORIE,
+        "NOM DU MUSEE": CATEGORIE,
+        "ANNEE": "Int16",
+        "REGION": CATEGORIE,
+        "VILLE": CATEGORIE,
+        "DATE APPELLATION": CATEGORIE,
+        "PAYANT": "Int64",
+        "GRATUIT": "Int64",
+        "TOTAL": "Int64",
+        "NOTE": CATEGORIE,
+        "ID MUSEOFILE": CATEGORIE,
+        "DEPARTEMENT": CATEGORIE,
+        "OBSERVATIONS": CATEGORIE,
+    },
+    "liste_musees": {
+        "Unnamed: 0": "Int16",
+        "Région administrative": CATEGORIE,
+        "Département": CATEGORIE,
+        "Commune": CATEGORIE,
+        "Code Postal": "Int32",
+        "Latitude": "float32",
+        "Longitude": "float32",
+    },
+    "cinemas": {
+        "code_departement": CATEGORIE,
+    },
+    "frequentation_cinemas": {
+        "Année": "Int16",
+        "Entrées (millions)": "float64",
+        "Recette moyenne par entrée (€)": "float64",
+    },
+    "frequentation_cinemas_prix": {
+        "Unnamed: 0": "Int16",
+        "Auvergne-Rhone-Alpes": "float64",
+        "Corse": "float64",
+        "Hauts-de-France": "float64",
+        "Ile-de-France": "float64",
+        "PRIX": "float64",
+    },
+    "frequentation_cinemas_region": {
+        "2023": "float64",
+    },
+    "population_2024": {
+        "Total Homme": "Int32",
+        "Total Femme": "Int32",
+        "Total": "Int32",
+    },
+}
+
+
+def _oui_non(values):
+    """Booléen nullable pour un champ « Oui » / « Non »."""
+    if pd.api.types.is_bool_dtype(values):
+        return values.astype(OUI_NON)
+    text = values.astype("string").str.strip().str.lower()
+    result = pd.Series(pd.NA, index=values.index, dtype=OUI_NON)
+    result[text.isin(VRAI).fillna(False)] = True
+    result[text.isin(FAUX).fillna(False)] = False
+    return result
+
+
+def _is_text(values):
+    return pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)
+
+
+def apply_schema(frame, schema):
+    """Convertit les colonnes de ``frame`` aux types déclarés dans ``schema``."""
+    columns = {}
+    for column, dtype in schema.items():
+        if column not in frame.columns:
+            continue
+        values = frame[column]
+        if dtype == OUI_NON:
+            columns[column] = _oui_non(values)
+            continue
+        if _is_text(values) and pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(dtype)):
+            values = parse_number(values)
+        columns[column] = values.astype(dtype)
+    return frame.assign(**columns)
+
+
+# ------------------------------------
+# Rapport mémoire
+# ------------------------------------
+def memory_report():
+    """Mémoire occupée par chaque jeu de données, sans puis avec schéma."""
+    from source.data import read_source
+
+    rows = []
+    for name in SCHEMAS:
+        before = read_source(name, typed=False).memory_usage(deep=True).sum()
+        after = read_source(name).memory_usage(deep=True).sum()
+        rows.append({"jeu": name, "avant": before, "apres": after})
+    report = pd.DataFrame(rows)
+    report["gain"] = report["avant"] - report["apres"]
+    report["ratio"] = np.round(report["apres"] / report["avant"], 2)
+    return report
+
+
+if __name__ == "__main__":
+    report = memory_report()
+    for row in report.itertuples():
+        print(
+            f"{row.jeu:<24} {row.avant / 1024:>8.0f} Ko -> {row.apres / 1024:>7.0f} Ko"
+            f"  (-{row.gain / 1024:.0f} Ko, x{row.ratio})"
+        )
+    total_before, total_after = report["avant"].sum(), report["apres"].sum()
+    print(f"{'total':<24} {total_before / 1024:>8.0f} Ko -> {total_after / 1024:>7.0f} Ko")
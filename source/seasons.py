@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Saison de déroulement des festivals.
+
+La colonne « Période principale de déroulement du festival » ne contient
+qu'une vingtaine de libellés distincts (« Saison (21 juin - 5 septembre) »,
+« Avant-saison (1er janvier - 20 juin) », mois isolés, fautes de frappe…).
+Chaque libellé distinct est classé une fois à l'ingestion, puis le résultat
+est diffusé sur toutes les lignes dans une colonne catégorielle ``saison`` :
+le coût dépend du nombre de libellés, pas du nombre de festivals.
+"""
+
+import numpy as np
+import pandas as pd
+
+from source.regions import resolve_distinct
+
+SAISONS = ["printemps", "été", "automne", "hiver", "autre"]
+
+# Fautes de frappe et variantes rencontrées dans les données
+CORRECTIONS = {
+    "ocotbre": "octobre",
+    "variable selon les années": "variable",
+    "période variable selon les territoires": "variable",
+}
+
+# Mots-clés testés dans l'ordre : la première règle qui correspond l'emporte
+REGLES = [
+    ("printemps", ("avant-saison",)),
+    ("automne", ("après-saison",)),
+    ("été", ("juin", "juillet", "août")),
+    ("printemps", ("janvier", "février", "mars", "avril", "mai")),
+    ("automne", ("septembre", "octobre", "novembre")),
+    ("hiver", ("décembre",)),
+]
+
+
+def classify_period(label):
+    """Saison d'un libellé de période (« autre » si non reconnu)."""
+    text = str(label).lower().strip()
+    text = CORRECTIONS.get(text, text)
+    for saison, mots in REGLES:
+        # « Saison (21 juin - 5 septembre) » : la haute saison, l'été
+        if any(mot in text for mot in mots) or (saison == "été" and text.startswith("saison")):
+            return saison
+    return "autre"
+
+
+def _position(label):
+    return SAISONS.index(classify_period(label))
+
+
+def season_column(periods):
+    """Colonne catégorielle ``saison`` pour une série de périodes."""
+    positions = resolve_distinct(periods, _position, dtype=np.int8)
+    # Valeurs manquantes (-1) : « autre »
+    positions = np.where(positions < 0, SAISONS.index("autre"), positions)
+    return pd.Categorical.from_codes(positions, categories=SAISONS)
+
+
+def add_season_column(frame, column):
+    """Ajoute la colonne ``saison`` déduite de la colonne de période ``column``."""
+    return frame.assign(saison=season_column(frame[column]))
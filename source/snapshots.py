@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Construction des snapshots Parquet des jeux de données.
+
+Usage : ``make build_data`` (ou ``python -m source.snapshots``).
+
+Chaque CSV déclaré dans ``source.data.DATASETS`` est lu et préparé une fois,
+puis écrit au format Parquet dans ``data_prod/snapshots/``. Le nom du fichier
+contient la version du CSV d'origine et une empreinte de celles des tables
+de référence (communes, codes postaux, contours, départements) : un fichier
+modifié invalide le snapshot et ``source.data`` revient automatiquement au
+CSV jusqu'au prochain build.
+"""
+
+import time
+
+from source.data import DATASETS, SNAPSHOT_DIR, read_source, snapshot_path
+
+
+def build_snapshot(name):
+    """Écrit le snapshot du jeu ``name`` et supprime les versions périmées."""
+    path = snapshot_path(name)
+    for old in SNAPSHOT_DIR.glob(f"{name}-*.parquet"):
+        if old != path:
+            old.unlink()
+
+    frame = read_source(name)
+    tmp = path.with_suffix(".tmp")
+    frame.to_parquet(tmp, index=False)
+    tmp.replace(path)
+    return path
+
+
+def build_all():
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    for name, dataset in DATASETS.items():
+        start = time.perf_counter()
+        path = build_snapshot(name)
+        elapsed = time.perf_counter() - start
+        csv_kb = dataset.path.stat().st_size / 1024
+        parquet_kb = path.stat().st_size / 1024
+        print(f"{name:<32} {csv_kb:>8.0f} Ko -> {parquet_kb:>7.0f} Ko  ({elapsed:.2f} s)")
+
+
+if __name__ == "__main__":
+    build_all()
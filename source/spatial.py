@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Index spatial des équipements culturels.
+
+Les bibliothèques, musées et festivals portent des coordonnées ``lat`` /
+``lon`` (voir ``source.coordinates``) ; les cinémas sont placés au
+centroïde de leur commune à l'ingestion (voir ``source.geocoding``).
+Chaque jeu est indexé dans un arbre k-d (``scipy.spatial.cKDTree``)
+construit sur les vecteurs unitaires 3D des points : la distance
+euclidienne entre deux vecteurs (la corde) est une fonction croissante de
+la distance sur la sphère, si bien que les plus proches voisins et les
+voisins dans un rayon sont exacts, y compris pour l'outre-mer et de part
+et d'autre de l'antiméridien.
+
+Les arbres sont construits une fois par version du fichier et gardés dans
+le cache partagé. Les requêtes sont vectorisées : des dizaines de milliers
+de points de requête sont traités en quelques dizaines de millisecondes
+par type d'équipement, répartis sur tous les cœurs (``WORKERS``).
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from source.data import dataset_version, load_partition
+from source.lazy import lazy_import
+
+spatial = lazy_import("scipy.spatial")
+
+# Rayon moyen de la Terre
+EARTH_RADIUS_KM = 6371.0088
+
+# Requêtes réparties sur tous les cœurs disponibles
+WORKERS = -1
+
+# Type d'équipement -> jeu de données avec coordonnées
+EQUIPEMENTS = {
+    "Bibliothèques": "bibliotheques",
+    "Musées": "musees",
+    "Cinémas": "cinemas",
+    "Festivals": "festivals",
+}
+
+
+# ------------------------------------
+# Géométrie
+# ------------------------------------
+def unit_vectors(lat, lon):
+    """Vecteurs unitaires 3D (n, 3) des points (degrés)."""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def chord_to_km(chord):
+    """Distance sur la sphère (km) correspondant à une corde de la sphère unité."""
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2.0, 0.0, 1.0))
+
+
+def km_to_chord(km):
+    """Corde de la sphère unité correspondant à une distance sur la sphère (km)."""
+    return 2.0 * np.sin(np.minimum(np.asarray(km, dtype=np.float64) / EARTH_RADIUS_KM, np.pi) / 2.0)
+
+
+# ------------------------------------
+# Index
+# ------------------------------------
+@dataclass(frozen=True)
+class SpatialIndex:
+    """Arbre k-d sur les points d'un jeu de données (lignes de ``points``)."""
+    points: pd.DataFrame
+    tree: "scipy.spatial.cKDTree"
+
+    def nearest(self, lat, lon, k=1):
+        """
+        ``k`` plus proches équipements de chaque point de requête.
+
+        Renvoie deux tableaux (n, k) : distances en km et positions dans
+        ``points`` (-1 et ``inf`` si le jeu compte moins de ``k`` points).
+        """
+        chords, positions = self.tree.query(unit_vectors(lat, lon), k=k, workers=WORKERS)
+        chords = np.asarray(chords).reshape(len(chords), -1)
+        positions = np.asarray(positions).reshape(len(positions), -1)
+        missing = positions >= len(self.points)
+        distances = np.where(missing, np.inf, chord_to_km(np.where(missing, 0, chords)))
+        return distances, np.where(missing, -1, positions)
+
+    def within(self, lat, lon, radius_km):
+        """Positions des équipements à moins de ``radius_km`` de chaque point."""
+        return self.tree.query_ball_point(
+            unit_vectors(lat, lon), km_to_chord(radius_km), return_sorted=True, workers=WORKERS
+        )
+
+    def count_within(self, lat, lon, radius_km):
+        """Nombre d'équipements à moins de ``radius_km`` de chaque point."""
+        return self.tree.query_ball_point(
+            unit_vectors(lat, lon), km_to_chord(radius_km), return_length=True,
+            workers=WORKERS,
+        )
+
+
+def build_index(points):
+    """Index spatial des lignes de ``points`` (colonnes ``lat`` et ``lon``)."""
+    points = points.reset_index(drop=True)
+    return SpatialIndex(points, spatial.cKDTree(unit_vectors(points["lat"], points["lon"])))
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _spatial_index(name, version):
+    return build_index(load_partition(name, "region_nom", where="coord_valide"))
+
+
+def load_spatial_index(name):
+    """Index spatial des points valides du jeu ``name`` (cache partagé)."""
+    return _spatial_index(name, dataset_version(name))
+
+
+# ------------------------------------
+# Requêtes sur tous les types d'équipement
+# ------------------------------------
+def nearest_equipment(lat, lon, k=1, types=None):
+    """
+    ``k`` plus proches équipements de chaque type pour chaque point de requête.
+
+    Renvoie un DataFrame long : ``requete`` (position du point de requête),
+    ``equipement``, ``rang`` (1 = le plus proche), ``distance_km`` et
+    ``position`` (ligne dans ``load_spatial_index(...).points``).
+    """
+    lat = np.atleast_1d(lat)
+    lon = np.atleast_1d(lon)
+    tables = []
+    for equipement in types or EQUIPEMENTS:
+        distances, positions = load_spatial_index(EQUIPEMENTS[equipement]).nearest(lat, lon, k)
+        requetes, rangs = np.indices(distances.shape)
+        tables.append(pd.DataFrame({
+            "requete": requetes.ravel(),
+            "equipement": equipement,
+            "rang": rangs.ravel() + 1,
+            "distance_km": distances.ravel().astype(np.float32),
+            "position": positions.ravel(),
+        }))
+    table = pd.concat(tables, ignore_index=True)
+    table["equipement"] = pd.Categorical(table["equipement"], categories=list(EQUIPEMENTS))
+    return table
+
+
+def count_equipment_within(lat, lon, radius_km, types=None):
+    """
+    Nombre d'équipements de chaque type à moins de ``radius_km`` de chaque
+    point de requête : une ligne par point, une colonne par type.
+    """
+    lat = np.atleast_1d(lat)
+    lon = np.atleast_1d(lon)
+    return pd.DataFrame({
+        equipement: load_spatial_index(EQUIPEMENTS[equipement]).count_within(lat, lon, radius_km)
+        for equipement in types or EQUIPEMENTS
+    })
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Temps de démarrage à froid de chaque page.
+
+Usage : ``make startup_report`` (ou ``python -m source.startup``).
+
+Chaque page est exécutée dans un nouvel interpréteur Python, caches vides,
+comme pour le premier visiteur après un redémarrage du serveur. Le temps
+est découpé en phases :
+
+- ``interpreteur`` : du lancement de Python au début du script de mesure ;
+- ``streamlit`` : import de Streamlit (déjà fait par le serveur en
+  production, mesuré pour référence) ;
+- ``imports`` : instructions ``import`` de la page, exécutées seules ;
+- ``rendu`` : première exécution complète de la page (``AppTest``).
+
+Le rapport liste aussi les bibliothèques lourdes (``BACKENDS``) chargées
+par la page (hors celles déjà chargées par Streamlit) : une page ne doit
+charger que celles qu'elle appelle.
+
+La commande échoue (code de sortie 1) si une page dépasse son budget
+``BUDGETS`` (imports, imports + rendu, en secondes) ou si ses imports
+chargent une bibliothèque de ``LAZY``, réservée aux imports différés (voir
+``source.lazy``). Les budgets valent environ deux fois les temps mesurés
+sur un cœur ; ``STARTUP_BUDGET_FACTOR`` (variable d'environnement) les
+ajuste pour une machine plus lente.
+"""
+
+import time
+
+DEBUT = time.time()
+
+import ast
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+PAGES = [ROOT_DIR / "Offre_Culturelle_en_France.py", *sorted((ROOT_DIR / "pages").glob("*.py"))]
+
+# Bibliothèques de tracé et de calcul dont le chargement est suivi
+BACKENDS = [
+    "matplotlib.pyplot",
+    "plotly.express",
+    "plotly.graph_objects",
+    "scipy.signal",
+    "scipy.ndimage",
+    "scipy.spatial",
+    "contourpy",
+    "seaborn",
+]
+# Bibliothèques qu'aucune page ne doit charger à l'import
+LAZY = ["matplotlib.pyplot", "scipy.signal", "scipy.ndimage", "scipy.spatial", "contourpy", "seaborn"]
+
+# Page -> (imports, imports + rendu) en secondes
+BUDGETS = {
+    "Offre_Culturelle_en_France": (0.5, 1.0),
+    "01_Introduction": (0.5, 1.5),
+    "02_Répartition_de_l'_offre_culturelle": (1.5, 10.0),
+    "03_Cinémas": (1.5, 4.0),
+    "04_Festivals": (1.5, 8.0),
+    "05_Musées": (1.5, 10.0),
+    "06_Bibliothèques": (1.5, 12.0),
+    "07_Conclusion": (1.0, 2.0),
+}
+FACTOR = float(os.environ.get("STARTUP_BUDGET_FACTOR", "1"))
+
+
+# ------------------------------------
+# Mesure (dans le processus de la page)
+# ------------------------------------
+def _loaded(avant=()):
+    return [name for name in BACKENDS if name in sys.modules and name not in avant]
+
+
+def page_imports(path):
+    """Instructions ``import`` de premier niveau du script ``path``."""
+    tree = ast.parse(Path(path).read_text(encoding="utf-8"))
+    body = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return compile(ast.Module(body=body, type_ignores=[]), str(path), "exec")
+
+
+def measure_page(path, lancement):
+    """Phases du démarrage de la page ``path`` (exécuté dans un nouvel interpréteur)."""
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    streamlit = time.perf_counter() - start
+    avant = _loaded()
+
+    start = time.perf_counter()
+    exec(page_imports(path), {"__name__": "__main__", "__file__": str(path)})
+    imports = time.perf_counter() - start
+    apres_imports = _loaded(avant)
+
+    start = time.perf_counter()
+    run = AppTest.from_file(str(path), default_timeout=300).run()
+    rendu = time.perf_counter() - start
+
+    return {
+        "interpreteur": DEBUT - lancement,
+        "streamlit": streamlit,
+        "imports": imports,
+        "rendu": rendu,
+        "apres_imports": apres_imports,
+        "apres_rendu": _loaded(avant),
+        "erreurs": [str(exception.value) for exception in run.exception],
+    }
+
+
+# ------------------------------------
+# Rapport
+# ------------------------------------
+def startup_times(path):
+    """Mesure la page ``path`` dans un nouvel interpréteur."""
+    lancement = time.time()
+    result = subprocess.run(
+        [sys.executable, "-m", "source.startup", "--page", str(path), str(lancement)],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def budget_errors(page, times):
+    """Dépassements de budget de la page ``page``."""
+    errors = [f"{page} : {error}" for error in times["erreurs"]]
+    if page not in BUDGETS:
+        return errors
+    budget_imports, budget_total = (budget * FACTOR for budget in BUDGETS[page])
+    if times["imports"] > budget_imports:
+        errors.append(f"{page} : imports {times['imports']:.2f} s > {budget_imports:.2f} s")
+    total = times["imports"] + times["rendu"]
+    if total > budget_total:
+        errors.append(f"{page} : imports + rendu {total:.2f} s > {budget_total:.2f} s")
+    eager = [name for name in times["apres_imports"] if name in LAZY]
+    if eager:
+        errors.append(f"{page} : chargé dès les imports : {', '.join(eager)}")
+    return errors
+
+
+def startup_report(pages=PAGES):
+    """Affiche les temps de démarrage de chaque page ; renvoie les dépassements."""
+    errors = []
+    print(f"{'page':<40} {'interp.':>8} {'streamlit':>10} {'imports':>8} {'rendu':>8}  bibliothèques chargées")
+    for path in pages:
+        times = startup_times(path)
+        print(
+            f"{path.stem:<40.40} {times['interpreteur']:>7.2f}s {times['streamlit']:>9.2f}s "
+            f"{times['imports']:>7.2f}s {times['rendu']:>7.2f}s  {', '.join(times['apres_rendu']) or '-'}"
+        )
+        errors.extend(budget_errors(path.stem, times))
+    return errors
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--page"]:
+        print(json.dumps(measure_page(sys.argv[2], float(sys.argv[3]))))
+        sys.exit(0)
+
+    errors = startup_report()
+    for error in errors:
+        print(f"Hors budget : {error}")
+    sys.exit(1 if errors else 0)